@@ -5,15 +5,24 @@ import subprocess
 import threading
 import time
 import io
+import queue
 from pathlib import Path
 from typing import Optional
 import shutil
 
+from bson import ObjectId
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, Response, jsonify, request, make_response, stream_with_context
 from flask_cors import CORS
 
-from common import init_db_and_redis, ensure_indexes_db
+from common import init_db_and_redis, ensure_indexes_db, connect_stores
+from seat_state import SCREENING_CANCELLED, layout_labels, fetch_seat_map
+from rebuild_seat_state import lazy_rebuild
+from seat_events import SeatEventHub
+from password_hashing import PasswordHasher
+from token_store import make_token_store
+from json_provider import MongoJSONProvider
+import metrics
 
 # import blueprints
 from blueprints.users import users_bp
@@ -21,6 +30,8 @@ from blueprints.movies import movies_bp
 from blueprints.bookings import bookings_bp
 from blueprints.payments import payments_bp
 from blueprints.reviews import reviews_bp
+from blueprints.holds import holds_bp
+from blueprints.screenings import screenings_bp
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "config.example"))
 
@@ -30,26 +41,40 @@ START_FRONTEND = os.getenv("START_FRONTEND", "1") == "1"
 
 def create_app() -> Flask:
     app = Flask(__name__)
+    app.json = MongoJSONProvider(app)
+    metrics.init_app(app)
     CORS(app, resources={r"/*": {"origins": ["http://localhost:5173", "http://127.0.0.1:5173"]}}, supports_credentials=True)
 
     # load config into app.config for convenience
     app.config["HOLD_TTL_SECONDS"] = int(os.environ.get("HOLD_TTL_SECONDS", 600))
+    # payment deadline of a PENDING booking; its seats are released by booking_expiry.py afterwards
+    app.config["RESERVE_TTL_SECONDS"] = int(os.environ.get("RESERVE_TTL_SECONDS", 3600))
+    # seat hashes rebuilt from Mongo carry this generation; see rebuild_seat_state.py
+    app.config["SEAT_STATE_GENERATION"] = os.environ.get("SEAT_STATE_GENERATION", "1")
+    app.config["SEAT_STATE_LAZY_REBUILD"] = os.environ.get("SEAT_STATE_LAZY_REBUILD", "0") == "1"
     app.config["JWT_SECRET"] = os.environ.get("JWT_SECRET")
-    app.config["LUA_PATH"] = os.path.join(os.path.dirname(__file__), "hold_seats.lua")
+    app.config["BOOKING_WRITE_BEHIND"] = os.environ.get("BOOKING_WRITE_BEHIND", "0") == "1"
+    app.config["PAYMENT_WEBHOOK_SECRET"] = os.environ.get("PAYMENT_WEBHOOK_SECRET")
 
-    mc, mdb, r, hold_seats_sha = init_db_and_redis(app)
-    ensure_indexes_db(mdb)
+    mc, mdb, r, scripts = init_db_and_redis(app)
+    if os.environ.get("MONGO_ENSURE_INDEXES", "0") == "1":
+        # production runs migrate_indexes.py once per deploy instead
+        ensure_indexes_db(mdb)
 
-    app.mongodb_client = mc
-    app.mdb = mdb
-    app.redis = r
-    app.hold_seats_sha = hold_seats_sha
+    attach_stores(app, mc, mdb, r)
+    app.lua = scripts
+    app.token_store = make_token_store(app)
+    # the process pool itself starts lazily, inside whichever worker first hashes
+    app.password_hasher = PasswordHasher.from_env()
+    app.config["SSE_KEEPALIVE_SECONDS"] = int(os.environ.get("SSE_KEEPALIVE_SECONDS", 15))
 
     app.register_blueprint(users_bp, url_prefix="/users")
     app.register_blueprint(movies_bp, url_prefix="/movies")
     app.register_blueprint(bookings_bp, url_prefix="/bookings")
     app.register_blueprint(payments_bp, url_prefix="/payments")
     app.register_blueprint(reviews_bp, url_prefix="/reviews")
+    app.register_blueprint(holds_bp, url_prefix="/holds")
+    app.register_blueprint(screenings_bp, url_prefix="/screenings")
 
     @app.route("/screenings/<string:screening_id>", methods=["GET", "OPTIONS"])
     def get_screening(screening_id: str):
@@ -61,8 +86,66 @@ def create_app() -> Flask:
             resp.headers["Access-Control-Allow-Credentials"] = "true"
             return resp
 
-        # Normal GET logic
-        resp = make_response("...", 200)
+        try:
+            scr_oid = ObjectId(screening_id)
+        except Exception:
+            return jsonify({'error': 'invalid id'}), 400
+
+        mdb = app.mdb
+        screening = mdb.screenings.find_one({'_id': scr_oid})
+        if not screening:
+            return jsonify({'error': 'not found'}), 404
+        if screening.get('status') == SCREENING_CANCELLED:
+            return jsonify({'error': 'screening cancelled', 'status': SCREENING_CANCELLED}), 410
+        auditorium = mdb.auditoriums.find_one({'_id': screening.get('auditorium_id')},
+                                              {'name': 1, 'seats_layout': 1})
+        movie = mdb.movies.find_one({'_id': screening.get('movie_id')}, {'title': 1})
+
+        lazy_rebuild(app, screening_id)
+        # All seat states in one HMGET round trip instead of a GET per seat
+        seats = fetch_seat_map(app.redis, screening_id, layout_labels(auditorium))
+
+        start_time = screening.get('start_time')
+        resp = make_response(jsonify({
+            '_id': screening_id,
+            'movieTitle': movie.get('title') if movie else None,
+            'startsAt': start_time.isoformat() if start_time else None,
+            'hall': auditorium.get('name') if auditorium else None,
+            'seats': seats,
+        }), 200)
+        resp.headers["Access-Control-Allow-Origin"] = "http://localhost:5173"
+        resp.headers["Access-Control-Allow-Credentials"] = "true"
+        return resp
+
+    @app.route("/screenings/<string:screening_id>/events", methods=["GET"])
+    def screening_events(screening_id: str):
+        """
+        Server-Sent Events stream of seat changes for one screening. Clients load the seat map
+        once with GET /screenings/<id>, then apply "seats" events and re-fetch on "expired"/"resync".
+        """
+        try:
+            ObjectId(screening_id)
+        except Exception:
+            return jsonify({'error': 'invalid id'}), 400
+
+        hub = app.seat_events
+        keepalive = app.config["SSE_KEEPALIVE_SECONDS"]
+        q = hub.subscribe(screening_id)
+
+        def stream():
+            try:
+                yield "retry: 3000\n\n"
+                while True:
+                    try:
+                        yield q.get(timeout=keepalive)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+            finally:
+                hub.unsubscribe(screening_id, q)
+
+        resp = Response(stream_with_context(stream()), mimetype="text/event-stream")
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Accel-Buffering"] = "no"
         resp.headers["Access-Control-Allow-Origin"] = "http://localhost:5173"
         resp.headers["Access-Control-Allow-Credentials"] = "true"
         return resp
@@ -71,9 +154,72 @@ def create_app() -> Flask:
     def health():
         return jsonify({"ok": True}), 200
 
+    @app.route("/livez", methods=["GET"])
+    def livez():
+        # the process can serve requests; deliberately does not touch Mongo or Redis
+        return jsonify({"ok": True}), 200
+
+    @app.route("/readyz", methods=["GET"])
+    def readyz():
+        checks = readiness_checks(app)
+        ready = all(v in ("ok", "reloaded") for v in checks.values())
+        return jsonify({"ok": ready, "checks": checks}), 200 if ready else 503
+
     return app
 
 
+def attach_stores(app: Flask, mc, mdb, r) -> None:
+    """Hang the Mongo/Redis clients (and everything bound to them) off the app object."""
+    app.mongodb_client = mc
+    app.mdb = mdb
+    app.redis = r
+    pool = getattr(r, 'connection_pool', None)  # RedisCluster has none; cluster only has db 0
+    app.seat_events = SeatEventHub(r, db=pool.connection_kwargs.get('db', 0) if pool else 0)
+
+
+def readiness_checks(app: Flask) -> dict:
+    """Ping both stores and make sure every Lua script is in Redis' script cache."""
+    checks = {}
+    try:
+        app.mongodb_client.admin.command("ping")
+        checks["mongo"] = "ok"
+    except Exception as e:
+        checks["mongo"] = f"error: {e}"
+    try:
+        app.redis.ping()
+        checks["redis"] = "ok"
+    except Exception as e:
+        checks["redis"] = f"error: {e}"
+        checks["lua"] = "unknown"
+        return checks
+    try:
+        names = list(app.lua.sources)
+        loaded = app.redis.script_exists(*(app.lua.sha(n) for n in names))
+        if all(loaded):
+            checks["lua"] = "ok"
+        else:
+            # e.g. Redis restarted or failed over and lost its script cache
+            app.lua.load_all()
+            checks["lua"] = "reloaded"
+    except Exception as e:
+        checks["lua"] = f"error: {e}"
+    return checks
+
+
+def reinit_after_fork(app: Flask) -> None:
+    """
+    Called from gunicorn's post_fork hook when the app was preloaded in the master.
+
+    MongoClient is not fork-safe and the master's Redis pool must not be shared, so each worker
+    builds its own clients. Index builds and script loads already happened in the master and
+    script SHAs are content hashes, so they stay valid.
+    """
+    mc, mdb, r = connect_stores()
+    attach_stores(app, mc, mdb, r)
+    app.lua = app.lua.with_client(r)
+    app.token_store = make_token_store(app)
+
+
 VITE_PORT = 5173
 
 
@@ -163,7 +309,8 @@ if __name__ == "__main__":
         # Start Vite first (non-blocking)
         vite_proc = start_frontend_if_needed()
 
-        # Then run your backend
+        # Then run your backend; the dev server builds its own indexes
+        os.environ.setdefault("MONGO_ENSURE_INDEXES", "1")
         application = create_app()
         application.run(host="0.0.0.0", port=5000, debug=False, use_reloader=False)
     except KeyboardInterrupt:
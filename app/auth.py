@@ -1,19 +1,25 @@
+import hashlib
 import os
+import threading
 import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 
 import jwt
 from flask import request, jsonify, current_app, g
-from werkzeug.security import generate_password_hash, check_password_hash
 
 from bson import ObjectId
 
+from metrics import JWT_CACHE
+
 JWT_SECRET = os.environ.get('JWT_SECRET', 'changeme_super_secret_replace')
 ACCESS_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRES_MINUTES', '15'))
 REFRESH_EXPIRE_DAYS = int(os.environ.get('REFRESH_TOKEN_EXPIRES_DAYS', '7'))
 
 ALGORITHM = 'HS256'
+TOKEN_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', '10000'))
 
 def make_access_token(user_id: str, role: str, expires_minutes: int = ACCESS_EXPIRE_MINUTES):
     now = datetime.utcnow()
@@ -34,7 +40,9 @@ def make_refresh_token(user_id: str, expires_days: int = REFRESH_EXPIRE_DAYS):
         'sub': str(user_id),
         'iat': int(now.timestamp()),
         'exp': int(exp.timestamp()),
-        'typ': 'refresh'
+        'typ': 'refresh',
+        # unique per token, so two logins in the same second still get distinct tokens
+        'jti': uuid.uuid4().hex
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=ALGORITHM)
 
@@ -47,29 +55,111 @@ def decode_token(token: str):
     except jwt.InvalidTokenError:
         return {'error': 'invalid_token'}
 
-def auth_required(fn):
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        auth = request.headers.get('Authorization', '')
+class VerifiedTokenCache:
+    """
+    Bounded LRU of access tokens whose signature and claims were already verified.
+
+    Keyed by the SHA-256 digest of the raw token (the token itself is never stored) and
+    evicted no later than the token's own `exp`, so a cached entry can never outlive what
+    jwt.decode would have accepted.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        JWT_CACHE.labels('hit' if entry else 'miss').inc()
+        return entry[0] if entry else None
+
+    def put(self, token: str, payload: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        exp = payload.get('exp')
+        if not isinstance(exp, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (payload, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
 
-        if not auth:
-            return jsonify({'error': 'missing Authorization header'}), 401
+token_cache = VerifiedTokenCache()
 
+def verify_access_token(token: str):
+    """Like decode_token, but for access tokens only and served from token_cache when possible."""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    payload = decode_token(token)
+    if 'error' in payload:
+        return payload
+    if payload.get('typ') != 'access':
+        return {'error': 'invalid_token_type'}
+    token_cache.put(token, payload)
+    return payload
+
+def authenticate_request(allow_cookie: bool = False):
+    """
+    Verify the request's access token (Authorization: Bearer, or the access-token cookie
+    when allow_cookie is set). Returns (payload, None) or (None, error_response).
+    """
+    auth = request.headers.get('Authorization', '')
+    if not auth:
+        token = None
+        if allow_cookie:
+            token = request.cookies.get('access_token_cookie') or request.cookies.get('access_token')
+        if not token:
+            return None, (jsonify({'error': 'missing Authorization header'}), 401)
+    else:
         parts = auth.split(None, 1)
         if len(parts) != 2:
-            return jsonify({'error': 'invalid Authorization header'}), 401
-
+            return None, (jsonify({'error': 'invalid Authorization header'}), 401)
         scheme, token = parts[0], parts[1].strip()
         if scheme.lower() != 'bearer' or not token:
-            return jsonify({'error': 'invalid auth scheme or token'}), 401
-
-        # continue with verifying `token`...
-        payload = decode_token(token)
-        if 'error' in payload:
-            return jsonify({'error': payload['error']}), 401
-        # access tokens must have typ=access
-        if payload.get('typ') != 'access':
-            return jsonify({'error': 'invalid_token_type'}), 401
+            return None, (jsonify({'error': 'invalid auth scheme or token'}), 401)
+
+    payload = verify_access_token(token)
+    if 'error' in payload:
+        return None, (jsonify({'error': payload['error']}), 401)
+    return payload, None
+
+def auth_required(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        payload, error = authenticate_request()
+        if error:
+            return error
         # attach user info to flask.g
         g.user_id = payload.get('sub')
         g.user_role = payload.get('role')
@@ -88,10 +178,3 @@ def requires_role(role):
             return jsonify({'error': 'forbidden'}), 403
         return wrapper
     return decorator
-
-# Password helpers (convenience)
-def hash_password(plain: str) -> str:
-    return generate_password_hash(plain)
-
-def verify_password(hashed: str, plain: str) -> bool:
-    return check_password_hash(hashed, plain)
\ No newline at end of file
@@ -0,0 +1,221 @@
+# app/benchmarks/contention.py
+"""
+On-sale contention benchmark: N concurrent buyers race for overlapping seats of one screening.
+
+Each buyer makes --attempts purchases of --group seats. The seats are drawn at random from the
+first --hot seats of a --seats seat auditorium, so buyers collide on purpose. One attempt is a
+hold followed by a confirm. Two paths are measured:
+
+    lua     hold_seats / confirm_reserve through the LuaScripts registry (Redis only)
+    flask   POST /holds + POST /bookings/confirm through the app (auth, Mongo insert included)
+
+Reported for each path: holds/s, confirms/s, conflict rate (holds refused because a seat was
+taken), and p50/p99 latency of each step. Demand is deliberately higher than supply, so late
+attempts conflict because the screening is sold out, just as in a real on-sale.
+
+By default the benchmark runs in-process on fakeredis + mongomock, the same stand-ins the tests
+use, which is enough to catch regressions in the scripts and handlers. Pass --real to use
+MONGO_URI / REDIS_URL; that run writes one scratch screening and its bookings.
+
+    python benchmarks/contention.py --buyers 32 --attempts 20 --out contention.json
+    python benchmarks/contention.py --real --paths lua --buyers 200
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, APP_DIR)
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(stats: dict, elapsed: float) -> dict:
+    holds = stats['holds_ok'] + stats['holds_conflict']
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'hold_attempts': holds,
+        'holds_ok': stats['holds_ok'],
+        'confirms_ok': stats['confirms_ok'],
+        'confirms_failed': stats['confirms_failed'],
+        'holds_per_s': round(holds / elapsed, 1),
+        'confirms_per_s': round(stats['confirms_ok'] / elapsed, 1),
+        'conflict_rate': round(stats['holds_conflict'] / holds, 4) if holds else 0.0,
+        'hold_ms': {'p50': round(percentile(stats['hold_lat'], 50) * 1000, 3),
+                    'p99': round(percentile(stats['hold_lat'], 99) * 1000, 3)},
+        'confirm_ms': {'p50': round(percentile(stats['confirm_lat'], 50) * 1000, 3),
+                       'p99': round(percentile(stats['confirm_lat'], 99) * 1000, 3)},
+    }
+
+
+def build_app(real: bool):
+    os.environ['START_FRONTEND'] = '0'
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+    import common
+    if not real:
+        import fakeredis
+        import mongomock
+        fake_r = fakeredis.FakeRedis(decode_responses=True)
+        common.MongoClient = mongomock.MongoClient
+        common.redis.Redis.from_url = lambda *a, **k: fake_r
+    from app import create_app
+    return create_app()
+
+
+def seed_screening(app, n_seats: int) -> tuple:
+    from generate_dataset import DatasetGenerator
+    from models_mongo import make_movie, make_theater, make_auditorium, make_screening
+    from seat_state import seats_key
+
+    labels = [s for row in DatasetGenerator.layout(n_seats, random.Random(0)) for s in row]
+    movie, theater = make_movie('Contention Benchmark'), make_theater('Benchmark Theater')
+    aud = make_auditorium(theater['_id'], 'Bench', seats_layout=[{'label': s} for s in labels])
+    scr = make_screening(movie['_id'], aud['_id'], start_time=datetime.utcnow() + timedelta(days=1))
+    app.mdb.movies.insert_one(movie)
+    app.mdb.theaters.insert_one(theater)
+    app.mdb.auditoriums.insert_one(aud)
+    app.mdb.screenings.insert_one(scr)
+    screening_id = str(scr['_id'])
+    app.redis.hset(seats_key(screening_id), mapping={s: 'AVAILABLE' for s in labels})
+    return screening_id, labels
+
+
+def lua_buyer(app, screening_id, pool, args, stats, lock, rng):
+    from scripts import hold_seats, confirm_reserve
+
+    owner = str(ObjectId())
+    for _ in range(args.attempts):
+        seats = rng.sample(pool, args.group)
+        hold_id = uuid.uuid4().hex
+        t0 = time.perf_counter()
+        held = hold_seats(app.lua, screening_id, hold_id, owner, args.hold_ttl, seats)
+        t1 = time.perf_counter()
+        ok = False
+        if held.ok:
+            ok = confirm_reserve(app.lua, screening_id, hold_id, owner, str(ObjectId()), '').ok
+        t2 = time.perf_counter()
+        with lock:
+            stats['hold_lat'].append(t1 - t0)
+            if held.ok:
+                stats['holds_ok'] += 1
+                stats['confirm_lat'].append(t2 - t1)
+                stats['confirms_ok' if ok else 'confirms_failed'] += 1
+            else:
+                stats['holds_conflict'] += 1
+
+
+def flask_buyer(app, screening_id, pool, args, stats, lock, rng):
+    from auth import make_access_token
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {make_access_token(str(ObjectId()), "customer")}'}
+    for _ in range(args.attempts):
+        seats = rng.sample(pool, args.group)
+        t0 = time.perf_counter()
+        resp = client.post('/holds', headers=headers, json={
+            'screening_id': screening_id, 'seat_labels': seats, 'ttl_seconds': args.hold_ttl})
+        t1 = time.perf_counter()
+        ok = False
+        if resp.status_code == 201:
+            confirm = client.post('/bookings/confirm', headers=headers, json={
+                'screening_id': screening_id, 'hold_id': resp.get_json()['hold_id']})
+            ok = confirm.status_code in (201, 202)
+        t2 = time.perf_counter()
+        with lock:
+            stats['hold_lat'].append(t1 - t0)
+            if resp.status_code == 201:
+                stats['holds_ok'] += 1
+                stats['confirm_lat'].append(t2 - t1)
+                stats['confirms_ok' if ok else 'confirms_failed'] += 1
+            else:
+                stats['holds_conflict'] += 1
+
+
+def run_path(app, buyer, args) -> dict:
+    from seat_state import seats_key
+
+    screening_id, labels = seed_screening(app, args.seats)
+    pool = labels[:args.hot]
+    stats = {'holds_ok': 0, 'holds_conflict': 0, 'confirms_ok': 0, 'confirms_failed': 0,
+             'hold_lat': [], 'confirm_lat': []}
+    lock = threading.Lock()
+    start = threading.Barrier(args.buyers + 1)
+
+    def worker(i):
+        rng = random.Random(args.seed * 1_000_003 + i)
+        start.wait()
+        buyer(app, screening_id, pool, args, stats, lock, rng)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.buyers)]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    result = summarize(stats, time.perf_counter() - t0)
+
+    # sanity: every reserved seat belongs to exactly one confirmed purchase
+    sold = [v for v in app.redis.hvals(seats_key(screening_id)) if v.startswith('RESERVED:')]
+    result['seats_sold'] = len(sold)
+    result['consistent'] = len(sold) == stats['confirms_ok'] * args.group
+    result['screening_id'] = screening_id
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paths', nargs='+', default=['lua', 'flask'], choices=['lua', 'flask'])
+    parser.add_argument('--buyers', type=int, default=32)
+    parser.add_argument('--attempts', type=int, default=20, help='purchase attempts per buyer')
+    parser.add_argument('--group', type=int, default=2, help='seats per purchase')
+    parser.add_argument('--seats', type=int, default=400, help='auditorium size')
+    parser.add_argument('--hot', type=int, default=200, help='seats buyers compete for')
+    parser.add_argument('--hold-ttl', type=int, default=120)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--real', action='store_true', help='use MONGO_URI / REDIS_URL instead of fakes')
+    parser.add_argument('--out', default='contention_results.json')
+    args = parser.parse_args()
+    args.hot = min(args.hot, args.seats)
+
+    app = build_app(args.real)
+    results = {
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'backend': 'real' if args.real else 'fakeredis+mongomock',
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('out', 'paths')},
+        'paths': {},
+    }
+    buyers = {'lua': lua_buyer, 'flask': flask_buyer}
+    print(f"{args.buyers} buyers x {args.attempts} attempts x {args.group} seats, "
+          f"{args.hot} hot seats ({results['backend']})")
+    print(f"{'path':<6} {'holds/s':>9} {'confirms/s':>11} {'conflict':>9} "
+          f"{'hold p50/p99 ms':>17} {'confirm p50/p99 ms':>19} {'sold':>6}")
+    for path in args.paths:
+        res = run_path(app, buyers[path], args)
+        results['paths'][path] = res
+        print(f"{path:<6} {res['holds_per_s']:>9.0f} {res['confirms_per_s']:>11.0f} {res['conflict_rate']:>9.1%} "
+              f"{res['hold_ms']['p50']:>8.2f}/{res['hold_ms']['p99']:<8.2f} "
+              f"{res['confirm_ms']['p50']:>9.2f}/{res['confirm_ms']['p99']:<9.2f} {res['seats_sold']:>6}")
+
+    with open(args.out, 'w') as fh:
+        json.dump(results, fh, indent=2)
+    print(f"wrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# app/benchmarks/json_serialization.py
+"""
+Time JSON serialization of a list response of Mongo documents:
+
+    legacy   old doc_to_json (top-level ObjectId scan) + Flask's stdlib jsonify
+    stdlib   MongoJSONProvider with the stdlib encoder (orjson not installed)
+    orjson   MongoJSONProvider with orjson
+    stream   stream_json_page over the same documents (orjson when installed)
+
+Documents look like bookings: ObjectId refs, two datetimes, a nested list of seat dicts. No
+servers are needed.
+
+    python benchmarks/json_serialization.py --docs 10000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json_provider  # noqa: E402
+from json_provider import MongoJSONProvider, stream_json_page  # noqa: E402
+from models_mongo import doc_to_json  # noqa: E402
+
+
+def legacy_doc_to_json(doc: dict) -> dict:
+    # models_mongo.doc_to_json before the JSON provider existed
+    out = dict(doc)
+    if '_id' in out:
+        out['id'] = str(out.pop('_id'))
+    for k, v in list(out.items()):
+        if isinstance(v, ObjectId):
+            out[k] = str(v)
+    return out
+
+
+def make_docs(n: int):
+    now = datetime.utcnow()
+    docs = []
+    for i in range(n):
+        booking_id, screening_id = ObjectId(), ObjectId()
+        docs.append({
+            '_id': booking_id,
+            'user_id': ObjectId(),
+            'screening_id': screening_id,
+            'status': 'CONFIRMED',
+            'total_amount': 12.5 * (i % 4 + 1),
+            'created_at': now - timedelta(minutes=i),
+            'expires_at': now + timedelta(minutes=15),
+            'seat_labels': ['A1', 'A2', 'A3'],
+            'idempotency_key': f'key-{i}',
+        })
+    return docs
+
+
+def timed(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    docs = make_docs(args.docs)
+    legacy_app = Flask('legacy')            # default provider: stdlib json, sort_keys
+    new_app = Flask('new')
+    new_app.json = MongoJSONProvider(new_app)
+
+    def legacy():
+        # no nested ObjectIds here, which the old path could not encode at all
+        with legacy_app.app_context():
+            jsonify([legacy_doc_to_json(d) for d in docs]).get_data()
+
+    def provider():
+        with new_app.app_context():
+            jsonify([doc_to_json(d) for d in docs]).get_data()
+
+    def stream():
+        with new_app.app_context():
+            resp = stream_json_page('items', iter(docs), len(docs), lambda d: None, doc_to_json)
+            for _ in resp.response:
+                pass
+
+    results = {'legacy': timed(legacy, args.repeat)}
+    saved = json_provider.orjson
+    json_provider.orjson = None
+    results['stdlib'] = timed(provider, args.repeat)
+    json_provider.orjson = saved
+    if saved is not None:
+        results['orjson'] = timed(provider, args.repeat)
+    results['stream'] = timed(stream, args.repeat)
+
+    print(f"{args.docs} documents, best of {args.repeat}")
+    for name, secs in results.items():
+        print(f"{name:<8} {secs * 1000:>9.1f} ms {args.docs / secs:>12,.0f} docs/s "
+              f"{results['legacy'] / secs:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# app/benchmarks/seat_layout_memory.py
+"""
+Compare Redis memory for the two seat-state layouts:
+
+    legacy  - one string key per seat:  screening:<id>:seat:<label>
+    hash    - one hash per screening:   screening:<id>:seats  (field = label)
+
+Needs a real redis-server (fakeredis does not account memory). Keys are written under a
+"bench:" prefix and removed afterwards, but prefer a scratch database, e.g.
+
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/seat_layout_memory.py --screenings 10000
+"""
+import argparse
+import os
+import time
+
+import redis
+
+CHUNK = 1000
+
+
+def seat_labels(n_seats: int):
+    labels = []
+    row = 0
+    while len(labels) < n_seats:
+        row_label = chr(ord('A') + row % 26) * (row // 26 + 1)
+        for col in range(1, 21):
+            labels.append(f"{row_label}{col}")
+            if len(labels) == n_seats:
+                break
+        row += 1
+    return labels
+
+
+def used_memory(r) -> int:
+    return int(r.info('memory')['used_memory'])
+
+
+def delete_prefix(r, pattern: str) -> None:
+    batch = []
+    for k in r.scan_iter(match=pattern, count=CHUNK):
+        batch.append(k)
+        if len(batch) >= CHUNK:
+            r.unlink(*batch)
+            batch = []
+    if batch:
+        r.unlink(*batch)
+
+
+def write_legacy(r, n_screenings: int, labels, held_every: int) -> None:
+    pipe = r.pipeline(transaction=False)
+    n = 0
+    for i in range(n_screenings):
+        for j, label in enumerate(labels):
+            k = f"bench:screening:{i}:seat:{label}"
+            if held_every and j % held_every == 0:
+                pipe.set(k, 'hold0000000000000000000000|user000000000000000000000', ex=600)
+            else:
+                pipe.set(k, 'AVAILABLE')
+            n += 1
+            if n % CHUNK == 0:
+                pipe.execute()
+    pipe.execute()
+
+
+def write_hash(r, n_screenings: int, labels, held_every: int) -> None:
+    pipe = r.pipeline(transaction=False)
+    held = [l for j, l in enumerate(labels) if held_every and j % held_every == 0]
+    for i in range(n_screenings):
+        k = f"bench:screening:{i}:seats"
+        mapping = {l: 'AVAILABLE' for l in labels}
+        for l in held:
+            mapping[l] = 'hold0000000000000000000000|user000000000000000000000'
+        pipe.hset(k, mapping=mapping)
+        if held:
+            pipe.hexpire(k, 600, *held)
+        if (i + 1) % 100 == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def measure(r, name, writer, n_screenings, labels, held_every):
+    delete_prefix(r, 'bench:*')
+    before = used_memory(r)
+    t0 = time.perf_counter()
+    writer(r, n_screenings, labels, held_every)
+    elapsed = time.perf_counter() - t0
+    after = used_memory(r)
+    keys = r.dbsize()
+    delete_prefix(r, 'bench:*')
+    total = after - before
+    n_seats = n_screenings * len(labels)
+    print(f"{name:<8} {total / 2**20:>10.1f} MiB {total / n_seats:>10.1f} B/seat "
+          f"{elapsed:>8.1f} s write   dbsize={keys}")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--screenings', type=int, default=10000)
+    parser.add_argument('--seats', type=int, default=300, help='seats per auditorium')
+    parser.add_argument('--held-every', type=int, default=10,
+                        help='every Nth seat is written as a held seat with a TTL (0 = none)')
+    args = parser.parse_args()
+
+    r = redis.Redis.from_url(os.environ.get('REDIS_URL', 'redis://localhost:6379/15'), decode_responses=True)
+    labels = seat_labels(args.seats)
+    print(f"{args.screenings} screenings x {args.seats} seats "
+          f"(redis {r.info('server')['redis_version']})")
+    legacy = measure(r, 'legacy', write_legacy, args.screenings, labels, args.held_every)
+    compact = measure(r, 'hash', write_hash, args.screenings, labels, args.held_every)
+    if compact:
+        print(f"hash layout uses {legacy / compact:.1f}x less memory")
+
+
+if __name__ == '__main__':
+    main()
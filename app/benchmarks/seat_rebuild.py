@@ -0,0 +1,139 @@
+# app/benchmarks/seat_rebuild.py
+"""
+Time the Redis seat-state rebuild (rebuild_seat_state.py) for many screenings.
+
+A dataset is generated with DatasetGenerator (confirmed bookings, booking_seats and seat
+hashes), the reserved seats are recorded, every seat hash is deleted to simulate Redis data
+loss, and then the state is rebuilt in two ways:
+
+    naive     per screening: find booking_seats, find their bookings, HSET  (3 round trips each)
+    batched   rebuild_all: per --batch screenings one seat hash HGETALL pipeline, one aggregation and
+              one pipeline of rebuild_seats.lua calls
+
+Both results are checked against the recorded state. Besides wall time, each path reports its
+round trips (Mongo queries + Redis commands/pipelines) and what they cost at --rtt-ms of network
+latency, which is what dominates a rebuild against real servers.
+
+By default everything runs in-process on fakeredis + mongomock. mongomock has no indexes and
+scans a collection per query, so in-process wall times grow quadratically and say nothing past
+~1k screenings; use --real for the 10k-screening timing (it writes a scratch dataset with --seed).
+
+    python benchmarks/seat_rebuild.py --screenings 1000 --bookings 2000
+    python benchmarks/seat_rebuild.py --real --screenings 10000 --bookings 200000 --out rebuild.json
+"""
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+from bson import ObjectId
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, APP_DIR)
+
+
+def connect(real: bool):
+    if real:
+        from common import connect_stores
+        _, mdb, r = connect_stores()
+        return mdb, r
+    import fakeredis
+    import mongomock
+    return mongomock.MongoClient().get_database('bench'), fakeredis.FakeRedis(decode_responses=True)
+
+
+def reserved_state(r, screening_ids) -> dict:
+    from seat_state import seats_key
+    pipe = r.pipeline(transaction=False)
+    for sid in screening_ids:
+        pipe.hgetall(seats_key(sid))
+    return {sid: {k: v for k, v in h.items() if v.startswith('RESERVED:')}
+            for sid, h in zip(screening_ids, pipe.execute())}
+
+
+def drop_seat_state(r, screening_ids) -> None:
+    from seat_state import seats_key
+    pipe = r.pipeline(transaction=False)
+    for sid in screening_ids:
+        pipe.delete(seats_key(sid))
+    pipe.execute()
+
+
+def rebuild_naive(mdb, r, screening_ids) -> None:
+    from seat_state import seats_key
+    for sid in screening_ids:
+        seats = list(mdb.booking_seats.find({'screening_id': ObjectId(sid)}, {'booking_id': 1, 'seat_label': 1}))
+        live = {b['_id'] for b in mdb.bookings.find(
+            {'_id': {'$in': [s['booking_id'] for s in seats]}, 'status': {'$in': ['PENDING', 'CONFIRMED']}}, {'_id': 1})}
+        mapping = {s['seat_label']: f"RESERVED:{s['booking_id']}" for s in seats if s['booking_id'] in live}
+        if mapping:
+            r.hset(seats_key(sid), mapping=mapping)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--screenings', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--rtt-ms', type=float, default=0.5, help='network round trip used for the estimate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--real', action='store_true', help='use MONGO_URI / REDIS_URL instead of in-process fakes')
+    parser.add_argument('--out', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    from generate_dataset import DatasetGenerator
+    from models_mongo import ensure_indexes
+    from rebuild_seat_state import GENERATION_FIELD, rebuild_all
+    from scripts import LuaScripts
+    from seat_state import seats_key
+
+    mdb, r = connect(args.real)
+    ensure_indexes(mdb)
+    t0 = time.perf_counter()
+    DatasetGenerator(mdb, r, seed=args.seed, out=io.StringIO()).run(
+        movies=50, theaters=args.screenings // (8 * 14 * 5) + 1, auditoriums=8, screenings=args.screenings,
+        users=100, bookings=args.bookings, days=14, min_seats=200, max_seats=400)
+    print(f"dataset        {args.screenings:,} screenings, {args.bookings:,} bookings "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+    ids = [str(d['_id']) for d in mdb.screenings.find({}, {'_id': 1})]
+    expected = reserved_state(r, ids)
+    n_seats = sum(len(v) for v in expected.values())
+    results = {'screenings': len(ids), 'reserved_seats': n_seats, 'batch': args.batch,
+               'backend': 'real' if args.real else 'fakeredis+mongomock',
+               'python': platform.python_version()}
+
+    drop_seat_state(r, ids)
+    t0 = time.perf_counter()
+    rebuild_naive(mdb, r, ids)
+    results['naive_s'] = round(time.perf_counter() - t0, 3)
+    results['naive_round_trips'] = 3 * len(ids)
+    assert reserved_state(r, ids) == expected, 'naive rebuild diverged'
+
+    drop_seat_state(r, ids)
+    t0 = time.perf_counter()
+    totals = rebuild_all(mdb, LuaScripts(r), generation=f'bench-{time.time_ns()}', batch=args.batch)
+    results['batched_s'] = round(time.perf_counter() - t0, 3)
+    # per batch: HGETALL pipeline, aggregation, rebuild_seats pipeline (+ screenings cursor batches)
+    results['batched_round_trips'] = 4 * math.ceil(len(ids) / args.batch)
+    assert totals['rebuilt'] == len(ids) and totals['reserved_seats'] == n_seats, totals
+    assert reserved_state(r, ids) == expected, 'batched rebuild diverged'
+    assert all(r.hexists(seats_key(sid), GENERATION_FIELD) for sid in ids[:10])
+
+    for path in ('naive', 'batched'):
+        secs, trips = results[f'{path}_s'], results[f'{path}_round_trips']
+        results[f'{path}_network_s'] = round(trips * args.rtt_ms / 1000, 3)
+        print(f"{path:<14} {len(ids):,} screenings / {n_seats:,} seats in {secs:7.2f}s "
+              f"({len(ids) / secs:,.0f} screenings/s), {trips:,} round trips "
+              f"= {results[f'{path}_network_s']:.2f}s at {args.rtt_ms} ms RTT")
+    if args.out:
+        with open(args.out, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# app/benchmarks/serving_throughput.py
+"""
+Compare request throughput of the serving modes:
+
+    dev       python app.py style single-process Flask server (app.run, threaded)
+    gthread   gunicorn, gthread workers   (gunicorn.conf.py defaults)
+    gevent    gunicorn, gevent workers
+
+Each mode is started as a subprocess on its own port and hammered by --clients keep-alive
+connections for --seconds. Needs MONGO_URI / REDIS_URL like the app itself.
+
+    python benchmarks/serving_throughput.py --path /health --clients 64 --seconds 10
+    python benchmarks/serving_throughput.py --path /screenings/<id> --modes gthread gevent
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEV_SERVER = (
+    "import sys; sys.path.insert(0, %r); from app import create_app; "
+    "create_app().run(host='127.0.0.1', port=%d, debug=False, use_reloader=False, threaded=True)"
+)
+
+
+def start_server(mode: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, START_FRONTEND='0')
+    if mode == 'dev':
+        cmd = [sys.executable, '-c', DEV_SERVER % (APP_DIR, port)]
+    else:
+        env.update(GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKER_CLASS=mode,
+                   GUNICORN_WORKERS=str(workers), GUNICORN_ACCESSLOG='')
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(APP_DIR, 'gunicorn.conf.py')]
+    proc = subprocess.Popen(cmd, cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(('127.0.0.1', port)) == 0:
+                return proc
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start on port {port}")
+
+
+def drive(port: int, path: str, clients: int, seconds: float) -> dict:
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        local, local_err = [], 0
+        while time.perf_counter() < stop_at:
+            t0 = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status >= 500:
+                    local_err += 1
+            except Exception:
+                local_err += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                continue
+            local.append(time.perf_counter() - t0)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_err
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    n = len(latencies)
+
+    def pct(p):
+        return latencies[min(n - 1, int(n * p))] * 1000 if n else 0.0
+
+    return {'requests': n, 'rps': n / seconds, 'p50_ms': pct(0.50), 'p99_ms': pct(0.99), 'errors': errors[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['dev', 'gthread', 'gevent'])
+    parser.add_argument('--path', default='/health')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--port', type=int, default=5101)
+    args = parser.parse_args()
+
+    print(f"GET {args.path}  clients={args.clients}  seconds={args.seconds}  gunicorn workers={args.workers}")
+    print(f"{'mode':<8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for i, mode in enumerate(args.modes):
+        proc = start_server(mode, args.port + i, args.workers)
+        try:
+            drive(args.port + i, args.path, min(args.clients, 4), 1.0)  # warm-up
+            res = drive(args.port + i, args.path, args.clients, args.seconds)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        print(f"{mode:<8} {res['rps']:>10.0f} {res['p50_ms']:>8.1f} {res['p99_ms']:>8.1f} {res['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
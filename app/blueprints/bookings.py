@@ -1,110 +1,366 @@
-# app/blueprints/bookings.py  (snippet: confirm endpoint)
-import os
-import uuid
+# app/blueprints/bookings.py
 from flask import Blueprint, request, jsonify, g, current_app
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 # Ensure this import is near the top of the file, before any @auth_required usage
 try:
-    from auth import auth_required
+    from auth import auth_required, requires_role
 except ImportError:
-    from app.auth import auth_required
+    from app.auth import auth_required, requires_role
+from models_mongo import doc_to_json
+from seat_state import SCREENING_CANCELLED, ScreeningCancelled, screening_layout, valid_hold_id
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from scripts import cancel_seat_state, confirm_reserve, hold_confirm, release_seats
+from booking_writer import enqueue_booking, idempotency_key_name
+from booking_expiry import schedule_expiry, cancel_expiry
+from rebuild_seat_state import lazy_rebuild
+from pagination import BadPageRequest, page_args, after_key, fetch_page
+from schedule import refresh_day_schedule
 
 bookings_bp = Blueprint('bookings', __name__)
 
-def _load_lua_into_app(app, path, attr_name):
-    if not getattr(app, attr_name, None):
-        with open(path, 'r') as fh:
-            sha = app.redis.script_load(fh.read())
-        setattr(app, attr_name, sha)
-    return getattr(app, attr_name)
+# a paid booking can be cancelled too; its payment moves to REFUND_PENDING for the refund run
+CANCELLABLE_STATUSES = ['PENDING', 'CONFIRMED']
+HISTORY_PROJECTION = {'screening_id': 1, 'seat_labels': 1, 'status': 1, 'total_amount': 1, 'created_at': 1}
+HISTORY_DEFAULT_LIMIT = 20
+HISTORY_MAX_LIMIT = 100
+
+
+def _idempotent_replay(owner, idempotency_key):
+    """Response for a retried request whose booking already exists, else None."""
+    if not idempotency_key:
+        return None
+    if current_app.config.get('BOOKING_WRITE_BEHIND', False):
+        # the first attempt may still be queued, so Mongo cannot answer this yet
+        prior = current_app.redis.get(idempotency_key_name(owner, idempotency_key))
+        if prior:
+            return jsonify({'ok': True, 'booking_id': prior, 'idempotent': True}), 200
+        return None
+    existing = current_app.mdb.bookings.find_one({'idempotency_key': idempotency_key, 'user_id': ObjectId(owner)})
+    if existing:
+        return jsonify({'ok': True, 'booking': doc_to_json(existing), 'idempotent': True}), 200
+    return None
+
+
+def _payment_deadline(screening_id, booking_id):
+    """
+    Register the booking's payment deadline with the expiry worker (booking_expiry.py) before its
+    seats are reserved, so no reservation can exist without one. Reserved seats carry no TTL.
+    """
+    deadline = datetime.utcnow() + timedelta(seconds=current_app.config.get('RESERVE_TTL_SECONDS', 3600))
+    schedule_expiry(current_app.redis, screening_id, booking_id, deadline)
+    return deadline
+
+
+def _persist_booking(owner, screening_id, booking_id, seat_labels, total_amount, idempotency_key, expires_at):
+    """Persist a booking whose seats Redis has already reserved, and build the response."""
+    bookings_col = current_app.mdb.bookings
+    booking_doc = {
+        '_id': ObjectId(booking_id),
+        'user_id': ObjectId(owner),
+        'screening_id': ObjectId(screening_id),
+        'seat_labels': seat_labels,
+        'total_amount': total_amount,
+        'status': 'PENDING',
+        'expires_at': expires_at,
+        'created_at': datetime.utcnow()
+    }
+    # leave the field out entirely when absent: the sparse unique index still indexes nulls
+    if idempotency_key:
+        booking_doc['idempotency_key'] = idempotency_key
+
+    def rollback():
+        # Rollback Redis reservation best-effort; only seats still reserved for this booking
+        try:
+            release_seats(current_app.lua, screening_id, {booking_id: seat_labels})
+            cancel_expiry(current_app.redis, screening_id, booking_id)
+        except Exception:
+            pass
+
+    if current_app.config.get('BOOKING_WRITE_BEHIND', False):
+        try:
+            queued = enqueue_booking(current_app.redis, booking_doc, idempotency_key)
+        except Exception as e:
+            rollback()
+            return jsonify({'error': 'enqueue_failed', 'detail': str(e)}), 500
+        if queued is None:
+            # a concurrent request with the same key claimed it first: answer with its booking
+            rollback()
+            replay = _idempotent_replay(owner, idempotency_key)
+            if replay:
+                return replay
+            return jsonify({'error': 'idempotency_key already used'}), 409
+        return jsonify({'ok': True, 'booking_id': booking_id, 'status': 'PENDING', 'queued': True}), 202
+
+    try:
+        bookings_col.insert_one(booking_doc)
+    except Exception as e:
+        # the seats and deadline just taken under this booking_id are never used either way
+        rollback()
+        if idempotency_key and isinstance(e, DuplicateKeyError):
+            # a concurrent retry won the insert: answer with that booking, but only to its owner
+            replay = _idempotent_replay(owner, idempotency_key)
+            if replay:
+                return replay
+            return jsonify({'error': 'idempotency_key already used'}), 409
+        return jsonify({'error': 'db_insert_failed', 'detail': str(e)}), 500
+
+    # persist booking seats
+    seat_docs = []
+    now = datetime.utcnow()
+    for s in seat_labels:
+        seat_docs.append({
+            'booking_id': booking_doc['_id'],
+            'screening_id': booking_doc['screening_id'],
+            'seat_label': s,
+            'created_at': now
+        })
+    if seat_docs:
+        current_app.mdb.booking_seats.insert_many(seat_docs)
+
+    # the seats were reserved just before cancel_seat_state; if cancel_screening listed the live
+    # bookings before this insert, the booking is cancelled here instead
+    if current_app.mdb.screenings.find_one({'_id': booking_doc['screening_id'], 'status': SCREENING_CANCELLED},
+                                           {'_id': 1}):
+        current_app.mdb.bookings.update_one({'_id': booking_doc['_id'], 'status': 'PENDING'},
+                                            {'$set': {'status': 'CANCELLED', 'cancelled_at': now}})
+        current_app.mdb.booking_seats.delete_many({'booking_id': booking_doc['_id']})
+        cancel_expiry(current_app.redis, screening_id, booking_id)
+        return jsonify({'error': 'screening cancelled'}), 410
+
+    return jsonify({'ok': True, 'booking_id': str(booking_doc['_id'])}), 201
+
+
+@bookings_bp.route('', methods=['GET'])
+@auth_required
+def list_bookings():
+    """
+    The caller's bookings, newest first: GET /bookings?limit=N&cursor=<next_cursor>
+    Walks the (user_id, created_at, _id) index, so every page costs the same however many
+    bookings the user has.
+    """
+    try:
+        limit, _, cursor = page_args(HISTORY_DEFAULT_LIMIT, HISTORY_MAX_LIMIT)
+        if cursor and len(cursor) != 2:
+            raise BadPageRequest('invalid cursor')
+    except BadPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = {'user_id': ObjectId(g.user_id)}
+    if cursor:
+        query.update(after_key('created_at', *cursor, -1))
+    docs, next_cursor = fetch_page(current_app.mdb.bookings.find(query, HISTORY_PROJECTION), 'created_at', -1, limit)
+
+    # bookings written before seat_labels were stored on the booking: one batched lookup per page
+    legacy = [d['_id'] for d in docs if 'seat_labels' not in d]
+    if legacy:
+        seats = {}
+        for s in current_app.mdb.booking_seats.find({'booking_id': {'$in': legacy}}, {'booking_id': 1, 'seat_label': 1}):
+            seats.setdefault(s['booking_id'], []).append(s['seat_label'])
+        for d in docs:
+            if 'seat_labels' not in d:
+                d['seat_labels'] = sorted(seats.get(d['_id'], []))
+
+    return jsonify({'items': [doc_to_json(d) for d in docs], 'next_cursor': next_cursor}), 200
+
+
+def _request_refunds(payment_ids: list) -> int:
+    """Move the settled payments of cancelled bookings to REFUND_PENDING; returns how many."""
+    if not payment_ids:
+        return 0
+    return current_app.mdb.payments.update_many(
+        {'_id': {'$in': payment_ids}, 'status': 'SUCCEEDED'},
+        {'$set': {'status': 'REFUND_PENDING', 'updated_at': datetime.utcnow()}}).modified_count
+
+
+def _booking_seat_labels(booking: dict) -> list:
+    if 'seat_labels' in booking:
+        return booking['seat_labels']
+    # bookings written before seat_labels were stored on the booking
+    return [s['seat_label'] for s in current_app.mdb.booking_seats.find({'booking_id': booking['_id']}, {'seat_label': 1})]
+
+
+@bookings_bp.route('/<booking_id>/cancel', methods=['POST'])
+@auth_required
+def cancel_booking(booking_id):
+    try:
+        booking_oid = ObjectId(booking_id)
+    except Exception:
+        return jsonify({'error': 'invalid booking_id'}), 400
+
+    query = {'_id': booking_oid}
+    if g.user_role != 'admin':
+        query['user_id'] = ObjectId(g.user_id)
+
+    # flip the status first: if Redis is unreachable the seats stay reserved (never double-sold)
+    booking = current_app.mdb.bookings.find_one_and_update(
+        {**query, 'status': {'$in': CANCELLABLE_STATUSES}},
+        {'$set': {'status': 'CANCELLED', 'cancelled_at': datetime.utcnow()}},
+        projection={'screening_id': 1, 'seat_labels': 1, 'status': 1, 'payment_id': 1},
+        return_document=ReturnDocument.BEFORE)
+    if booking is None:
+        current = current_app.mdb.bookings.find_one(query, {'status': 1})
+        if current is None:
+            return jsonify({'error': 'booking not found'}), 404
+        if current['status'] == 'CANCELLED':
+            return jsonify({'ok': True, 'booking_id': booking_id, 'status': 'CANCELLED', 'released_seats': []}), 200
+        return jsonify({'error': f"booking is {current['status']}"}), 409
+
+    refund = _request_refunds([booking['payment_id']] if booking.get('payment_id') else []) > 0
+    screening_id = str(booking['screening_id'])
+    cancel_expiry(current_app.redis, screening_id, booking_id)
+    labels = _booking_seat_labels(booking)
+    # free the (screening_id, seat_label) unique index entries so the seats can be sold again
+    current_app.mdb.booking_seats.delete_many({'booking_id': booking_oid})
+    released = release_seats(current_app.lua, screening_id, {booking_id: labels})
+    return jsonify({'ok': True, 'booking_id': booking_id, 'status': 'CANCELLED',
+                    'released_seats': released, 'refund_requested': refund}), 200
+
+
+@bookings_bp.route('/screening/<screening_id>/cancel', methods=['POST'])
+@requires_role('admin')
+def cancel_screening(screening_id):
+    """
+    Cancel a screening and every live booking of it: one bulk_write for the bookings and one
+    delete_many for their seats. The seat hash is marked cancelled rather than released
+    (cancel_seat_state.lua), so the hold and confirm scripts refuse it even for requests that
+    already passed the Mongo status check, and seat-map viewers get a "cancelled" event.
+    Bookings written after the live ones are listed below cancel themselves (_persist_booking,
+    booking_writer.persist_bookings).
+    """
+    try:
+        scr_oid = ObjectId(screening_id)
+    except Exception:
+        return jsonify({'error': 'invalid screening_id'}), 400
+    mdb = current_app.mdb
+    now = datetime.utcnow()
+    screening = mdb.screenings.find_one_and_update(
+        {'_id': scr_oid}, {'$set': {'status': SCREENING_CANCELLED, 'cancelled_at': now}},
+        projection={'start_time': 1})
+    if not screening:
+        return jsonify({'error': 'screening not found'}), 404
+    cancel_seat_state(current_app.lua, screening_id)
+    if screening.get('start_time'):
+        refresh_day_schedule(mdb, current_app.redis, screening['start_time'].date())
+
+    live = list(mdb.bookings.find({'screening_id': scr_oid, 'status': {'$in': CANCELLABLE_STATUSES}},
+                                  {'status': 1, 'payment_id': 1}))
+    if not live:
+        return jsonify({'ok': True, 'cancelled_bookings': 0, 'refunds_requested': 0}), 200
+
+    ops = [UpdateOne({'_id': b['_id'], 'status': {'$in': CANCELLABLE_STATUSES}},
+                     {'$set': {'status': 'CANCELLED', 'cancelled_at': now}}) for b in live]
+    result = mdb.bookings.bulk_write(ops, ordered=False)
+
+    refunds = _request_refunds([b['payment_id'] for b in live if b.get('payment_id')])
+    ids = [b['_id'] for b in live]
+    cancel_expiry(current_app.redis, screening_id, *ids)
+    mdb.booking_seats.delete_many({'booking_id': {'$in': ids}})
+    return jsonify({'ok': True, 'cancelled_bookings': result.modified_count, 'refunds_requested': refunds}), 200
+
 
 @bookings_bp.route('/confirm', methods=['POST'])
 @auth_required
 def confirm_booking():
     body = request.get_json() or {}
     hold_id = body.get('hold_id')
-    seat_labels = body.get('seat_labels', [])
     screening_id = body.get('screening_id')
     idempotency_key = body.get('idempotency_key')  # optional
     total_amount = body.get('total_amount', 0.0)
 
-    if not (hold_id and seat_labels and screening_id):
-        return jsonify({'error': 'hold_id, screening_id and seat_labels required'}), 400
-
-    # prepare redis keys
-    keys = [f"screening:{screening_id}:seat:{s}" for s in seat_labels]
-
-    r = current_app.redis
-
-    # Load confirm script into redis if needed
-    confirm_path = current_app.config.get('LUA_CONFIRM_PATH', os.path.join(os.path.dirname(__file__), '..', 'confirm_reserve.lua'))
-    confirm_sha = _load_lua_into_app(current_app, confirm_path, 'confirm_reserve_sha')
+    # seat_labels are resolved from the server-side hold registry; any sent by the client are ignored
+    if not (hold_id and screening_id):
+        return jsonify({'error': 'hold_id and screening_id required'}), 400
+    if not valid_hold_id(hold_id):
+        return jsonify({'error': 'invalid hold_id'}), 400
+    try:
+        scr_oid = ObjectId(screening_id)
+    except Exception:
+        return jsonify({'error': 'invalid screening_id'}), 400
+    # a hold taken before the screening was cancelled must not turn into a booking
+    if current_app.mdb.screenings.find_one({'_id': scr_oid, 'status': SCREENING_CANCELLED}, {'_id': 1}):
+        return jsonify({'error': 'screening cancelled'}), 410
 
     # Owner must be the authenticated user id
     owner = getattr(g, 'user_id', None)
     if not owner:
         return jsonify({'error': 'authentication_required'}), 401
 
+    if current_app.config.get('BOOKING_WRITE_BEHIND', False):
+        replay = _idempotent_replay(owner, idempotency_key)
+        if replay:
+            return replay
+
     booking_id = str(ObjectId())
-    reserve_ttl = current_app.config.get('RESERVE_TTL_SECONDS', 3600)
+    deadline = _payment_deadline(screening_id, booking_id)
+
+    res = confirm_reserve(current_app.lua, screening_id, hold_id, owner, booking_id, '')
+    if res.ok:
+        return _persist_booking(owner, screening_id, booking_id, res.seats, total_amount, idempotency_key, deadline)
+    cancel_expiry(current_app.redis, screening_id, booking_id)
+    if res.cancelled:
+        return jsonify({'error': 'screening cancelled'}), 410
+
+    if res.hold_missing:
+        # a retried confirm finds its hold already consumed; answer with the original booking
+        replay = _idempotent_replay(owner, idempotency_key)
+        if replay:
+            return replay
+        return jsonify({'ok': False, 'error': 'hold_not_found_or_expired'}), 410
+
+    return jsonify({'ok': False, 'unavailable_seats': res.unavailable}), 409
 
-    # ARGV order for confirm_reserve.lua: hold_id, owner, booking_id, ttl
+
+@bookings_bp.route('/purchase', methods=['POST'])
+@auth_required
+def instant_purchase():
+    """
+    Hold and confirm in one Redis round trip (hold_confirm.lua) for buy-now checkouts. Seats the
+    caller holds can be bought too by naming that hold's hold_id; the bought seats leave the hold.
+    """
+    body = request.get_json() or {}
+    screening_id = body.get('screening_id')
+    seat_labels = body.get('seat_labels') or []
+    hold_id = body.get('hold_id')  # optional
+    idempotency_key = body.get('idempotency_key')  # optional
+    total_amount = body.get('total_amount', 0.0)
+
+    if not (screening_id and seat_labels):
+        return jsonify({'error': 'screening_id and seat_labels required'}), 400
+    if not isinstance(seat_labels, list) or not all(isinstance(s, str) and s for s in seat_labels):
+        return jsonify({'error': 'seat_labels must be a list of seat labels'}), 400
+    if hold_id is not None and not valid_hold_id(hold_id):
+        return jsonify({'error': 'invalid hold_id'}), 400
     try:
-        res = r.evalsha(confirm_sha, len(keys), *keys, hold_id, owner, booking_id, reserve_ttl)
-    except Exception as e:
-        # reload script in case of SCRIPTFLUSH and retry once
-        with open(confirm_path, 'r') as fh:
-            confirm_sha = r.script_load(fh.read())
-        current_app.confirm_reserve_sha = confirm_sha
-        res = r.evalsha(confirm_sha, len(keys), *keys, hold_id, owner, booking_id, reserve_ttl)
-
-    # res shape: ["1"] or ["0", "<n>", key1, key2...]
-    if isinstance(res, list) and res and res[1] == "1":
-        bookings_col = current_app.mdb.bookings
-        booking_doc = {
-            '_id': ObjectId(booking_id),
-            'user_id': ObjectId(owner),
-            'screening_id': ObjectId(screening_id),
-            'seat_labels': seat_labels,
-            'total_amount': total_amount,
-            'status': 'PENDING',
-            'idempotency_key': idempotency_key if idempotency_key else None,
-            'created_at': datetime.utcnow()
-        }
-        try:
-            bookings_col.insert_one(booking_doc)
-        except Exception as e:
-            # If idempotency triggers a duplicate key error, return existing booking
-            if idempotency_key:
-                existing = bookings_col.find_one({'idempotency_key': idempotency_key})
-                if existing:
-                    return jsonify({'ok': True, 'booking': doc_to_json(existing), 'idempotent': True}), 200
-            # Rollback Redis reservation best-effort
-            for k in keys:
-                try:
-                    current_app.redis.set(k, 'AVAILABLE')
-                except Exception:
-                    pass
-            return jsonify({'error': 'db_insert_failed', 'detail': str(e)}), 500
-
-        # persist booking seats
-        seat_docs = []
-        now = datetime.utcnow()
-        for s in seat_labels:
-            seat_docs.append({
-                'booking_id': booking_doc['_id'],
-                'screening_id': booking_doc['screening_id'],
-                'seat_label': s,
-                'created_at': now
-            })
-        if seat_docs:
-            current_app.mdb.booking_seats.insert_many(seat_docs)
-
-        return jsonify({'ok': True, 'booking_id': str(booking_doc['_id'])}), 201
-
-    else:
-        unavailable = []
-        if isinstance(res, list) and res and res[0] == "0":
-            unavailable = res[2:] if len(res) > 2 else []
-        return jsonify({'ok': False, 'unavailable_keys': unavailable}), 409
\ No newline at end of file
+        scr_oid = ObjectId(screening_id)
+    except Exception:
+        return jsonify({'error': 'invalid screening_id'}), 400
+
+    owner = g.user_id
+    replay = _idempotent_replay(owner, idempotency_key)
+    if replay:
+        return replay
+
+    try:
+        layout = screening_layout(current_app.mdb, scr_oid)
+    except ScreeningCancelled:
+        return jsonify({'error': 'screening cancelled'}), 410
+    if layout is None:
+        return jsonify({'error': 'screening not found'}), 404
+    unknown = set(seat_labels) - set(layout)
+    if unknown:
+        return jsonify({'error': 'unknown seat labels', 'seats': sorted(unknown)}), 400
+
+    booking_id = str(ObjectId())
+    seats = list(dict.fromkeys(seat_labels))
+    lazy_rebuild(current_app, screening_id)
+    deadline = _payment_deadline(screening_id, booking_id)
+
+    res = hold_confirm(current_app.lua, screening_id, owner, booking_id, '', seats, hold_id)
+    if not res.ok:
+        cancel_expiry(current_app.redis, screening_id, booking_id)
+        if res.cancelled:
+            return jsonify({'error': 'screening cancelled'}), 410
+        return jsonify({'ok': False, 'unavailable_seats': res.unavailable}), 409
+    return _persist_booking(owner, screening_id, booking_id, res.seats, total_amount, idempotency_key, deadline)
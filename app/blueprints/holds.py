@@ -0,0 +1,71 @@
+# app/blueprints/holds.py
+import uuid
+from datetime import datetime
+
+from bson import ObjectId
+from flask import Blueprint, request, jsonify, g, current_app
+
+from auth import auth_required
+from seat_state import ScreeningCancelled, screening_layout, valid_hold_id
+from scripts import hold_seats
+from rebuild_seat_state import lazy_rebuild
+
+holds_bp = Blueprint('holds', __name__)
+
+
+@holds_bp.route('', methods=['POST'])
+@auth_required
+def create_hold():
+    body = request.get_json() or {}
+    screening_id = body.get('screening_id')
+    seat_labels = body.get('seat_labels') or []
+    # optional: re-send an existing hold_id to extend/grow that hold idempotently
+    hold_id = body.get('hold_id') or uuid.uuid4().hex
+
+    if not (screening_id and seat_labels):
+        return jsonify({'error': 'screening_id and seat_labels required'}), 400
+    if not valid_hold_id(hold_id):
+        return jsonify({'error': 'hold_id must be 1-64 letters, digits, "_" or "-"'}), 400
+    if not isinstance(seat_labels, list) or not all(isinstance(s, str) and s for s in seat_labels):
+        return jsonify({'error': 'seat_labels must be a list of seat labels'}), 400
+
+    max_ttl = current_app.config.get('HOLD_TTL_SECONDS', 600)
+    try:
+        ttl = min(int(body.get('ttl_seconds') or max_ttl), max_ttl)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'invalid ttl_seconds'}), 400
+    if ttl <= 0:
+        return jsonify({'error': 'invalid ttl_seconds'}), 400
+
+    try:
+        scr_oid = ObjectId(screening_id)
+    except Exception:
+        return jsonify({'error': 'invalid screening_id'}), 400
+
+    try:
+        layout = screening_layout(current_app.mdb, scr_oid)
+    except ScreeningCancelled:
+        return jsonify({'error': 'screening cancelled'}), 410
+    if layout is None:
+        return jsonify({'error': 'screening not found'}), 404
+    unknown = set(seat_labels) - set(layout)
+    if unknown:
+        return jsonify({'error': 'unknown seat labels', 'seats': sorted(unknown)}), 400
+
+    seats = list(dict.fromkeys(seat_labels))  # de-duplicate, keep order
+    lazy_rebuild(current_app, screening_id)
+    res = hold_seats(current_app.lua, screening_id, hold_id, g.user_id, ttl, seats)
+
+    if res.ok:
+        return jsonify({
+            'ok': True,
+            'hold_id': hold_id,
+            'screening_id': screening_id,
+            'seat_labels': seats,
+            'expires_at': datetime.utcfromtimestamp(res.expires_at).isoformat() + 'Z',
+        }), 201
+    if res.cancelled:
+        return jsonify({'error': 'screening cancelled'}), 410
+    if res.foreign_hold:
+        return jsonify({'error': 'hold_id belongs to another user'}), 409
+    return jsonify({'ok': False, 'unavailable_seats': res.unavailable}), 409
@@ -1,13 +1,43 @@
 # app/blueprints/movies.py
-from flask import Blueprint, request, current_app, jsonify
+import logging
+
+from flask import Blueprint, Response, request, current_app, jsonify
 from bson import ObjectId
 from datetime import datetime
 
 from models_mongo import make_movie, make_screening, doc_to_json
+from pagination import BadPageRequest, page_args, after_key, fetch_page
 from auth import requires_role
 from auth import auth_required
 
 movies_bp = Blueprint('movies', __name__)
+log = logging.getLogger(__name__)
+
+# Catalog listing ------------------------------------------------------------
+# Pages are keyset-paginated on (sort field, _id), served by the compound indexes in
+# models_mongo.ensure_indexes, and cached in Redis. Page keys embed a catalog generation number;
+# create_movie bumps it, which orphans every cached page at once (they age out via TTL).
+
+LIST_PROJECTION = {'title': 1, 'genre': 1, 'runtime': 1, 'rating': 1, 'poster_url': 1}
+SORTS = {'title': ('title', 1), '-title': ('title', -1), 'rating': ('rating', 1), '-rating': ('rating', -1)}
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+CATALOG_GEN_KEY = 'movies:catalog:gen'
+PAGE_CACHE_TTL_SECONDS = 300
+
+
+def _catalog_page(sort_key: str, limit: int, cursor) -> dict:
+    field, direction = SORTS[sort_key]
+    query = after_key(field, *cursor, direction) if cursor else {}
+    docs, next_cursor = fetch_page(current_app.mdb.movies.find(query, LIST_PROJECTION), field, direction, limit)
+    return {'movies': [doc_to_json(d) for d in docs], 'next_cursor': next_cursor}
+
+
+def invalidate_catalog(r) -> None:
+    try:
+        r.incr(CATALOG_GEN_KEY)
+    except Exception as e:
+        log.warning("catalog cache invalidation failed: %s", e)
 
 @movies_bp.route('', methods=['POST'])
 @requires_role('admin')   # only admins (or role==admin) can create movies
@@ -20,6 +50,7 @@ def create_movie():
                      runtime=payload.get('runtime'), rating=payload.get('rating'),
                      poster_url=payload.get('poster_url'))
     current_app.mdb.movies.insert_one(doc)
+    invalidate_catalog(current_app.redis)
     return jsonify(doc_to_json(doc)), 201
 
 @movies_bp.route('/<movie_id>', methods=['GET'])
@@ -35,5 +66,32 @@ def get_movie(movie_id):
 
 @movies_bp.route('all', methods=['GET'])
 def list_movies():
-    docs = current_app.mdb.movies.find({})
-    return jsonify([doc_to_json(doc) for doc in docs]), 200
\ No newline at end of file
+    """GET /movies/all?sort=title|-title|rating|-rating&limit=N&cursor=<next_cursor>"""
+    sort_key = request.args.get('sort', 'title')
+    if sort_key not in SORTS:
+        return jsonify({'error': 'sort must be one of ' + ', '.join(SORTS)}), 400
+    try:
+        limit, raw_cursor, cursor = page_args(DEFAULT_LIMIT, MAX_LIMIT)
+        if cursor and len(cursor) != 2:
+            raise BadPageRequest('invalid cursor')
+    except BadPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+    r = current_app.redis
+    page_key = None
+    try:
+        gen = r.get(CATALOG_GEN_KEY) or '0'
+        page_key = f"movies:page:{gen}:{sort_key}:{limit}:{raw_cursor or ''}"
+        cached = r.get(page_key)
+        if cached:
+            return Response(cached, mimetype='application/json')
+    except Exception as e:
+        log.warning("catalog cache read failed: %s", e)
+
+    body = current_app.json.dumps(_catalog_page(sort_key, limit, cursor))
+    if page_key:
+        try:
+            r.set(page_key, body, ex=PAGE_CACHE_TTL_SECONDS)
+        except Exception as e:
+            log.warning("catalog cache write failed: %s", e)
+    return Response(body, mimetype='application/json')
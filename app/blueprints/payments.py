@@ -1,31 +1,62 @@
 # app/blueprints/payments.py
-from flask import Blueprint, request, current_app, jsonify
+import json
+
+from flask import Blueprint, request, current_app, jsonify, g
+from auth import auth_required
 from models_mongo import make_payment, doc_to_json
 from bson import ObjectId
+from payment_events import HANDLED_EVENTS, SIGNATURE_HEADER, enqueue_event, verify_signature
 
 payments_bp = Blueprint('payments', __name__)
 
 @payments_bp.route('', methods=['POST'])
+@auth_required
 def create_payment():
-    payload = request.get_json()
+    payload = request.get_json(silent=True) or {}
     booking_id = payload.get('booking_id')
     provider = payload.get('provider')
-    amount = payload.get('amount', 0.0)
     if not booking_id or not provider:
         return jsonify({'error': 'booking_id and provider required'}), 400
-    try:
-        booking_oid = ObjectId(booking_id)
-    except Exception:
+    if not ObjectId.is_valid(str(booking_id)):
         return jsonify({'error': 'invalid booking_id'}), 400
-    pay_doc = make_payment(booking_oid, provider, amount, status='INITIATED', provider_reference=payload.get('provider_reference'))
+    booking_oid = ObjectId(booking_id)
+    # only the caller's own pending booking can be paid, and for what it costs, not what the client says
+    booking = current_app.mdb.bookings.find_one({'_id': booking_oid, 'user_id': ObjectId(g.user_id)},
+                                                {'status': 1, 'total_amount': 1})
+    if booking is None:
+        return jsonify({'error': 'booking not found'}), 404
+    if booking['status'] != 'PENDING':
+        return jsonify({'error': f"booking {booking['status']}"}), 409
+    pay_doc = make_payment(booking_oid, provider, booking['total_amount'], status='INITIATED',
+                           provider_reference=payload.get('provider_reference'))
     current_app.mdb.payments.insert_one(pay_doc)
-    # In reality: call provider SDK (Stripe/PayPal), await webhook, then update payment.status and booking.status
+    current_app.mdb.bookings.update_one({'_id': booking_oid, 'status': 'PENDING'},
+                                        {'$set': {'payment_id': pay_doc['_id']}})
+    # In reality: call provider SDK (Stripe/PayPal) with payment id as metadata; the webhook
+    # then advances payment.status and booking.status (see payment_events.py)
     return jsonify(doc_to_json(pay_doc)), 201
 
-# example webhook endpoint for provider callbacks
+# provider callbacks: verify, dedupe and queue only; payment_events.py applies them
 @payments_bp.route('/webhook', methods=['POST'])
 def webhook():
-    data = request.get_json()
-    # provider-specific verification & update logic goes here
-    # for example: update payment status and booking.status on success
-    return jsonify({'ok': True}), 200
\ No newline at end of file
+    raw = request.get_data()
+    if not verify_signature(current_app.config.get('PAYMENT_WEBHOOK_SECRET'), raw,
+                            request.headers.get(SIGNATURE_HEADER)):
+        return jsonify({'error': 'invalid signature'}), 401
+    try:
+        event = json.loads(raw)
+        event_id, event_type, data = str(event['id']), event['type'], event.get('data') or {}
+    except (ValueError, KeyError, TypeError):
+        return jsonify({'error': 'malformed event'}), 400
+    if event_type not in HANDLED_EVENTS:
+        return jsonify({'ok': True, 'ignored': True}), 200
+    if not ObjectId.is_valid(str(data.get('payment_id', ''))):
+        return jsonify({'error': 'data.payment_id required'}), 400
+
+    queued = enqueue_event(current_app.lua, event_id, {
+        'event_id': event_id,
+        'type': event_type,
+        'payment_id': str(data['payment_id']),
+        'provider_reference': str(data.get('provider_reference') or ''),
+    })
+    return jsonify({'ok': True, 'duplicate': not queued}), 200
\ No newline at end of file
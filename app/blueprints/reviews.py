@@ -1,10 +1,47 @@
 # app/blueprints/reviews.py
 from flask import Blueprint, request, current_app, jsonify
 from models_mongo import make_review, doc_to_json
+from pagination import BadPageRequest, page_args, after_key, page_cursor, next_cursor_for
+from json_provider import stream_json_page
 from bson import ObjectId
+from pymongo import ReplaceOne
 
 reviews_bp = Blueprint('reviews', __name__)
 
+RATINGS = range(1, 6)
+FEED_DEFAULT_LIMIT = 20
+FEED_MAX_LIMIT = 100
+
+
+def _record_rating(mdb, movie_oid, rating: int):
+    """
+    Fold one rating into the movie's review_summaries document (count, sum, 1-5 histogram).
+    A single $inc upsert is atomic per document, so concurrent reviews never lose updates.
+    """
+    mdb.review_summaries.update_one(
+        {'_id': movie_oid},
+        {'$inc': {'count': 1, 'sum': rating, f'histogram.{rating}': 1}},
+        upsert=True)
+
+
+def rebuild_review_summaries(mdb) -> int:
+    """Recompute every summary from the reviews collection (backfill for pre-existing reviews)."""
+    summaries = {}
+    pipeline = [{'$group': {'_id': {'movie_id': '$movie_id', 'rating': '$rating'}, 'n': {'$sum': 1}}}]
+    for row in mdb.reviews.aggregate(pipeline):
+        movie_oid, rating = row['_id']['movie_id'], row['_id']['rating']
+        if rating not in RATINGS:
+            continue
+        s = summaries.setdefault(movie_oid, {'_id': movie_oid, 'count': 0, 'sum': 0, 'histogram': {}})
+        s['count'] += row['n']
+        s['sum'] += rating * row['n']
+        s['histogram'][str(rating)] = row['n']
+    ops = [ReplaceOne({'_id': k}, v, upsert=True) for k, v in summaries.items()]
+    if ops:
+        mdb.review_summaries.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
 @reviews_bp.route('', methods=['POST'])
 def create_review():
     data = request.get_json()
@@ -19,16 +56,53 @@ def create_review():
         movie_oid = ObjectId(movie_id)
     except Exception:
         return jsonify({'error': 'invalid id format'}), 400
-    rev = make_review(user_oid, movie_oid, int(rating), comment=comment)
+    try:
+        rating = int(rating)
+    except (TypeError, ValueError):
+        rating = None
+    if rating not in RATINGS:
+        return jsonify({'error': 'rating must be an integer from 1 to 5'}), 400
+    rev = make_review(user_oid, movie_oid, rating, comment=comment)
     current_app.mdb.reviews.insert_one(rev)
+    _record_rating(current_app.mdb, movie_oid, rating)
     return jsonify(doc_to_json(rev)), 201
 
 @reviews_bp.route('/movie/<movie_id>', methods=['GET'])
 def get_movie_reviews(movie_id):
+    """
+    Newest first; GET /reviews/movie/<id>?limit=N&cursor=<next_cursor>
+    Streamed: a page cut short by a cursor error carries "incomplete": true (see stream_json_page).
+    """
+    try:
+        movie_oid = ObjectId(movie_id)
+    except Exception:
+        return jsonify({'error': 'invalid id'}), 400
+    try:
+        limit, _, cursor = page_args(FEED_DEFAULT_LIMIT, FEED_MAX_LIMIT)
+        if cursor and len(cursor) != 2:
+            raise BadPageRequest('invalid cursor')
+    except BadPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+    # served by the (movie_id, created_at, _id) index, walked backwards
+    query = {'movie_id': movie_oid}
+    if cursor:
+        query.update(after_key('created_at', *cursor, -1))
+    docs = page_cursor(current_app.mdb.reviews.find(query), 'created_at', -1, limit)
+    return stream_json_page('reviews', docs, limit, next_cursor_for('created_at'), doc_to_json)
+
+@reviews_bp.route('/movie/<movie_id>/summary', methods=['GET'])
+def get_movie_review_summary(movie_id):
     try:
         movie_oid = ObjectId(movie_id)
     except Exception:
         return jsonify({'error': 'invalid id'}), 400
-    cursor = current_app.mdb.reviews.find({'movie_id': movie_oid})
-    reviews = [doc_to_json(d) for d in cursor]
-    return jsonify(reviews), 200
\ No newline at end of file
+    doc = current_app.mdb.review_summaries.find_one({'_id': movie_oid}) or {}
+    count = doc.get('count', 0)
+    histogram = doc.get('histogram', {})
+    return jsonify({
+        'movie_id': movie_id,
+        'count': count,
+        'average': round(doc['sum'] / count, 2) if count else None,
+        'histogram': {str(r): histogram.get(str(r), 0) for r in RATINGS}
+    }), 200
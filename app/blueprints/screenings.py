@@ -0,0 +1,109 @@
+# app/blueprints/screenings.py
+from datetime import datetime, date, timezone
+
+from bson import ObjectId
+from flask import Blueprint, Response, request, current_app, jsonify
+
+from auth import requires_role
+from models_mongo import make_screening, doc_to_json
+from pagination import BadPageRequest, page_args, after_key, page_cursor, next_cursor_for
+from json_provider import stream_json_page
+from schedule import get_day_schedule, refresh_day_schedule
+
+screenings_bp = Blueprint('screenings', __name__)
+
+LIST_PROJECTION = {'movie_id': 1, 'auditorium_id': 1, 'start_time': 1, 'end_time': 1, 'language': 1}
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def _parse_time(value: str) -> datetime:
+    # accept "2025-05-01T18:00:00Z", "...+02:00" and naive ISO strings (taken as UTC);
+    # everything is stored as naive UTC
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _oid_arg(name: str):
+    value = request.args.get(name)
+    return ObjectId(value) if value else None
+
+
+@screenings_bp.route('', methods=['POST'])
+@requires_role('admin')
+def create_screening():
+    body = request.get_json() or {}
+    try:
+        movie_oid = ObjectId(body['movie_id'])
+        aud_oid = ObjectId(body['auditorium_id'])
+        start_time = _parse_time(body['start_time'])
+        end_time = _parse_time(body['end_time']) if body.get('end_time') else None
+    except KeyError:
+        return jsonify({'error': 'movie_id, auditorium_id and start_time required'}), 400
+    except Exception:
+        return jsonify({'error': 'invalid id or time format'}), 400
+
+    mdb = current_app.mdb
+    if not mdb.movies.find_one({'_id': movie_oid}, {'_id': 1}):
+        return jsonify({'error': 'movie not found'}), 404
+    if not mdb.auditoriums.find_one({'_id': aud_oid}, {'_id': 1}):
+        return jsonify({'error': 'auditorium not found'}), 404
+
+    doc = make_screening(movie_oid, aud_oid, start_time, end_time=end_time, language=body.get('language'))
+    mdb.screenings.insert_one(doc)
+    refresh_day_schedule(mdb, current_app.redis, start_time.date())
+    return jsonify(doc_to_json(doc)), 201
+
+
+@screenings_bp.route('', methods=['GET'])
+def list_screenings():
+    """
+    GET /screenings?movie_id=&theater_id=&from=&to=&limit=&cursor=
+    Ordered by start_time. from defaults to now; to is exclusive and optional.
+    Streamed: a page cut short by a cursor error carries "incomplete": true (see stream_json_page).
+    """
+    try:
+        movie_oid = _oid_arg('movie_id')
+        theater_oid = _oid_arg('theater_id')
+    except Exception:
+        return jsonify({'error': 'invalid id'}), 400
+    try:
+        start = _parse_time(request.args['from']) if request.args.get('from') else datetime.utcnow()
+        end = _parse_time(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'from/to must be ISO 8601 times'}), 400
+    try:
+        limit, _, cursor = page_args(DEFAULT_LIMIT, MAX_LIMIT)
+        if cursor and len(cursor) != 2:
+            raise BadPageRequest('invalid cursor')
+    except BadPageRequest as e:
+        return jsonify({'error': str(e)}), 400
+
+    window = {'$gte': start}
+    if end:
+        window['$lt'] = end
+    query = {'start_time': window, 'status': {'$ne': 'CANCELLED'}}
+    if movie_oid:
+        # (movie_id, start_time) index
+        query['movie_id'] = movie_oid
+    if theater_oid:
+        # a theater's auditoriums via (theater_id), then the (auditorium_id, start_time) index
+        aud_ids = [a['_id'] for a in current_app.mdb.auditoriums.find({'theater_id': theater_oid}, {'_id': 1})]
+        query['auditorium_id'] = {'$in': aud_ids}
+    if cursor:
+        query = {'$and': [query, after_key('start_time', *cursor, 1)]}
+
+    docs = page_cursor(current_app.mdb.screenings.find(query, LIST_PROJECTION), 'start_time', 1, limit)
+    return stream_json_page('screenings', docs, limit, next_cursor_for('start_time'), doc_to_json)
+
+
+@screenings_bp.route('/schedule/<day>', methods=['GET'])
+def day_schedule(day):
+    """Materialized schedule for one UTC day (YYYY-MM-DD, or "today")."""
+    try:
+        when = datetime.utcnow().date() if day == 'today' else date.fromisoformat(day)
+    except ValueError:
+        return jsonify({'error': 'day must be YYYY-MM-DD or today'}), 400
+    return Response(get_day_schedule(current_app.mdb, current_app.redis, when), mimetype='application/json')
@@ -1,14 +1,22 @@
 # app/blueprints/users.py
 from flask import Blueprint, request, current_app, jsonify, g
 from bson import ObjectId
-from datetime import datetime
 
 from models_mongo import make_user, doc_to_json
 from schemas import UserCreate
-from auth import make_access_token, make_refresh_token, decode_token, hash_password, verify_password
+from user_profiles import get_profile, invalidate_profile, update_user
+from auth import make_access_token, make_refresh_token, decode_token, authenticate_request
+from password_hashing import HasherBusy
 
 users_bp = Blueprint('users', __name__)
 
+
+def _busy(e: HasherBusy):
+    resp = jsonify({'error': 'busy_try_again'})
+    resp.status_code = 503
+    resp.headers['Retry-After'] = str(e.retry_after)
+    return resp
+
 @users_bp.route('/register', methods=['POST'])
 def register():
     payload = request.get_json() or {}
@@ -19,7 +27,10 @@ def register():
         return jsonify({'error': 'password is required'}), 400
 
     # Hash and map to the field expected by the schema
-    payload['hashed_password'] = hash_password(password)
+    try:
+        payload['hashed_password'] = current_app.password_hasher.hash(password)
+    except HasherBusy as e:
+        return _busy(e)
 
     # Validate input with the schema
     obj = UserCreate(**payload)
@@ -30,6 +41,7 @@ def register():
         current_app.mdb.users.insert_one(doc)
     except Exception as e:
         return jsonify({'error': 'user_exists_or_db_error', 'detail': str(e)}), 400
+    invalidate_profile(current_app.redis, doc['_id'])
 
     out = doc_to_json(doc)
     out.pop('hashed_password', None)
@@ -45,20 +57,26 @@ def login():
     user = current_app.mdb.users.find_one({'email': email.lower()})
     if not user:
         return jsonify({'error': 'invalid_credentials'}), 401
-    if not verify_password(user.get('hashed_password', ''), password):
-        return jsonify({'error': 'invalid_credentials'}), 401
+    hasher = current_app.password_hasher
+    hashed = user.get('hashed_password', '')
+    try:
+        if not hasher.verify(hashed, password):
+            return jsonify({'error': 'invalid_credentials'}), 401
+    except HasherBusy as e:
+        return _busy(e)
 
     user_id = str(user['_id'])
+    if hasher.needs_rehash(hashed):
+        # upgrade to the configured KDF parameters without making this login wait for it
+        mdb, r = current_app.mdb, current_app.redis
+        hasher.rehash_in_background(
+            password, lambda new_hash: update_user(mdb, r, user_id, {'hashed_password': new_hash}))
     role = user.get('role', 'customer')
     access = make_access_token(user_id, role)
     refresh = make_refresh_token(user_id)
 
-    # Persist refresh token in DB for possible revocation and rotation
-    current_app.mdb.refresh_tokens.insert_one({
-        '_id': refresh,  # store token itself as _id for quick lookup
-        'user_id': ObjectId(user_id),
-        'created_at': datetime.utcnow()
-    })
+    # Record the refresh token server-side for revocation and rotation
+    current_app.token_store.issue(user_id, refresh)
     return jsonify({'access_token': access, 'refresh_token': refresh, 'role': role}), 200
 
 @users_bp.route('/refresh', methods=['POST'])
@@ -72,16 +90,18 @@ def refresh():
         return jsonify({'error': payload['error']}), 401
     if payload.get('typ') != 'refresh':
         return jsonify({'error': 'invalid_token_type'}), 401
-    # ensure token exists in DB (not revoked)
-    doc = current_app.mdb.refresh_tokens.find_one({'_id': token})
-    if not doc:
-        return jsonify({'error': 'token_revoked_or_unknown'}), 401
     user_id = payload.get('sub')
-    user = current_app.mdb.users.find_one({'_id': ObjectId(user_id)})
+    # load the user before rotating, so a failed lookup does not consume the presented token
+    user = get_profile(current_app.mdb, current_app.redis, user_id)
     if not user:
         return jsonify({'error': 'user_not_found'}), 404
+    # rotate: the presented token is consumed and a new one issued in the same step, so a
+    # revoked, expired or already-used token is rejected here
+    new_refresh = make_refresh_token(user_id)
+    if not current_app.token_store.rotate(user_id, token, new_refresh):
+        return jsonify({'error': 'token_revoked_or_unknown'}), 401
     new_access = make_access_token(user_id, user.get('role', 'customer'))
-    return jsonify({'access_token': new_access}), 200
+    return jsonify({'access_token': new_access, 'refresh_token': new_refresh}), 200
 
 @users_bp.route('/logout', methods=['POST'])
 def logout():
@@ -90,10 +110,21 @@ def logout():
     if not refresh:
         return jsonify({'error': 'refresh_token_required'}), 400
 
-    # delete persisted refresh token to revoke it
-    result = current_app.mdb.refresh_tokens.delete_one({'_id': refresh})
+    payload = decode_token(refresh)
+    if 'error' in payload or payload.get('typ') != 'refresh':
+        return jsonify({'error': 'invalid_refresh_token'}), 400
+    user_id = payload.get('sub')
+
+    store = current_app.token_store
+    if data.get('all'):
+        # log out every session of this user, but only on proof of one live session
+        if not store.is_active(user_id, refresh):
+            return jsonify({'error': 'invalid_refresh_token'}), 400
+        store.revoke_all(user_id)
+        return jsonify({'message': 'You have successfully log out'}), 200
 
-    if result.deleted_count:
+    # revoke the persisted refresh token
+    if store.revoke(user_id, refresh):
         # Log to server and return a friendly message
         current_app.logger.info('You have successfully log out')
         return jsonify({'message': 'You have successfully log out'}), 200
@@ -103,42 +134,17 @@ def logout():
 # simple profile endpoint
 @users_bp.route('/me', methods=['GET'])
 def me():
-    # Try Authorization header first; fall back to cookie
-    auth = request.headers.get('Authorization', '')
-    token = None
-
-    if auth.startswith('Bearer '):
-        token = auth.split(' ', 1)[1].strip()
-    else:
-        token = request.cookies.get('access_token_cookie') or request.cookies.get('access_token')
-
-    if not token:
-        return jsonify({'error': 'authorization_required'}), 401
-
-    try:
-        payload = decode_token(token)
-    except Exception:
-        return jsonify({'error': 'invalid_token'}), 401
-
-    if not isinstance(payload, dict):
-        return jsonify({'error': 'invalid_token'}), 401
-    if 'error' in payload:
-        return jsonify({'error': payload['error']}), 401
-
-    user_id = payload.get('sub') or payload.get('user_id') or payload.get('id')
-    if not user_id:
-        return jsonify({'error': 'invalid_token'}), 401
+    # Authorization header first; the cookie fallback is only accepted on this read-only route
+    payload, error = authenticate_request(allow_cookie=True)
+    if error:
+        return error
 
-    try:
-        oid = ObjectId(user_id)
-    except Exception:
+    user_id = payload.get('sub')
+    if not ObjectId.is_valid(user_id):
         return jsonify({'error': 'invalid_token'}), 401
 
-    user = current_app.mdb.users.find_one({'_id': oid})
+    user = get_profile(current_app.mdb, current_app.redis, user_id)
     if not user:
         return jsonify({'error': 'not_found'}), 404
 
-    out = doc_to_json(user)
-    for k in ('hashed_password', 'password', 'salt'):
-        out.pop(k, None)
-    return jsonify(out), 200
\ No newline at end of file
+    return jsonify(doc_to_json(user)), 200
@@ -0,0 +1,178 @@
+# app/booking_expiry.py
+"""
+Payment deadlines for PENDING bookings.
+
+Confirm and purchase reserve seats without a Redis TTL and register the booking in the sorted
+set bookings:deadlines (score = deadline in epoch ms) before the reservation is made. This
+worker claims due entries in batches (claim_due_deadlines.lua) and, per batch:
+
+    1. one update_many flips the claimed bookings still PENDING to EXPIRED (by _id only,
+       the bookings collection is never scanned);
+    2. one delete_many drops their booking_seats rows so the seats can be sold again;
+    3. release_seats.lua frees the seats still RESERVED:<booking_id>, pipelined across screenings;
+    4. the batch is ZREMed.
+
+Bookings that were paid or cancelled in the meantime are just removed from the set. A booking
+Mongo does not have was never persisted (a crash between reserve and insert), and its seats are
+read off the seat hash and freed. Under BOOKING_WRITE_BEHIND it may instead still be queued in
+bookings:writes, so it is given MISSING_GRACE_SECONDS more, up to MISSING_RETRIES times (tracked
+in the bookings:deadlines:missing hash), before its seats are freed. The defaults outlast the
+writer's own retries (BOOKING_WRITER_MAX_DELIVERIES x BOOKING_WRITER_RETRY_IDLE_MS) before it
+dead-letters a booking.
+
+A worker that dies mid-batch loses nothing: claimed entries come due again once their lease
+runs out, and every step is safe to repeat. Run one or more workers next to the API:
+
+    python booking_expiry.py
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+
+from scripts import release_seats_many
+from seat_state import seats_key
+
+log = logging.getLogger(__name__)
+
+DEADLINES_KEY = 'bookings:deadlines'
+MISSING_KEY = 'bookings:deadlines:missing'
+CLAIM_LEASE_MS = 60_000
+MISSING_GRACE_SECONDS = 60
+MISSING_RETRIES = 5
+
+
+def _member(screening_id: str, booking_id: str) -> str:
+    return f"{screening_id}:{booking_id}"
+
+
+def epoch_ms(dt: datetime) -> int:
+    """Sorted-set score for a datetime; naive datetimes are UTC, as everywhere in Mongo here."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def schedule_expiry(r, screening_id: str, booking_id: str, deadline: datetime) -> None:
+    r.zadd(DEADLINES_KEY, {_member(screening_id, booking_id): epoch_ms(deadline)})
+
+
+def cancel_expiry(r, screening_id: str, *booking_ids: str) -> None:
+    if booking_ids:
+        r.zrem(DEADLINES_KEY, *[_member(screening_id, str(b)) for b in booking_ids])
+
+
+def claim_due(scripts, now_ms: int, limit: int, lease_ms: int = CLAIM_LEASE_MS) -> List[str]:
+    return list(scripts.run('claim_due_deadlines', [DEADLINES_KEY], [now_ms, lease_ms, limit])[1:])
+
+
+def _reserved_labels(r, screening_id: str, booking_id: str) -> List[str]:
+    """Seats of a booking Mongo never got (crash between reserve and insert), read off the hash."""
+    reserved = f"RESERVED:{booking_id}"
+    return [label for label, value in r.hgetall(seats_key(screening_id)).items() if value == reserved]
+
+
+def _defer_missing(r, members: List[str], now_ms: int, grace_ms: int, retries: int) -> List[str]:
+    """Push back the members still within their retry budget; returns those members."""
+    pipe = r.pipeline(transaction=False)
+    for m in members:
+        pipe.hincrby(MISSING_KEY, m, 1)
+    deferred = [m for m, tries in zip(members, pipe.execute()) if tries <= retries]
+    if deferred:
+        # XX: the claim left every member in the set under its lease
+        r.zadd(DEADLINES_KEY, {m: now_ms + grace_ms for m in deferred}, xx=True)
+    return deferred
+
+
+def expire_due(mdb, scripts, now: Optional[datetime] = None, batch: int = 500, write_behind: bool = False,
+               missing_grace_seconds: int = MISSING_GRACE_SECONDS,
+               missing_retries: int = MISSING_RETRIES) -> Dict[str, int]:
+    """Expire one batch of due bookings; returns {'claimed', 'expired', 'released_seats', 'deferred'}."""
+    now = now or datetime.utcnow()
+    r = scripts.redis
+    members = claim_due(scripts, epoch_ms(now), batch)
+    if not members:
+        return {'claimed': 0, 'expired': 0, 'released_seats': 0, 'deferred': 0}
+
+    screening_of, member_of = {}, {}
+    for m in members:
+        screening_id, _, booking_id = m.partition(':')
+        if ObjectId.is_valid(booking_id):
+            screening_of[ObjectId(booking_id)] = screening_id
+            member_of[ObjectId(booking_id)] = m
+    ids = list(screening_of)
+
+    result = mdb.bookings.update_many({'_id': {'$in': ids}, 'status': 'PENDING'},
+                                      {'$set': {'status': 'EXPIRED', 'expired_at': now}})
+    # re-read rather than trust the update count: a repeated batch must release seats again
+    found = {b['_id']: b for b in mdb.bookings.find({'_id': {'$in': ids}}, {'status': 1, 'seat_labels': 1})}
+    expired = [i for i in ids if i in found and found[i]['status'] == 'EXPIRED']
+    if expired:
+        mdb.booking_seats.delete_many({'booking_id': {'$in': expired}})
+
+    release: Dict[str, Dict[str, List[str]]] = {}
+    legacy = [i for i in expired if 'seat_labels' not in found[i]]
+    seats = {i: found[i]['seat_labels'] for i in expired if i not in legacy}
+    if legacy:
+        for s in mdb.booking_seats.find({'booking_id': {'$in': legacy}}, {'booking_id': 1, 'seat_label': 1}):
+            seats.setdefault(s['booking_id'], []).append(s['seat_label'])
+    missing = [i for i in ids if i not in found]
+    deferred = set()
+    if missing and write_behind:
+        # the booking may still be queued for the writer; give it time to land before freeing its seats
+        deferred = set(_defer_missing(r, [member_of[i] for i in missing], epoch_ms(now),
+                                      missing_grace_seconds * 1000, missing_retries))
+    for i in missing:
+        if member_of[i] not in deferred:
+            seats[i] = _reserved_labels(r, screening_of[i], str(i))
+    for i, labels in seats.items():
+        release.setdefault(screening_of[i], {})[str(i)] = labels
+    released = release_seats_many(scripts, release)
+
+    done = [m for m in members if m not in deferred]
+    if done:
+        pipe = r.pipeline(transaction=False)
+        pipe.zrem(DEADLINES_KEY, *done)
+        pipe.hdel(MISSING_KEY, *done)
+        pipe.execute()
+    return {'claimed': len(members), 'expired': result.modified_count, 'released_seats': len(released),
+            'deferred': len(deferred)}
+
+
+def run_forever(mdb, scripts, batch: int = 500, interval: float = 1.0,
+                stop: Optional[threading.Event] = None, **expire_kwargs) -> None:
+    """Drain due deadlines; sleep `interval` seconds whenever a batch comes back short."""
+    log.info("expiring bookings from %s", DEADLINES_KEY)
+    while not (stop and stop.is_set()):
+        try:
+            counts = expire_due(mdb, scripts, batch=batch, **expire_kwargs)
+        except Exception:
+            log.exception("booking expiry batch failed; claimed entries retry after the lease")
+            time.sleep(interval)
+            continue
+        if counts['expired']:
+            log.info("expired %d bookings, released %d seats", counts['expired'], counts['released_seats'])
+        if counts['claimed'] < batch:
+            time.sleep(interval)
+
+
+def main():
+    from common import connect_stores
+    from scripts import LuaScripts
+
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+    _, mdb, r = connect_stores()
+    run_forever(mdb, LuaScripts(r),
+                batch=int(os.environ.get('BOOKING_EXPIRY_BATCH', 500)),
+                interval=float(os.environ.get('BOOKING_EXPIRY_INTERVAL_SECONDS', 1.0)),
+                write_behind=os.environ.get('BOOKING_WRITE_BEHIND', '0') == '1',
+                missing_grace_seconds=int(os.environ.get('BOOKING_EXPIRY_MISSING_GRACE_SECONDS', MISSING_GRACE_SECONDS)),
+                missing_retries=int(os.environ.get('BOOKING_EXPIRY_MISSING_RETRIES', MISSING_RETRIES)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# app/booking_writer.py
+"""
+Write-behind persistence for confirmed bookings.
+
+With BOOKING_WRITE_BEHIND=1, /bookings/confirm appends the booking to the Redis stream
+bookings:writes right after confirm_reserve.lua succeeds and answers 202 without touching
+Mongo. This module's consumer group drains the stream and writes bookings and booking_seats
+with one unordered bulk_write per collection per batch. Writes are idempotent upserts, so a
+retried batch cannot duplicate anything.
+
+Run one or more consumers next to the API:
+
+    python booking_writer.py
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import json_util
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from streams import StreamConsumer, Entry
+
+log = logging.getLogger(__name__)
+
+BOOKING_STREAM = 'bookings:writes'
+BOOKING_GROUP = 'booking-writers'
+STREAM_MAXLEN = 1_000_000
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+
+_JSON_OPTIONS = json_util.JSONOptions(tz_aware=False)
+
+
+def idempotency_key_name(owner: str, idempotency_key: str) -> str:
+    return f"idem:{owner}:{idempotency_key}"
+
+
+def enqueue_booking(r, booking_doc: dict, idempotency_key: Optional[str] = None) -> Optional[str]:
+    """
+    Append a booking (with its seat_labels) to the write-behind stream; returns the entry id.
+    When an idempotency key is given it is claimed in Redis first (SET NX), since Mongo may not
+    have the booking yet when the client retries. Returns None, and queues nothing, if the key
+    is already taken by an earlier or concurrent request of the same user.
+    """
+    key = idempotency_key_name(str(booking_doc['user_id']), idempotency_key) if idempotency_key else None
+    if key and not r.set(key, str(booking_doc['_id']), nx=True, ex=IDEMPOTENCY_TTL_SECONDS):
+        return None
+    try:
+        return r.xadd(BOOKING_STREAM, {'booking': json_util.dumps(booking_doc)},
+                      maxlen=STREAM_MAXLEN, approximate=True)
+    except Exception:
+        if key:
+            r.delete(key)
+        raise
+
+
+def _write_errors(exc: BulkWriteError, owners: List[str]) -> Dict[str, str]:
+    return {owners[e['index']]: e.get('errmsg', 'write error') for e in exc.details.get('writeErrors', [])}
+
+
+def persist_bookings(mdb, entries: List[Entry]) -> Dict[str, str]:
+    """
+    Stream handler: upsert a batch of bookings and their seats. Returns {entry_id: reason} for
+    entries that failed; connection-level errors propagate so the whole batch is retried.
+    """
+    failures: Dict[str, str] = {}
+    booking_ops, booking_owners, docs = [], [], {}
+    for entry_id, fields in entries:
+        try:
+            doc = json_util.loads(fields['booking'], json_options=_JSON_OPTIONS)
+        except (KeyError, ValueError) as e:
+            failures[entry_id] = f'bad payload: {e}'
+            continue
+        docs[entry_id] = doc
+        booking_ops.append(UpdateOne({'_id': doc['_id']}, {'$setOnInsert': doc}, upsert=True))
+        booking_owners.append(entry_id)
+
+    if booking_ops:
+        try:
+            mdb.bookings.bulk_write(booking_ops, ordered=False)
+        except BulkWriteError as e:
+            failures.update(_write_errors(e, booking_owners))
+
+    seat_ops, seat_owners = [], []
+    for entry_id, doc in docs.items():
+        if entry_id in failures:
+            continue
+        for label in doc.get('seat_labels') or []:
+            seat = {'booking_id': doc['_id'], 'screening_id': doc['screening_id'], 'seat_label': label}
+            seat_ops.append(UpdateOne(seat, {'$setOnInsert': {**seat, 'created_at': doc['created_at']}}, upsert=True))
+            seat_owners.append(entry_id)
+
+    if seat_ops:
+        try:
+            mdb.booking_seats.bulk_write(seat_ops, ordered=False)
+        except BulkWriteError as e:
+            failures.update(_write_errors(e, seat_owners))
+
+    # bookings of screenings cancelled before they landed were missed by cancel_screening
+    screening_ids = list({doc['screening_id'] for doc in docs.values()})
+    cancelled = {s['_id'] for s in mdb.screenings.find({'_id': {'$in': screening_ids}, 'status': 'CANCELLED'},
+                                                        {'_id': 1})}
+    stranded = [doc['_id'] for doc in docs.values() if doc['screening_id'] in cancelled]
+    if stranded:
+        mdb.bookings.update_many({'_id': {'$in': stranded}, 'status': 'PENDING'},
+                                 {'$set': {'status': 'CANCELLED', 'cancelled_at': datetime.utcnow()}})
+        mdb.booking_seats.delete_many({'booking_id': {'$in': stranded}})
+
+    return failures
+
+
+def make_consumer(r, mdb, **kwargs) -> StreamConsumer:
+    return StreamConsumer(r, BOOKING_STREAM, BOOKING_GROUP, lambda entries: persist_bookings(mdb, entries),
+                          **kwargs)
+
+
+def main():
+    from common import connect_stores
+
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+    _, mdb, r = connect_stores()
+    consumer = make_consumer(
+        r, mdb,
+        batch_size=int(os.environ.get('BOOKING_WRITER_BATCH', 200)),
+        max_deliveries=int(os.environ.get('BOOKING_WRITER_MAX_DELIVERIES', 5)),
+        min_idle_ms=int(os.environ.get('BOOKING_WRITER_RETRY_IDLE_MS', 30000)),
+    )
+    consumer.run_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+-- app/cancel_seat_state.lua
+-- Close a cancelled screening's seat hash to any further holds or sales.
+-- KEYS = [ seats_hash ]              -- screening:{<screening_id>}:seats
+-- ARGV = [ events_channel ]
+-- Sets the "_cancelled" marker field (seat_state.CANCELLED_FIELD). hold_seats.lua,
+-- hold_confirm.lua and confirm_reserve.lua refuse with "-2" once it is present, and
+-- rebuild_seats.lua leaves the hash alone, so a request that passed the Mongo status check just
+-- before the cancel still cannot take a seat. "C|" is published on events_channel.
+-- Return:
+--   { "1" }
+
+redis.call('HSET', KEYS[1], '_cancelled', '1')
+redis.call('PUBLISH', ARGV[1], 'C|')
+return { "1" }
@@ -0,0 +1,24 @@
+-- app/claim_due_deadlines.lua
+-- Claim up to `limit` booking deadlines that are due, for one expiry worker.
+-- KEYS = [ deadlines_zset ]          -- bookings:deadlines (member "<screening_id>:<booking_id>")
+-- ARGV = [ now_ms, lease_ms, limit ]
+-- Claimed members are pushed to now_ms + lease_ms rather than removed: other workers skip
+-- them, and if this worker dies before ZREMing them they come due again after the lease.
+-- Return:
+--   { "1", member1, member2, ... }   (possibly no members)
+
+local now = tonumber(ARGV[1])
+local due = redis.call('ZRANGE', KEYS[1], '-inf', now, 'BYSCORE', 'LIMIT', 0, tonumber(ARGV[3]))
+if #due > 0 then
+	local zadd_args = {}
+	local lease_until = now + tonumber(ARGV[2])
+	for _, m in ipairs(due) do
+		table.insert(zadd_args, lease_until)
+		table.insert(zadd_args, m)
+	end
+	redis.call('ZADD', KEYS[1], 'XX', unpack(zadd_args))
+end
+
+local res = { "1" }
+for _, m in ipairs(due) do table.insert(res, m) end
+return res
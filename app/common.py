@@ -9,64 +9,94 @@ import redis
 
 # Reuse project's helpers
 from models_mongo import ensure_indexes, doc_to_json  # ensure_indexes and doc_to_json expected in models_mongo
+from scripts import LuaScripts
+from metrics import MongoCommandMetrics
 
 load_dotenv()
 
 
-def init_db_and_redis(app: Optional[object] = None) -> Tuple[MongoClient, object, redis.Redis, Optional[str]]:
+def _env_number(name: str, cast=int):
+    value = os.environ.get(name)
+    return cast(value) if value not in (None, '') else None
+
+
+def _set_options(**options) -> dict:
+    # only pass what was configured, so the drivers' own defaults apply otherwise
+    return {k: v for k, v in options.items() if v is not None}
+
+
+def connect_stores() -> Tuple[MongoClient, object, redis.Redis]:
     """
-    Initialize MongoClient, Mongo DB handle, Redis client, and load the hold_seats Lua script.
+    Create a MongoClient, its DB handle and a Redis client from env config, without touching
+    indexes or scripts. Used directly after a worker fork, where only fresh clients are needed.
 
-    Returns:
-        (mc, mdb, r, hold_sha)
-        - mc: pymongo.MongoClient
-        - mdb: database handle (mc[MONGO_DB_NAME])
-        - r: redis.Redis client
-        - hold_sha: SHA of the loaded Lua script or None if load failed
+    Pool sizes and timeouts (unset = driver default, except server selection, which fails
+    after 5s instead of 30s so a broken pod is noticed quickly):
+
+        MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        MONGO_CONNECT_TIMEOUT_MS, MONGO_SOCKET_TIMEOUT_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS
+        REDIS_MAX_CONNECTIONS, REDIS_SOCKET_TIMEOUT, REDIS_CONNECT_TIMEOUT (seconds),
+        REDIS_HEALTH_CHECK_INTERVAL (seconds)
     """
     MONGO_URI = os.environ.get('MONGO_URI')
     MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'movie_booking')
     REDIS_URL = os.environ.get('REDIS_URL', 'redis://redis:6379/0')
 
-    # Initialize Mongo
-    mc = MongoClient(MONGO_URI)
+    mongo_options = _set_options(
+        maxPoolSize=_env_number('MONGO_MAX_POOL_SIZE'),
+        minPoolSize=_env_number('MONGO_MIN_POOL_SIZE'),
+        serverSelectionTimeoutMS=_env_number('MONGO_SERVER_SELECTION_TIMEOUT_MS') or 5000,
+        connectTimeoutMS=_env_number('MONGO_CONNECT_TIMEOUT_MS'),
+        socketTimeoutMS=_env_number('MONGO_SOCKET_TIMEOUT_MS'),
+        waitQueueTimeoutMS=_env_number('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+    )
+    redis_options = _set_options(
+        max_connections=_env_number('REDIS_MAX_CONNECTIONS'),
+        socket_timeout=_env_number('REDIS_SOCKET_TIMEOUT', float),
+        socket_connect_timeout=_env_number('REDIS_CONNECT_TIMEOUT', float),
+        health_check_interval=_env_number('REDIS_HEALTH_CHECK_INTERVAL'),
+    )
+
+    mc = MongoClient(MONGO_URI, event_listeners=[MongoCommandMetrics()], **mongo_options)
     mdb = mc[MONGO_DB_NAME]
+    if os.environ.get('REDIS_CLUSTER', '0') == '1':
+        # seat/hold keys share a {screening_id} hash tag, so every script call is single-slot
+        r = redis.RedisCluster.from_url(REDIS_URL, decode_responses=True, **redis_options)
+    else:
+        r = redis.Redis.from_url(REDIS_URL, decode_responses=True, **redis_options)
+    return mc, mdb, r
 
-    # Create sparse unique index for idempotency_key (idempotency handling)
-    # This is idempotent: create_index will not duplicate the index if it already exists.
-    mdb.bookings.create_index(
-        'idempotency_key',
-        unique=True,
-        sparse=True,
-        background=True
-    )
 
-    # Initialize Redis
-    r = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+def init_db_and_redis(app: Optional[object] = None) -> Tuple[MongoClient, object, redis.Redis, LuaScripts]:
+    """
+    Initialize MongoClient, Mongo DB handle, Redis client, and preload every Lua script.
+    Indexes are not touched here; they belong to migrate_indexes.py (see ensure_indexes_db).
+
+    Returns:
+        (mc, mdb, r, scripts)
+        - mc: pymongo.MongoClient
+        - mdb: database handle (mc[MONGO_DB_NAME])
+        - r: redis.Redis client
+        - scripts: LuaScripts registry; scripts that could not be loaded yet are loaded on first use
+    """
+    mc, mdb, r = connect_stores()
 
-    # Load hold_seats.lua into Redis (if present)
-    lua_path = os.path.join(os.path.dirname(__file__), 'hold_seats.lua')
-    hold_sha = None
+    # Load every *.lua script into Redis up front
+    scripts = LuaScripts(r)
     try:
-        if os.path.exists(lua_path):
-            with open(lua_path, 'r') as fh:
-                lua_script = fh.read()
-            try:
-                hold_sha = r.script_load(lua_script)
-            except Exception:
-                # Script load may fail if Redis not reachable or scripts disabled; keep hold_sha as None
-                hold_sha = None
+        scripts.load_all()
     except Exception:
-        # Best-effort: do not raise here so callers can decide how to handle partial failures
-        hold_sha = None
+        # Best-effort: Redis may not be reachable yet; LuaScripts.run loads lazily on first call
+        pass
 
-    return mc, mdb, r, hold_sha
+    return mc, mdb, r, scripts
 
 
 def ensure_indexes_db(mdb) -> None:
     """
     Ensure application-specific indexes exist in the given MongoDB database handle.
 
-    Delegates to models_mongo.ensure_indexes for central index management.
+    Delegates to models_mongo.ensure_indexes for central index management. Run once per deploy
+    via migrate_indexes.py; create_app only calls it when MONGO_ENSURE_INDEXES=1 (dev server).
     """
     ensure_indexes(mdb)
\ No newline at end of file
@@ -1,44 +1,73 @@
 -- app/confirm_reserve.lua
--- KEYS = [ key1, key2, ... ]
--- ARGV = [ hold_id, owner, booking_id, reserve_ttl_seconds(optional) ]
+-- KEYS = [ seats_hash, hold_key ]    -- screening:{<screening_id>}:seats, hold:{<screening_id>}:<hold_id>
+-- ARGV = [ hold_id, owner, booking_id, reserve_ttl_seconds(optional, "" for none), screening_id, events_channel ]
 -- Behavior:
---   - Ensures each key's current value == "<hold_id>|<owner>"
---   - If all match, sets each key to "RESERVED:<booking_id>" and optional TTL
---   - If any mismatch, does not change any key and returns list of mismatches
+--   - Resolves the seats from the hold registry written by hold_seats.lua; the hold must
+--     belong to owner and to screening_id
+--   - Ensures each seat's field value == "<hold_id>|<owner>"
+--   - If all match, sets each field to "RESERVED:<booking_id>" with the optional per-field TTL
+--     and deletes the hold registry entry
+--   - Publishes "R|label1,label2" on events_channel (seat_state.events_channel)
+--   - If any mismatch, does not change anything and returns list of mismatches
 -- Return:
---   { "1" } on success
---   { "0", <n_mismatch>, key1, key2, ... } on failure
+--   { "1", label1, label2, ... } on success
+--   { "0", <n_mismatch>, label1, label2, ... } on failure
+--   { "-1" } if the hold is unknown, expired, or not owned by owner
+--   { "-2" } if the screening was cancelled (cancel_seat_state.lua)
 
+local seats_key = KEYS[1]
+local hold_key = KEYS[2]
 local hold_id = ARGV[1]
 local owner = ARGV[2] or ""
 local booking_id = ARGV[3]
 local ttl = tonumber(ARGV[4])
+local screening_id = ARGV[5]
+local events_channel = ARGV[6]
+
+if redis.call('HEXISTS', seats_key, '_cancelled') == 1 then
+	return { "-2" }
+end
+
+local hold = redis.call('HMGET', hold_key, 'screening_id', 'seats', 'owner')
+if not hold[2] or hold[1] ~= screening_id or hold[3] ~= owner then
+	return { "-1" }
+end
 
 local expected = hold_id .. "|" .. owner
+local labels = {}
 local mismatches = {}
 
-for i, key in ipairs(KEYS) do
-	local cur = redis.call('GET', key)
+for label in string.gmatch(hold[2], "[^,]+") do
+	local cur = redis.call('HGET', seats_key, label)
 	if cur ~= expected then
-		table.insert(mismatches, key)
+		table.insert(mismatches, label)
 	end
+	table.insert(labels, label)
 end
 
 if #mismatches > 0 then
 	local res = { "0", tostring(#mismatches) }
-	for i, k in ipairs(mismatches) do table.insert(res, k) end
+	for i, l in ipairs(mismatches) do table.insert(res, l) end
 	return res
 end
 
--- All matched, set reserved values
-for i, key in ipairs(KEYS) do
+if #labels > 0 then
 	local reserved_val = "RESERVED:" .. booking_id
+	local hset_args = {}
+	for i, l in ipairs(labels) do
+		table.insert(hset_args, l)
+		table.insert(hset_args, reserved_val)
+	end
+	redis.call('HSET', seats_key, unpack(hset_args))
 	if ttl then
-		redis.call('SET', key, reserved_val)
-		redis.call('EXPIRE', key, ttl)
+		redis.call('HEXPIRE', seats_key, ttl, 'FIELDS', #labels, unpack(labels))
 	else
-		redis.call('SET', key, reserved_val)
+		redis.call('HPERSIST', seats_key, 'FIELDS', #labels, unpack(labels))
 	end
 end
+redis.call('DEL', hold_key)
+redis.call('PUBLISH', events_channel, 'R|' .. table.concat(labels, ','))
 
-return { "1" }
\ No newline at end of file
+local res = { "1" }
+for i, l in ipairs(labels) do table.insert(res, l) end
+return res
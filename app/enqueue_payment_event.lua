@@ -0,0 +1,16 @@
+-- app/enqueue_payment_event.lua
+-- Deduplicate a payment-provider webhook event by its event id and queue it, in one round trip.
+-- KEYS = [ seen_key, stream ]        -- {payments}:seen:<event_id>, {payments}:events
+-- ARGV = [ seen_ttl_seconds, stream_maxlen, field1, value1, field2, value2, ... ]
+-- The event is appended to the stream (approximate MAXLEN) only if its id was not seen within
+-- seen_ttl_seconds; the marker and the entry are written together, so a retried delivery can
+-- never be dropped as a duplicate of an event that was not queued.
+-- Return:
+--   { "1" }   queued
+--   { "0" }   duplicate, nothing written
+
+if redis.call('SET', KEYS[1], '1', 'NX', 'EX', tonumber(ARGV[1])) == false then
+	return { "0" }
+end
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', unpack(ARGV, 3))
+return { "1" }
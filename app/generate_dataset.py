@@ -0,0 +1,286 @@
+# app/generate_dataset.py
+"""
+Generate a synthetic dataset at production scale for load testing.
+
+    python generate_dataset.py --movies 500 --theaters 50 --auditoriums 8 \\
+        --screenings 20000 --users 100000 --bookings 200000 --seed 42
+
+The counts are: movies; theaters; auditoriums per theater, each with a 200-800 seat layout
+(--min-seats/--max-seats); screenings spread over --days days starting today (UTC); users;
+and confirmed bookings of 1-6 adjacent seats each.
+
+Mongo receives chunked insert_many(ordered=False) batches. Redis gets every screening's seat
+hash, with booked seats already RESERVED:<booking_id>, through chunked pipelines. Everything,
+ObjectIds included, is drawn from one seeded RNG, so the same arguments and --start-date
+give the same dataset. Re-running skips documents that already exist instead of duplicating
+them. Every generated user has the password given by --password.
+
+Each phase reports how many documents it wrote and how fast.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from werkzeug.security import generate_password_hash
+
+from seat_state import seats_key
+
+ROW_WIDTHS = range(16, 31)              # seats per row
+SHOW_HOURS = (10, 13, 16, 19, 22)       # daily slots per auditorium
+GENRES = ['Drama', 'Comedy', 'Action', 'Horror', 'Sci-Fi', 'Animation', 'Documentary', 'Thriller']
+WORDS = ['Night', 'Last', 'River', 'Iron', 'Silent', 'Golden', 'Empire', 'Summer', 'Ghost', 'Storm',
+         'Lost', 'City', 'Dream', 'Shadow', 'Fire', 'Winter', 'Secret', 'Star', 'Wild', 'Glass']
+
+
+class Phase:
+    """Counts what one phase wrote and prints its throughput."""
+
+    def __init__(self, name: str, out=sys.stdout):
+        self.name = name
+        self.out = out
+        self.inserted = 0
+        self.skipped = 0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            secs = time.perf_counter() - self.t0
+            rate = self.inserted / secs if secs else 0.0
+            extra = f" ({self.skipped} already present)" if self.skipped else ""
+            print(f"{self.name:<14} {self.inserted:>10,} in {secs:7.2f}s {rate:>12,.0f}/s{extra}", file=self.out)
+
+
+class DatasetGenerator:
+    def __init__(self, mdb, r, seed: int = 0, chunk: int = 1000, start_date: date = None,
+                 password: str = 'password', out=sys.stdout):
+        self.mdb = mdb
+        self.r = r
+        self.rng = random.Random(seed)
+        self.chunk = chunk
+        self.start = datetime.combine(start_date or datetime.utcnow().date(), datetime.min.time())
+        self.password = password
+        self.out = out
+
+    # helpers -------------------------------------------------------------------
+
+    def oid(self) -> ObjectId:
+        return ObjectId(self.rng.getrandbits(96).to_bytes(12, 'big'))
+
+    def _insert(self, collection, docs: Iterable[dict], phase: Phase) -> None:
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= self.chunk:
+                self._flush(collection, batch, phase)
+                batch = []
+        if batch:
+            self._flush(collection, batch, phase)
+
+    @staticmethod
+    def _flush(collection, batch: List[dict], phase: Phase) -> None:
+        try:
+            collection.insert_many(batch, ordered=False)
+            phase.inserted += len(batch)
+        except BulkWriteError as e:
+            dupes = sum(1 for err in e.details.get('writeErrors', []) if err.get('code') == 11000)
+            if dupes != len(e.details.get('writeErrors', [])):
+                raise
+            phase.inserted += e.details.get('nInserted', 0)
+            phase.skipped += dupes
+
+    @staticmethod
+    def layout(n_seats: int, rng: random.Random) -> List[List[str]]:
+        """Rows of seat labels: A1..A<w>, B1.. with row widths drawn from ROW_WIDTHS."""
+        rows, row = [], 0
+        while n_seats > 0:
+            width = min(rng.choice(ROW_WIDTHS), n_seats)
+            name = chr(ord('A') + row % 26) * (row // 26 + 1)
+            rows.append([f"{name}{c}" for c in range(1, width + 1)])
+            n_seats -= width
+            row += 1
+        return rows
+
+    # phases --------------------------------------------------------------------
+
+    def movies(self, n: int) -> List[ObjectId]:
+        ids = [self.oid() for _ in range(n)]
+
+        def docs():
+            for i, _id in enumerate(ids):
+                words = self.rng.sample(WORDS, self.rng.randint(1, 3))
+                yield {'_id': _id, 'title': f"{' '.join(words)} {i}", 'description': 'Synthetic movie',
+                       'genre': self.rng.choice(GENRES), 'runtime': self.rng.randint(80, 180),
+                       'rating': round(self.rng.uniform(1, 10), 1), 'poster_url': None,
+                       'created_at': self.start}
+
+        with Phase('movies', self.out) as phase:
+            self._insert(self.mdb.movies, docs(), phase)
+        return ids
+
+    def theaters(self, n: int, per_theater: int, min_seats: int, max_seats: int) -> List[dict]:
+        theaters, auditoriums = [], []
+        for t in range(n):
+            theater = {'_id': self.oid(), 'name': f"Theater {t}", 'address': f"{t} Main St",
+                       'auditoriums': [], 'created_at': self.start}
+            for a in range(per_theater):
+                rows = self.layout(self.rng.randint(min_seats, max_seats), self.rng)
+                aud = {'_id': self.oid(), 'theater_id': theater['_id'], 'name': f"Hall {a + 1}",
+                       'rows': len(rows), 'seats_layout': [{'label': s} for row in rows for s in row],
+                       'created_at': self.start}
+                theater['auditoriums'].append(aud['_id'])
+                auditoriums.append((aud, rows))
+            theaters.append(theater)
+
+        with Phase('theaters', self.out) as phase:
+            self._insert(self.mdb.theaters, theaters, phase)
+        with Phase('auditoriums', self.out) as phase:
+            self._insert(self.mdb.auditoriums, (a for a, _ in auditoriums), phase)
+        return [{'_id': a['_id'], 'rows': rows} for a, rows in auditoriums]
+
+    def screenings(self, n: int, movie_ids: List[ObjectId], auditoriums: List[dict], days: int) -> List[dict]:
+        """Round-robin over auditoriums, each filling its daily SHOW_HOURS slots in order."""
+        slots = days * len(SHOW_HOURS)
+        if n > slots * len(auditoriums):
+            raise SystemExit(f"{n} screenings do not fit in {len(auditoriums)} auditoriums x {slots} slots; "
+                             f"raise --days or --auditoriums")
+        out = []
+        for i in range(n):
+            aud = auditoriums[i % len(auditoriums)]
+            slot = i // len(auditoriums)
+            start = self.start + timedelta(days=slot // len(SHOW_HOURS), hours=SHOW_HOURS[slot % len(SHOW_HOURS)])
+            out.append({'_id': self.oid(), 'movie_id': self.rng.choice(movie_ids), 'auditorium_id': aud['_id'],
+                        'start_time': start, 'end_time': start + timedelta(hours=2, minutes=30),
+                        'language': 'en', 'price_policy_id': None, 'created_at': self.start,
+                        '_rows': aud['rows']})
+
+        with Phase('screenings', self.out) as phase:
+            self._insert(self.mdb.screenings,
+                         ({k: v for k, v in s.items() if k != '_rows'} for s in out), phase)
+        return out
+
+    def users(self, n: int) -> List[ObjectId]:
+        hashed = generate_password_hash(self.password)     # one KDF run shared by every user
+        ids = [self.oid() for _ in range(n)]
+        docs = ({'_id': _id, 'name': f"User {i}", 'email': f"user{i}@example.com", 'hashed_password': hashed,
+                 'role': 'customer', 'created_at': self.start, 'updated_at': self.start}
+                for i, _id in enumerate(ids))
+        with Phase('users', self.out) as phase:
+            self._insert(self.mdb.users, docs, phase)
+        return ids
+
+    def _bookings_for(self, screening: dict, count: int, user_ids: List[ObjectId],
+                      seat_state: Dict[str, str]) -> Iterator[tuple]:
+        """Up to `count` bookings of 1-6 adjacent free seats; marks them RESERVED in seat_state."""
+        rows = screening['_rows']
+        for _ in range(count):
+            size = self.rng.randint(1, 6)
+            for _attempt in range(10):
+                row = self.rng.choice(rows)
+                if len(row) < size:
+                    continue
+                first = self.rng.randrange(len(row) - size + 1)
+                labels = row[first:first + size]
+                if all(seat_state[s] == 'AVAILABLE' for s in labels):
+                    break
+            else:
+                continue    # screening too full for another group of this size
+            booking_id = self.oid()
+            for s in labels:
+                seat_state[s] = f"RESERVED:{booking_id}"
+            created = screening['start_time'] - timedelta(hours=self.rng.randint(1, 72))
+            booking = {'_id': booking_id, 'user_id': self.rng.choice(user_ids),
+                       'screening_id': screening['_id'], 'seat_labels': labels,
+                       'total_amount': 12.5 * size, 'status': 'CONFIRMED', 'created_at': created}
+            seats = [{'_id': self.oid(), 'booking_id': booking_id, 'screening_id': screening['_id'],
+                      'seat_label': s, 'created_at': created} for s in labels]
+            yield booking, seats
+
+    def bookings_and_seat_state(self, n: int, screenings: List[dict], user_ids: List[ObjectId]) -> None:
+        """Bookings, booking_seats and every screening's Redis seat hash, one screening at a time."""
+        per_screening = [0] * len(screenings)
+        if user_ids:
+            for _ in range(n):
+                per_screening[self.rng.randrange(len(screenings))] += 1
+
+        bookings, seat_docs = [], []
+        booking_phase, seat_phase = Phase('bookings', self.out), Phase('booking_seats', self.out)
+        redis_phase = Phase('redis seats', self.out)
+        pipe, queued = self.r.pipeline(transaction=False), 0
+        with booking_phase, seat_phase, redis_phase:
+            for screening, count in zip(screenings, per_screening):
+                state = {s: 'AVAILABLE' for row in screening['_rows'] for s in row}
+                for booking, seats in self._bookings_for(screening, count, user_ids, state):
+                    bookings.append(booking)
+                    seat_docs.extend(seats)
+                pipe.hset(seats_key(str(screening['_id'])), mapping=state)
+                queued += len(state)
+                redis_phase.inserted += len(state)
+                if queued >= self.chunk * 10:
+                    pipe.execute()
+                    queued = 0
+                if len(bookings) >= self.chunk:
+                    self._insert(self.mdb.bookings, bookings, booking_phase)
+                    self._insert(self.mdb.booking_seats, seat_docs, seat_phase)
+                    bookings, seat_docs = [], []
+            pipe.execute()
+            self._insert(self.mdb.bookings, bookings, booking_phase)
+            self._insert(self.mdb.booking_seats, seat_docs, seat_phase)
+
+    def run(self, movies: int, theaters: int, auditoriums: int, screenings: int, users: int,
+            bookings: int, days: int, min_seats: int, max_seats: int) -> None:
+        t0 = time.perf_counter()
+        movie_ids = self.movies(movies)
+        auds = self.theaters(theaters, auditoriums, min_seats, max_seats)
+        scrs = self.screenings(screenings, movie_ids, auds, days) if movie_ids and auds else []
+        user_ids = self.users(users)
+        if scrs:
+            self.bookings_and_seat_state(bookings, scrs, user_ids)
+        # cached catalog pages and day schedules no longer match Mongo
+        try:
+            from blueprints.movies import invalidate_catalog
+            from schedule import schedule_key
+            invalidate_catalog(self.r)
+            self.r.delete(*[schedule_key((self.start + timedelta(days=d)).date()) for d in range(days)])
+        except Exception as e:
+            print(f"cache invalidation skipped: {e}", file=self.out)
+        print(f"{'total':<14} {time.perf_counter() - t0:>21.2f}s", file=self.out)
+
+
+def main():
+    from common import connect_stores
+    from models_mongo import ensure_indexes
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--movies', type=int, default=100)
+    parser.add_argument('--theaters', type=int, default=10)
+    parser.add_argument('--auditoriums', type=int, default=6, help='auditoriums per theater')
+    parser.add_argument('--screenings', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--min-seats', type=int, default=200)
+    parser.add_argument('--max-seats', type=int, default=800)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=1000, help='documents per insert_many / pipeline batch')
+    parser.add_argument('--start-date', type=date.fromisoformat, help='first screening day (default: today, UTC)')
+    parser.add_argument('--password', default='password')
+    args = parser.parse_args()
+
+    _, mdb, r = connect_stores()
+    ensure_indexes(mdb)
+    gen = DatasetGenerator(mdb, r, seed=args.seed, chunk=args.chunk, start_date=args.start_date,
+                           password=args.password)
+    gen.run(args.movies, args.theaters, args.auditoriums, args.screenings, args.users, args.bookings,
+            args.days, args.min_seats, args.max_seats)
+
+
+if __name__ == '__main__':
+    main()
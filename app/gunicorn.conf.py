@@ -0,0 +1,85 @@
+# app/gunicorn.conf.py
+"""
+Gunicorn settings for the booking API, all overridable from the environment:
+
+    GUNICORN_BIND                 0.0.0.0:5000
+    GUNICORN_WORKERS              2 * CPU + 1
+    GUNICORN_THREADS              4           (gthread workers)
+    GUNICORN_WORKER_CLASS         gthread     or "gevent" for cooperative I/O
+    GUNICORN_WORKER_CONNECTIONS   1000        (gevent workers)
+    GUNICORN_TIMEOUT              30
+    GUNICORN_GRACEFUL_TIMEOUT     30
+    GUNICORN_KEEPALIVE            5
+    GUNICORN_MAX_REQUESTS         0           (0 = never recycle workers)
+
+Prometheus metrics run in multiprocess mode: PROMETHEUS_MULTIPROC_DIR (default
+/tmp/prometheus-multiproc) is emptied when the master starts and shared by all workers.
+
+The app is created once in the master (preload_app) and each worker re-creates its
+MongoClient / Redis client in post_fork, since neither may be shared across a fork.
+
+With the gevent worker, Redis and PyMongo sockets become cooperative, so a confirm/hold
+call waiting on Redis or Mongo yields instead of pinning an OS thread; this also lets
+long-lived SSE streams (/screenings/<id>/events) scale to many open connections.
+"""
+import multiprocessing
+import os
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before the app (and PyMongo/redis) is imported by preload_app in the master.
+    from gevent import monkey
+    monkey.patch_all()
+
+# must be set before prometheus_client is first imported (by the preloaded app)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/prometheus-multiproc')
+
+wsgi_app = 'wsgi:application'
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    # samples left over from a previous run would be merged into this one
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        os.remove(os.path.join(path, name))
+
+
+def post_fork(server, worker):
+    from wsgi import application
+    from app import reinit_after_fork
+
+    reinit_after_fork(application)
+    server.log.info("worker %s: re-created Mongo/Redis clients after fork", worker.pid)
+
+
+def worker_exit(server, worker):
+    from wsgi import application
+
+    # stop this worker's password-hashing processes along with it
+    application.password_hasher.shutdown()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
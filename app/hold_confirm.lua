@@ -0,0 +1,89 @@
+-- app/hold_confirm.lua
+-- Fused hold + confirm for instant-purchase flows: one round trip instead of hold_seats.lua
+-- followed by confirm_reserve.lua.
+-- KEYS = [ seats_hash, hold_key (only with a hold_id) ]
+--        screening:{<screening_id>}:seats, hold:{<screening_id>}:<hold_id>
+-- ARGV = [ owner, booking_id, reserve_ttl_seconds(optional, "" for none), hold_id ("" for none),
+--          events_channel, label1, label2, ... ]
+-- A seat can be bought if its field is missing, "AVAILABLE", or held by owner under the given
+-- hold_id ("<hold_id>|<owner>"). Seats under the owner's other holds are refused like anyone
+-- else's, so buying never takes seats out from under a hold the caller did not name.
+-- Nothing is written unless every seat qualifies.
+-- On success every field becomes "RESERVED:<booking_id>" and "R|labels" is published on
+-- events_channel (seat_state.events_channel). Bought seats are removed from the named hold's
+-- registry entry, which is deleted once it has no seats left.
+-- Return:
+--   { "1", label1, label2, ... } on success
+--   { "0", <n_unavailable>, label1, label2, ... } on failure
+--   { "-2" } if the screening was cancelled (cancel_seat_state.lua)
+
+local seats_key = KEYS[1]
+local hold_key = KEYS[2]
+local owner = ARGV[1] or ""
+local booking_id = ARGV[2]
+local ttl = tonumber(ARGV[3])
+local hold_id = ARGV[4] or ""
+local events_channel = ARGV[5]
+
+if redis.call('HEXISTS', seats_key, '_cancelled') == 1 then
+	return { "-2" }
+end
+
+local hold_val = nil
+if hold_id ~= "" then
+	hold_val = hold_id .. "|" .. owner
+end
+local labels = {}
+local unavailable = {}
+for i = 6, #ARGV do
+	local label = ARGV[i]
+	local cur = redis.call('HGET', seats_key, label)
+	if cur and cur ~= "AVAILABLE" and cur ~= hold_val then
+		table.insert(unavailable, label)
+	end
+	table.insert(labels, label)
+end
+
+if #unavailable > 0 then
+	local res = { "0", tostring(#unavailable) }
+	for i, l in ipairs(unavailable) do table.insert(res, l) end
+	return res
+end
+
+if #labels > 0 then
+	local reserved_val = "RESERVED:" .. booking_id
+	local hset_args = {}
+	for i, l in ipairs(labels) do
+		table.insert(hset_args, l)
+		table.insert(hset_args, reserved_val)
+	end
+	redis.call('HSET', seats_key, unpack(hset_args))
+	if ttl then
+		redis.call('HEXPIRE', seats_key, ttl, 'FIELDS', #labels, unpack(labels))
+	else
+		redis.call('HPERSIST', seats_key, 'FIELDS', #labels, unpack(labels))
+	end
+	redis.call('PUBLISH', events_channel, 'R|' .. table.concat(labels, ','))
+
+	if hold_key then
+		local reg = redis.call('HMGET', hold_key, 'owner', 'seats')
+		local held = reg[2]
+		if reg[1] == owner and held then
+			local bought = {}
+			for i, l in ipairs(labels) do bought[l] = true end
+			local rest = {}
+			for l in string.gmatch(held, "[^,]+") do
+				if not bought[l] then table.insert(rest, l) end
+			end
+			if #rest == 0 then
+				redis.call('DEL', hold_key)
+			else
+				redis.call('HSET', hold_key, 'seats', table.concat(rest, ","))
+			end
+		end
+	end
+end
+
+local res = { "1" }
+for i, l in ipairs(labels) do table.insert(res, l) end
+return res
@@ -1,44 +1,93 @@
 -- app/hold_seats.lua
 -- Usage:
--- KEYS = [ key1, key2, ... ]
--- ARGV = [ hold_id, ttl_seconds, owner ]
--- Sets each key's value to "<hold_id>|<owner>" if current value == "AVAILABLE" OR equals current hold value (idempotent).
+-- KEYS = [ seats_hash, hold_key ]    -- screening:{<screening_id>}:seats, hold:{<screening_id>}:<hold_id>
+-- ARGV = [ hold_id, ttl_seconds, owner, screening_id, events_channel, label1, label2, ... ]
+-- Seat state lives in one hash per screening (field = seat label). A seat can be held if its
+-- field is missing, "AVAILABLE", or already equals "<hold_id>|<owner>" (idempotent re-hold).
+-- Nothing is written unless every requested seat can be held. Held fields get a per-field TTL
+-- (HEXPIRE, Redis >= 7.4) so an abandoned hold reverts to missing == AVAILABLE.
+-- On success the hold registry hash hold_key = { screening_id, seats, owner, expires_at }
+-- is written with the same TTL, so confirm can resolve a hold_id without client-sent seats.
+-- Newly held seats are announced on events_channel (seat_state.events_channel) as "H|label1,label2".
 -- Returns:
---   { "1" } on success
---   { "0", <n_unavailable>, key1, key2, ... } on failure
+--   { "1", <expires_at_epoch_seconds> } on success
+--   { "0", <n_unavailable>, label1, label2, ... } on failure
+--   { "-1" } if hold_id is already registered to a different owner
+--   { "-2" } if the screening was cancelled (cancel_seat_state.lua)
 
+local seats_key = KEYS[1]
+local hold_key = KEYS[2]
 local hold_id = ARGV[1]
 local ttl = tonumber(ARGV[2]) or 600
 local owner = ARGV[3] or ""
+local screening_id = ARGV[4]
+local events_channel = ARGV[5]
+
+if redis.call('HEXISTS', seats_key, '_cancelled') == 1 then
+	return { "-2" }
+end
 
 local hold_val = hold_id .. "|" .. owner
 
+local prev = redis.call('HMGET', hold_key, 'owner', 'seats')
+if prev[1] and prev[1] ~= owner then
+	return { "-1" }
+end
+
+local labels = {}
 local unavailable = {}
-for i, key in ipairs(KEYS) do
-	local cur = redis.call('GET', key)
-	if not cur then
-	-- treat missing as AVAILABLE and set hold
-		redis.call('SET', key, hold_val)
-		redis.call('EXPIRE', key, ttl)
-	else
-		if cur == "AVAILABLE" then
-			redis.call('SET', key, hold_val)
-			redis.call('EXPIRE', key, ttl)
-		else
-		-- If cur already equals our hold_val, allow (idempotent re-hold by same hold_id+owner)
-			if cur == hold_val then
-				redis.call('EXPIRE', key, ttl)
-			else
-				table.insert(unavailable, key)
-			end
-		end
+for i = 6, #ARGV do
+	local label = ARGV[i]
+	local cur = redis.call('HGET', seats_key, label)
+	if cur and cur ~= "AVAILABLE" and cur ~= hold_val then
+		table.insert(unavailable, label)
 	end
+	table.insert(labels, label)
 end
 
-if #unavailable == 0 then
-	return { "1" }
-else
+if #unavailable > 0 then
 	local res = { "0", tostring(#unavailable) }
-	for i, k in ipairs(unavailable) do table.insert(res, k) end
+	for i, l in ipairs(unavailable) do table.insert(res, l) end
 	return res
-end
\ No newline at end of file
+end
+
+-- a re-hold under the same hold_id keeps the seats it already had
+local all_labels = {}
+local seen = {}
+if prev[2] then
+	for l in string.gmatch(prev[2], "[^,]+") do
+		if redis.call('HGET', seats_key, l) == hold_val then
+			seen[l] = true
+			table.insert(all_labels, l)
+		end
+	end
+end
+for i, l in ipairs(labels) do
+	if not seen[l] then
+		seen[l] = true
+		table.insert(all_labels, l)
+	end
+end
+
+if #labels > 0 then
+	local hset_args = {}
+	for i, l in ipairs(labels) do
+		table.insert(hset_args, l)
+		table.insert(hset_args, hold_val)
+	end
+	redis.call('HSET', seats_key, unpack(hset_args))
+	redis.call('HEXPIRE', seats_key, ttl, 'FIELDS', #all_labels, unpack(all_labels))
+end
+
+local now = redis.call('TIME')
+local expires_at = tonumber(now[1]) + ttl
+redis.call('DEL', hold_key)
+redis.call('HSET', hold_key,
+	'screening_id', screening_id,
+	'seats', table.concat(all_labels, ","),
+	'owner', owner,
+	'expires_at', tostring(expires_at))
+redis.call('EXPIRE', hold_key, ttl)
+redis.call('PUBLISH', events_channel, 'H|' .. table.concat(labels, ','))
+
+return { "1", tostring(expires_at) }
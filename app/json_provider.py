@@ -0,0 +1,129 @@
+# app/json_provider.py
+"""
+Flask JSON provider that understands Mongo documents.
+
+ObjectIds (at any depth) become hex strings and datetimes become ISO 8601. Naive datetimes
+are UTC throughout this app, so they get a "Z" suffix: "2025-05-01T18:00:00Z". Handlers can
+jsonify documents straight from pymongo; doc_to_json only renames _id.
+
+orjson is used when installed and is several times faster than the stdlib encoder. Without it,
+the stdlib json module produces the same output. benchmarks/json_serialization.py compares
+this against the previous doc_to_json + jsonify path.
+
+stream_json_page() writes a page of list results to the client while the Mongo cursor is
+still being read, so list endpoints never hold a whole page of encoded documents in memory.
+The status line goes out before the cursor is drained, so a cursor error after the first
+document cannot become a 500: the page is closed early with "incomplete": true and a
+next_cursor that resumes after the last document sent, and the error is logged.
+"""
+import json
+import logging
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Callable, Iterable, Optional
+
+from bson import ObjectId
+from flask import Response
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:     # optional: falls back to the stdlib encoder
+    orjson = None
+
+log = logging.getLogger(__name__)
+
+if orjson is not None:
+    # datetimes go through _orjson_default, so both encoders format them with _iso: orjson's own
+    # format keeps an aware datetime's offset where the stdlib path converts it to UTC
+    _ORJSON_OPTS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _iso(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        return dt.isoformat() + 'Z'
+    return dt.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _orjson_default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, datetime):
+        return _iso(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _stdlib_default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, datetime):
+        return _iso(o)
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_orjson_default, option=_ORJSON_OPTS)
+    return json.dumps(obj, default=_stdlib_default, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+class MongoJSONProvider(JSONProvider):
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def stream_json_page(key: str, docs: Iterable[dict], limit: int,
+                     next_cursor: Callable[[dict], str],
+                     transform: Optional[Callable[[dict], dict]] = None) -> Response:
+    """
+    Stream {"<key>": [...], "next_cursor": ...} from a cursor fetched with limit + 1. Items are
+    encoded one at a time as the cursor yields them; the extra document only signals that
+    another page exists, and next_cursor(last_sent_doc) becomes the page's continuation token.
+
+    The first document is read before the response starts, so a failing query still raises
+    here (and becomes a 500). A failure after that ends the page with "incomplete": true and
+    a next_cursor after the last document sent; clients must not treat such a page as final.
+    """
+    docs = iter(docs)
+    first = next(docs, None)
+
+    def generate():
+        yield b'{"' + key.encode() + b'":['
+        if first is None:
+            yield b'],"next_cursor":null}'
+            return
+        yield dumps_bytes(transform(first) if transform else first)
+        last, sent = first, 1
+        try:
+            for doc in docs:
+                if sent == limit:
+                    yield b'],"next_cursor":' + dumps_bytes(next_cursor(last)) + b'}'
+                    return
+                yield b',' + dumps_bytes(transform(doc) if transform else doc)
+                last, sent = doc, sent + 1
+        except Exception:
+            log.exception("streaming %s failed after %d items; page marked incomplete", key, sent)
+            yield b'],"next_cursor":' + dumps_bytes(next_cursor(last)) + b',"incomplete":true}'
+            return
+        yield b'],"next_cursor":null}'
+
+    return Response(generate(), mimetype='application/json')
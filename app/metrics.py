@@ -0,0 +1,143 @@
+# app/metrics.py
+"""
+Prometheus metrics for the API.
+
+    http_request_duration_seconds{blueprint,endpoint,method}    histogram
+    http_requests_total{blueprint,endpoint,method,status}       counter
+    redis_script_duration_seconds{script}                       histogram, one sample per EVALSHA
+    redis_script_calls_total{script,outcome}                    ok | conflict | rejected | noscript_reload | error
+    mongo_command_duration_seconds{command}                     histogram, from a PyMongo CommandListener
+    mongo_command_failures_total{command}                       counter
+    password_hash_pending / password_hash_rejected_total        hashing pool queue depth and shed load
+    jwt_cache_lookups_total{result}                             hit | miss
+
+Labels come from the matched route (endpoint name), never the raw path, so cardinality stays
+fixed. Under gunicorn, gunicorn.conf.py points PROMETHEUS_MULTIPROC_DIR at a scratch
+directory before the app is imported. Each worker then writes its samples to mmap'd files
+there, and /metrics merges them, so any worker can answer a scrape with totals for all
+workers.
+
+prometheus_client is optional: without it every metric is a no-op and /metrics returns 404.
+"""
+import os
+import time
+
+from flask import Response, g, request
+from pymongo import monitoring
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram
+except ImportError:     # optional dependency
+    prometheus_client = None
+
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+FAST_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, 1)
+
+
+class _Noop:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, *args):
+        pass
+
+    def inc(self, *args):
+        pass
+
+    def dec(self, *args):
+        pass
+
+
+if prometheus_client is not None:
+    HTTP_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by route',
+                             ['blueprint', 'endpoint', 'method'], buckets=LATENCY_BUCKETS)
+    HTTP_REQUESTS = Counter('http_requests_total', 'Responses by route and status',
+                            ['blueprint', 'endpoint', 'method', 'status'])
+    SCRIPT_LATENCY = Histogram('redis_script_duration_seconds', 'EVALSHA latency by script',
+                               ['script'], buckets=FAST_BUCKETS)
+    SCRIPT_CALLS = Counter('redis_script_calls_total', 'EVALSHA calls by script and outcome',
+                           ['script', 'outcome'])
+    MONGO_LATENCY = Histogram('mongo_command_duration_seconds', 'MongoDB command latency',
+                              ['command'], buckets=FAST_BUCKETS)
+    MONGO_FAILURES = Counter('mongo_command_failures_total', 'Failed MongoDB commands', ['command'])
+    HASH_PENDING = Gauge('password_hash_pending', 'Password hashes in flight or queued',
+                         multiprocess_mode='livesum')
+    HASH_REJECTED = Counter('password_hash_rejected_total', 'Password hashes refused with 503')
+    JWT_CACHE = Counter('jwt_cache_lookups_total', 'Verified-token cache lookups', ['result'])
+else:
+    HTTP_LATENCY = HTTP_REQUESTS = SCRIPT_LATENCY = SCRIPT_CALLS = _Noop()
+    MONGO_LATENCY = MONGO_FAILURES = HASH_PENDING = HASH_REJECTED = JWT_CACHE = _Noop()
+
+
+# Redis scripts ------------------------------------------------------------------
+
+_REPLY_OUTCOMES = {'1': 'ok', '0': 'conflict', '-1': 'rejected', '-2': 'rejected'}
+
+
+def script_outcome(reply) -> str:
+    """Map a script reply onto an outcome label: the repo's scripts lead with "1", "0", "-1" or "-2"."""
+    if isinstance(reply, (list, tuple)):
+        return _REPLY_OUTCOMES.get(str(reply[0]), 'ok') if reply else 'ok'
+    if isinstance(reply, int):
+        return 'ok' if reply == 1 else 'rejected'
+    return 'ok'
+
+
+def observe_script(name: str, seconds: float, outcome: str) -> None:
+    SCRIPT_LATENCY.labels(name).observe(seconds)
+    SCRIPT_CALLS.labels(name, outcome).inc()
+
+
+# MongoDB ------------------------------------------------------------------------
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command from the driver's own started/succeeded events (no extra clock reads)."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_FAILURES.labels(event.command_name).inc()
+
+
+# Flask ----------------------------------------------------------------------------
+
+def _before():
+    g._metrics_t0 = time.perf_counter()
+
+
+def _after(response):
+    t0 = getattr(g, '_metrics_t0', None)
+    if t0 is not None and request.endpoint != 'metrics':
+        endpoint = request.endpoint or 'unmatched'
+        blueprint = request.blueprint or 'app'
+        HTTP_LATENCY.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - t0)
+        HTTP_REQUESTS.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+    return response
+
+
+def _exposition():
+    from prometheus_client import CollectorRegistry, generate_latest, multiprocess, REGISTRY
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def init_app(app) -> None:
+    app.before_request(_before)
+    app.after_request(_after)
+
+    @app.route('/metrics', methods=['GET'], endpoint='metrics')
+    def metrics():
+        if prometheus_client is None:
+            return Response('prometheus_client not installed\n', status=404, mimetype='text/plain')
+        return _exposition()
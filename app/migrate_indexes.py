@@ -0,0 +1,71 @@
+# app/migrate_indexes.py
+"""
+One-shot schema step, run once per deploy before the API starts:
+
+    python migrate_indexes.py
+    python migrate_indexes.py --rebuild-review-summaries
+
+Creates every Mongo index (models_mongo.ensure_indexes) and SCRIPT LOADs the Lua scripts.
+It also backfills review_summaries from the reviews collection when there are reviews but no
+summaries yet (the first deploy with summaries); --rebuild-review-summaries recomputes them
+all, e.g. after fixing reviews by hand.
+Workers no longer do this on boot, so a rolling deploy does not send N identical
+createIndexes calls at the primary and cold start does not wait on them. Safe to re-run:
+existing indexes and scripts are left as they are. Exits non-zero on failure, so
+orchestration (docker compose depends_on: service_completed_successfully, a Kubernetes Job)
+can hold the rollout.
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+
+def backfill_review_summaries(mdb, force: bool = False) -> Optional[int]:
+    """Rebuild review_summaries if forced or still empty; returns the summaries written, or None if skipped."""
+    from blueprints.reviews import rebuild_review_summaries
+
+    if not force and (mdb.review_summaries.find_one({}, {'_id': 1}) or not mdb.reviews.find_one({}, {'_id': 1})):
+        return None
+    return rebuild_review_summaries(mdb)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rebuild-review-summaries', action='store_true',
+                        help='recompute every review summary, even if some exist')
+    args = parser.parse_args(argv or [])
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    log = logging.getLogger('migrate_indexes')
+
+    from common import connect_stores, ensure_indexes_db
+    from scripts import LuaScripts
+
+    mc, mdb, r = connect_stores()
+    try:
+        t0 = time.perf_counter()
+        ensure_indexes_db(mdb)
+        log.info("mongo indexes ensured on %s in %.2fs", mdb.name, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        shas = LuaScripts(r).load_all()
+        log.info("loaded %d lua scripts in %.2fs", len(shas), time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        written = backfill_review_summaries(mdb, force=args.rebuild_review_summaries)
+        if written is not None:
+            log.info("rebuilt %d review summaries in %.2fs", written, time.perf_counter() - t0)
+    except Exception:
+        log.exception("migration failed")
+        return 1
+    finally:
+        mc.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
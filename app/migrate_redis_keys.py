@@ -0,0 +1,139 @@
+# app/migrate_redis_keys.py
+"""
+Rewrite seat/hold keys from the older schemes into the hash-tagged, cluster-safe layout:
+
+    screening:<sid>:seat:<label>   (string per seat)   -> field <label> of screening:{<sid>}:seats
+    screening:<sid>:seats          (untagged hash)     -> screening:{<sid>}:seats
+    hold:<sid>:<hold_id>           (untagged registry) -> hold:{<sid>}:<hold_id>
+
+Remaining TTLs are carried over (per field for seats). Old keys are deleted once copied.
+Run it against the current standalone Redis before pointing the app at a cluster, ideally
+with traffic paused so no hold lands on an old key mid-migration:
+
+    python migrate_redis_keys.py --dry-run
+    python migrate_redis_keys.py
+"""
+import argparse
+import os
+import time
+
+import redis
+from dotenv import load_dotenv
+
+from seat_state import seats_key, hold_key
+
+SCAN_COUNT = 1000
+BATCH = 500
+
+
+def _parse(key: str):
+    """Return (kind, screening_id, extra) for an old-style key, or None if already migrated/unknown."""
+    parts = key.split(':')
+    if parts[0] == 'screening' and '{' not in parts[1]:
+        if len(parts) == 4 and parts[2] == 'seat':
+            return 'seat', parts[1], parts[3]
+        if len(parts) == 3 and parts[2] == 'seats':
+            return 'seats', parts[1], None
+    if parts[0] == 'hold' and len(parts) == 3 and '{' not in parts[1]:
+        return 'hold', parts[1], parts[2]
+    return None
+
+
+def _migrate_batch(src, dst, batch, dry_run: bool) -> dict:
+    counts = {'seat': 0, 'seats': 0, 'hold': 0}
+
+    # read values and key TTLs for the whole batch in one pipeline
+    pipe = src.pipeline(transaction=False)
+    for key, (kind, _, _) in batch:
+        if kind == 'seat':
+            pipe.get(key)
+        else:
+            pipe.hgetall(key)
+        pipe.pttl(key)
+    raw = pipe.execute()
+    values = list(zip(raw[0::2], raw[1::2]))
+
+    # seat hashes carry per-field TTLs; fetch them in a second pipeline
+    pipe = src.pipeline(transaction=False)
+    field_ttl_idx = []
+    for i, (key, (kind, _, _)) in enumerate(batch):
+        if kind == 'seats' and values[i][0]:
+            pipe.hpttl(key, *values[i][0].keys())
+            field_ttl_idx.append(i)
+    field_ttls = dict(zip(field_ttl_idx, pipe.execute())) if field_ttl_idx else {}
+
+    out = dst.pipeline(transaction=False)
+    old_keys = []
+    for i, (key, (kind, sid, extra)) in enumerate(batch):
+        value, ttl = values[i]
+        if not value:
+            continue
+        counts[kind] += 1
+        old_keys.append(key)
+        if dry_run:
+            continue
+        if kind == 'seat':
+            new_key = seats_key(sid)
+            out.hset(new_key, extra, value)
+            if ttl > 0:
+                out.hpexpire(new_key, ttl, extra)
+        elif kind == 'seats':
+            new_key = seats_key(sid)
+            out.hset(new_key, mapping=value)
+            for field, field_ttl in zip(value.keys(), field_ttls.get(i, [])):
+                if field_ttl > 0:
+                    out.hpexpire(new_key, field_ttl, field)
+        else:
+            new_key = hold_key(sid, extra)
+            out.hset(new_key, mapping=value)
+            if ttl > 0:
+                out.pexpire(new_key, ttl)
+    if not dry_run and old_keys:
+        out.execute()
+        src.delete(*old_keys)
+    return counts
+
+
+def migrate(src, dst=None, dry_run: bool = False) -> dict:
+    dst = dst or src
+    totals = {'seat': 0, 'seats': 0, 'hold': 0}
+    batch = []
+    for pattern in ('screening:*', 'hold:*'):
+        for key in src.scan_iter(match=pattern, count=SCAN_COUNT):
+            parsed = _parse(key)
+            if parsed:
+                batch.append((key, parsed))
+            if len(batch) >= BATCH:
+                for k, v in _migrate_batch(src, dst, batch, dry_run).items():
+                    totals[k] += v
+                batch = []
+    if batch:
+        for k, v in _migrate_batch(src, dst, batch, dry_run).items():
+            totals[k] += v
+    return totals
+
+
+def main():
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source-url', default=os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    parser.add_argument('--target-url', help='write migrated keys to another Redis (e.g. the new cluster)')
+    parser.add_argument('--target-cluster', action='store_true', help='target URL is a Redis Cluster')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    src = redis.Redis.from_url(args.source_url, decode_responses=True)
+    dst = None
+    if args.target_url:
+        cls = redis.RedisCluster if args.target_cluster else redis.Redis
+        dst = cls.from_url(args.target_url, decode_responses=True)
+
+    t0 = time.perf_counter()
+    totals = migrate(src, dst, dry_run=args.dry_run)
+    verb = 'would migrate' if args.dry_run else 'migrated'
+    print(f"{verb}: {totals['seat']} per-seat keys, {totals['seats']} seat hashes, "
+          f"{totals['hold']} hold entries in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
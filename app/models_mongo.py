@@ -6,9 +6,9 @@ from bson import ObjectId
 
 # Add this import near the top of the file
 try:
-    from auth import hash_password
+    from auth import REFRESH_EXPIRE_DAYS
 except ImportError:
-    from app.auth import hash_password
+    from app.auth import REFRESH_EXPIRE_DAYS
 
 # Helpers --------------------------------------------------------------------
 
@@ -21,15 +21,15 @@ def oid_str(o):
     return o
 
 def doc_to_json(doc: dict) -> dict:
+    """
+    Rename _id to id for API output. Nested ObjectIds and datetimes are left as they are;
+    json_provider.MongoJSONProvider encodes them.
+    """
     if not doc:
         return doc
     out = dict(doc)
     if '_id' in out:
-        out['id'] = str(out.pop('_id'))
-    # convert common ObjectId refs
-    for k, v in list(out.items()):
-        if isinstance(v, ObjectId):
-            out[k] = str(v)
+        out['id'] = out.pop('_id')
     return out
 
 # Factories ------------------------------------------------------------------
@@ -139,12 +139,31 @@ def make_review(user_id: ObjectId, movie_id: ObjectId, rating: int, comment: str
 
 def ensure_indexes(db):
     db.users.create_index('email', unique=True)
-    db.movies.create_index('title')
+    # keyset pagination of the catalog: sort field + _id tiebreaker (also serves descending order)
+    db.movies.create_index([('title', 1), ('_id', 1)])
+    db.movies.create_index([('rating', 1), ('_id', 1)])
     db.theaters.create_index('name')
     db.auditoriums.create_index([('theater_id', 1)])
     db.screenings.create_index([('auditorium_id', 1), ('start_time', 1)])
-    db.bookings.create_index([('user_id', 1)])
+    # showtimes by movie in a time window, and the per-day schedule's start_time range scan
+    db.screenings.create_index([('movie_id', 1), ('start_time', 1), ('_id', 1)])
+    db.screenings.create_index([('start_time', 1), ('_id', 1)])
+    # booking history: newest first per user, keyset-paginated on (created_at, _id)
+    db.bookings.create_index([('user_id', 1), ('created_at', -1), ('_id', -1)])
     db.bookings.create_index([('screening_id', 1)])
+    # idempotent booking retries, per user like the idem:<owner>:<key> Redis marker and the replay
+    # lookup; only bookings that carry a key are indexed. The old global index would still reject
+    # one user's key because another user had used it, so it is dropped.
+    if 'idempotency_key_1' in db.bookings.index_information():
+        db.bookings.drop_index('idempotency_key_1')
+    db.bookings.create_index([('user_id', 1), ('idempotency_key', 1)], unique=True,
+                             partialFilterExpression={'idempotency_key': {'$type': 'string'}})
     db.booking_seats.create_index([('screening_id', 1), ('seat_label', 1)], unique=True)
     db.payments.create_index([('booking_id', 1)])
-    db.reviews.create_index([('movie_id', 1), ('user_id', 1)])
\ No newline at end of file
+    db.reviews.create_index([('movie_id', 1), ('user_id', 1)])
+    # review feed: newest first per movie, keyset-paginated on (created_at, _id)
+    db.reviews.create_index([('movie_id', 1), ('created_at', -1), ('_id', -1)])
+    # only used by the Mongo refresh-token backend (REFRESH_TOKEN_STORE=mongo); the TTL index
+    # also clears out tokens written by older versions, which were never deleted
+    db.refresh_tokens.create_index('created_at', expireAfterSeconds=REFRESH_EXPIRE_DAYS * 24 * 3600)
+    db.refresh_tokens.create_index([('user_id', 1)])
\ No newline at end of file
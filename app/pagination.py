@@ -0,0 +1,80 @@
+# app/pagination.py
+"""
+Keyset ("seek") pagination helpers shared by the list endpoints.
+
+A cursor is the sort key of the last item on the previous page, e.g. (title, _id), serialized
+with bson's extended JSON so datetimes and ObjectIds round-trip, then base64url-encoded so
+clients treat it as opaque. The next page is "everything strictly after that key", which an
+index on the same fields answers without skipping over earlier pages.
+"""
+import base64
+from typing import Callable
+
+from bson import json_util
+from flask import request
+
+_JSON_OPTIONS = json_util.JSONOptions(tz_aware=False)
+
+
+class BadPageRequest(ValueError):
+    pass
+
+
+def encode_cursor(*values) -> str:
+    raw = json_util.dumps(list(values)).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json_util.loads(raw, json_options=_JSON_OPTIONS)
+    except Exception:
+        raise BadPageRequest('invalid cursor')
+    if not isinstance(values, list):
+        raise BadPageRequest('invalid cursor')
+    return values
+
+
+def page_args(default_limit: int, max_limit: int):
+    """(limit, raw_cursor, decoded_cursor_or_None) from the query string."""
+    try:
+        limit = min(max(int(request.args.get('limit', default_limit)), 1), max_limit)
+    except ValueError:
+        raise BadPageRequest('invalid limit')
+    raw = request.args.get('cursor') or None
+    return limit, raw, decode_cursor(raw) if raw else None
+
+
+def after_key(field: str, value, oid, direction: int) -> dict:
+    """
+    Filter for documents strictly after (value, oid) in (field, _id) order, both sorted in
+    `direction`. Mongo sorts null/missing lowest, which the null branches account for.
+    """
+    op = '$gt' if direction == 1 else '$lt'
+    tie = {field: value, '_id': {op: oid}}
+    if value is None:
+        return {'$or': [tie, {field: {'$ne': None}}]} if direction == 1 else tie
+    beyond = {field: {op: value}}
+    if direction == 1:
+        return {'$or': [beyond, tie]}
+    return {'$or': [beyond, tie, {field: None}]}
+
+
+def page_cursor(cursor_obj, field: str, direction: int, limit: int):
+    """Sort a pymongo cursor (already filtered with after_key()) on (field, _id) and fetch limit + 1."""
+    return cursor_obj.sort([(field, direction), ('_id', direction)]).limit(limit + 1)
+
+
+def next_cursor_for(field: str) -> Callable[[dict], str]:
+    return lambda doc: encode_cursor(doc.get(field), doc['_id'])
+
+
+def fetch_page(cursor_obj, field: str, direction: int, limit: int):
+    """page_cursor() materialized; returns (docs, next_cursor)."""
+    docs = list(page_cursor(cursor_obj, field, direction, limit))
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1].get(field), docs[-1]['_id'])
+    return docs, next_cursor
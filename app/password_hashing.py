@@ -0,0 +1,180 @@
+# app/password_hashing.py
+"""
+Password hashing off the request thread.
+
+werkzeug's KDFs are slow on purpose, and running them inline lets a login burst starve every
+other request in the worker. PasswordHasher runs them in a small process pool instead (the
+KDF holds the GIL, so threads would not help) and bounds the number of hashes in flight or
+queued. Past that bound it raises HasherBusy immediately, which the users blueprint turns into
+503 + Retry-After, rather than letting requests pile up behind the pool.
+
+The pool is created lazily on first use, so with gunicorn's preload_app each worker gets its
+own pool and the master never forks one.
+
+Hashes record their method ("scrypt:32768:8:1$salt$hash"); needs_rehash() compares that
+against PASSWORD_HASH_METHOD, with werkzeug's defaults filled in, so the cost can be raised and
+users migrate on their next login.
+
+    PASSWORD_HASH_METHOD        werkzeug method string (default scrypt:32768:8:1)
+    PASSWORD_HASH_WORKERS       pool processes per app worker; 0 hashes inline (tests, dev)
+    PASSWORD_HASH_MAX_PENDING   hashes in flight + queued before shedding load
+    PASSWORD_HASH_TIMEOUT       seconds to wait for a result before giving up
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Optional
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+from metrics import HASH_PENDING, HASH_REJECTED
+
+log = logging.getLogger(__name__)
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class HasherBusy(Exception):
+    """Too many hashes pending (or one timed out); retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__('password hasher busy')
+        self.retry_after = retry_after
+
+
+def method_tag(method: str) -> str:
+    """
+    The prefix generate_password_hash(..., method) writes, without running the KDF: werkzeug
+    fills in default parameters ("scrypt" -> "scrypt:32768:8:1", "pbkdf2" -> "pbkdf2:sha256:N").
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        args = ['32768', '8', '1']
+    elif name == 'pbkdf2':
+        args = (args or ['sha256'])[:1] + (args[1:] or [str(DEFAULT_PBKDF2_ITERATIONS)])
+    return ':'.join([name, *args])
+
+
+def _hash(plain: str, method: str) -> str:
+    return generate_password_hash(plain, method=method)
+
+
+def _verify(hashed: str, plain: str) -> bool:
+    return check_password_hash(hashed, plain)
+
+
+class PasswordHasher:
+    def __init__(self, method: str = DEFAULT_METHOD, workers: int = 2, max_pending: int = 32,
+                 timeout: float = 10.0):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.completed = 0
+        self.rejected = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._method_tag = method_tag(method)
+
+    @classmethod
+    def from_env(cls) -> 'PasswordHasher':
+        return cls(method=os.environ.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+                   workers=int(os.environ.get('PASSWORD_HASH_WORKERS', 2)),
+                   max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32)),
+                   timeout=float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10)))
+
+    # pool plumbing --------------------------------------------------------------
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                HASH_REJECTED.inc()
+                raise HasherBusy(retry_after=max(1, int(self.timeout)))
+            self._pending += 1
+        HASH_PENDING.inc()
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+        HASH_PENDING.dec()
+
+    def _submit(self, fn: Callable, *args):
+        """Run fn(*args) in the pool and return a future; the pending slot is freed when it finishes."""
+        self._acquire()
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _call(self, fn: Callable, *args):
+        if self.workers <= 0:
+            self._acquire()
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+        future = self._submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # the slot stays taken until the pool finishes the job, which keeps the bound honest
+            raise HasherBusy(retry_after=max(1, int(self.timeout)))
+
+    # public API -------------------------------------------------------------------
+
+    def hash(self, plain: str) -> str:
+        return self._call(_hash, plain, self.method)
+
+    def verify(self, hashed: str, plain: str) -> bool:
+        return self._call(_verify, hashed, plain)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hashed.split('$', 1)[0] != self._method_tag
+
+    def rehash_in_background(self, plain: str, on_done: Callable[[str], None]) -> bool:
+        """
+        Hash plain with the current method without waiting for it; on_done(new_hash) runs when
+        it finishes. Returns False (and does nothing) when the hasher is saturated, since an
+        upgrade can always wait for the next login.
+        """
+        def _finish(future):
+            try:
+                on_done(future.result())
+            except Exception:
+                log.exception("password rehash failed")
+
+        if self.workers <= 0:
+            try:
+                on_done(self.hash(plain))
+            except HasherBusy:
+                return False
+            return True
+        try:
+            self._submit(_hash, plain, self.method).add_done_callback(_finish)
+        except HasherBusy:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'pending': self._pending, 'max_pending': self.max_pending,
+                    'completed': self.completed, 'rejected': self.rejected}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,189 @@
+# app/payment_events.py
+"""
+Queue-based ingestion of payment-provider webhooks.
+
+POST /payments/webhook only checks the signature, drops events it has already seen (by the
+provider's event id) and appends the event to the Redis stream {payments}:events, both in
+one enqueue_payment_event.lua call, then answers 200. Providers burst at on-sale time and
+retry anything slow, so nothing on that path touches Mongo.
+
+This module's consumer group applies the queued events with one unordered bulk_write for
+payments and one for bookings per batch:
+
+    payment.succeeded   payment -> SUCCEEDED, its PENDING booking -> CONFIRMED and the
+                        booking's payment deadline is dropped (booking_expiry.py), provided
+                        the payment's amount is the booking's total_amount. If the booking
+                        already expired, was cancelled or was paid by another payment, or
+                        the amounts differ, the money was still taken: the payment goes to
+                        REFUND_PENDING with a refund_reason instead, for the refund run
+    payment.failed      payment -> FAILED (unless it already succeeded); the booking stays
+                        PENDING until it is paid or expires
+
+Every update is guarded by the current status, so replays and out-of-order deliveries are
+harmless. Run one or more consumers next to the API:
+
+    python payment_events.py
+"""
+import hashlib
+import hmac
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from booking_expiry import cancel_expiry
+from streams import StreamConsumer, Entry
+
+log = logging.getLogger(__name__)
+
+# one hash tag, so the dedupe markers and the stream share a slot under Redis Cluster
+PAYMENT_STREAM = '{payments}:events'
+PAYMENT_GROUP = 'payment-appliers'
+STREAM_MAXLEN = 1_000_000
+SEEN_TTL_SECONDS = 7 * 24 * 3600
+SIGNATURE_HEADER = 'X-Payment-Signature'
+SIGNATURE_TOLERANCE_SECONDS = 300
+
+SUCCEEDED = 'payment.succeeded'
+FAILED = 'payment.failed'
+HANDLED_EVENTS = (SUCCEEDED, FAILED)
+# payment statuses a late or replayed event must not overwrite
+SETTLED_STATUSES = ['SUCCEEDED', 'REFUND_PENDING']
+
+
+def seen_key(event_id: str) -> str:
+    return f"{{payments}}:seen:{event_id}"
+
+
+def sign_payload(secret: str, body: bytes, timestamp: Optional[int] = None) -> str:
+    """Signature header value for body: "t=<unix seconds>,v1=<hex HMAC-SHA256 of 't.body'>"."""
+    t = int(time.time()) if timestamp is None else timestamp
+    mac = hmac.new(secret.encode(), f"{t}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={t},v1={mac}"
+
+
+def verify_signature(secret: str, body: bytes, header: Optional[str],
+                     tolerance: int = SIGNATURE_TOLERANCE_SECONDS) -> bool:
+    """Constant-time check of a sign_payload() header; stale timestamps are refused to stop replays."""
+    if not (secret and header):
+        return False
+    try:
+        parts = dict(p.split('=', 1) for p in header.split(','))
+        t = int(parts['t'])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - t) > tolerance:
+        return False
+    expected = sign_payload(secret, body, t).split('v1=', 1)[1]
+    return hmac.compare_digest(expected, parts.get('v1', ''))
+
+
+def enqueue_event(scripts, event_id: str, fields: Dict[str, str]) -> bool:
+    """Queue one event unless its id was seen in the last SEEN_TTL_SECONDS; True if queued."""
+    args = [SEEN_TTL_SECONDS, STREAM_MAXLEN]
+    for k, v in fields.items():
+        args += [k, v]
+    return scripts.run('enqueue_payment_event', [seen_key(event_id), PAYMENT_STREAM], args)[0] == '1'
+
+
+def apply_payment_events(mdb, r, entries: List[Entry]) -> Dict[str, str]:
+    """
+    Stream handler: apply a batch of events to payments and bookings. Returns {entry_id: reason}
+    for entries that cannot be applied yet; connection-level errors propagate so the whole
+    batch is retried.
+    """
+    failures: Dict[str, str] = {}
+    events = []
+    for entry_id, fields in entries:
+        if fields.get('type') not in HANDLED_EVENTS or not ObjectId.is_valid(fields.get('payment_id', '')):
+            failures[entry_id] = 'bad payload'
+            continue
+        events.append((entry_id, fields, ObjectId(fields['payment_id'])))
+    if not events:
+        return failures
+
+    payment_ids = list({pid for _, _, pid in events})
+    payments = {p['_id']: p for p in mdb.payments.find({'_id': {'$in': payment_ids}}, {'booking_id': 1, 'amount': 1})}
+    bookings = {pid: p['booking_id'] for pid, p in payments.items()}
+
+    now = datetime.utcnow()
+    payment_ops, booking_ops, paid = [], [], {}
+    for entry_id, fields, pid in events:
+        if pid not in bookings:
+            failures[entry_id] = 'unknown payment'
+            continue
+        update = {'updated_at': now, 'last_event_id': fields['event_id']}
+        if fields.get('provider_reference'):
+            update['provider_reference'] = fields['provider_reference']
+        if fields['type'] == SUCCEEDED:
+            payment_ops.append(UpdateOne({'_id': pid, 'status': {'$nin': SETTLED_STATUSES}},
+                                         {'$set': {**update, 'status': 'SUCCEEDED', 'paid_at': now}}))
+            # the amount is part of the filter, so an under- or overpayment never confirms
+            booking_ops.append(UpdateOne({'_id': bookings[pid], 'status': 'PENDING',
+                                          'total_amount': payments[pid].get('amount')},
+                                         {'$set': {'status': 'CONFIRMED', 'payment_id': pid, 'confirmed_at': now}}))
+            paid[entry_id] = pid
+        else:
+            payment_ops.append(UpdateOne({'_id': pid, 'status': {'$nin': SETTLED_STATUSES + ['FAILED']}},
+                                         {'$set': {**update, 'status': 'FAILED'}}))
+
+    if payment_ops:
+        mdb.payments.bulk_write(payment_ops, ordered=False)
+    if booking_ops:
+        mdb.bookings.bulk_write(booking_ops, ordered=False)
+        # re-read rather than trust the update counts: a replayed batch must reach the same outcome
+        found = {b['_id']: b for b in mdb.bookings.find({'_id': {'$in': [bookings[p] for p in paid.values()]}},
+                                                        {'status': 1, 'payment_id': 1, 'screening_id': 1,
+                                                         'total_amount': 1})}
+        refunds, confirmed = {}, {}
+        for entry_id, pid in paid.items():
+            booking = found.get(bookings[pid])
+            if booking is None:
+                # under write-behind the booking may still be queued; keep the event pending until it lands
+                failures[entry_id] = 'booking not persisted yet'
+            elif booking['status'] == 'CONFIRMED' and booking.get('payment_id') == pid:
+                confirmed.setdefault(str(booking['screening_id']), []).append(str(booking['_id']))
+            elif booking['status'] == 'CONFIRMED':
+                refunds[pid] = 'booking paid by another payment'
+            elif booking['status'] == 'PENDING' and booking.get('total_amount') != payments[pid].get('amount'):
+                refunds[pid] = (f"amount {payments[pid].get('amount')} does not match "
+                                f"booking total {booking.get('total_amount')}")
+            else:
+                refunds[pid] = f"booking {booking['status']}"
+        for screening_id, booking_ids in confirmed.items():
+            cancel_expiry(r, screening_id, *booking_ids)
+        if refunds:
+            mdb.payments.bulk_write([UpdateOne({'_id': pid, 'status': 'SUCCEEDED'},
+                                               {'$set': {'status': 'REFUND_PENDING', 'refund_reason': reason,
+                                                         'updated_at': now}})
+                                     for pid, reason in refunds.items()], ordered=False)
+            for pid, reason in refunds.items():
+                log.warning("payment %s succeeded but %s; marked REFUND_PENDING", pid, reason)
+    return failures
+
+
+def make_consumer(r, mdb, **kwargs) -> StreamConsumer:
+    return StreamConsumer(r, PAYMENT_STREAM, PAYMENT_GROUP, lambda entries: apply_payment_events(mdb, r, entries),
+                          **kwargs)
+
+
+def main():
+    from common import connect_stores
+
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+    _, mdb, r = connect_stores()
+    consumer = make_consumer(
+        r, mdb,
+        batch_size=int(os.environ.get('PAYMENT_WORKER_BATCH', 200)),
+        max_deliveries=int(os.environ.get('PAYMENT_WORKER_MAX_DELIVERIES', 10)),
+        min_idle_ms=int(os.environ.get('PAYMENT_WORKER_RETRY_IDLE_MS', 30000)),
+    )
+    consumer.run_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+# app/rebuild_seat_state.py
+"""
+Rebuild Redis seat state from Mongo after Redis lost data.
+
+hold_seats.lua treats a missing seat field as AVAILABLE, so a seat hash that vanished (or came
+back from an old snapshot) would let sold seats be sold again. The source of truth is
+booking_seats joined with bookings: every seat of a PENDING or CONFIRMED booking is
+RESERVED:<booking_id>, every other seat is free. PENDING bookings also get their payment
+deadline put back into bookings:deadlines (see booking_expiry.py).
+
+The rebuilt reservations are merged into the hash rather than replacing it (rebuild_seats.lua):
+holds and reservations made after the aggregation ran are kept, and a RESERVED value is only
+removed when Mongo says its booking was cancelled or expired.
+
+Each rebuilt hash records the generation it was built for in its "_gen" field, and
+rebuild_seats.lua refuses to rebuild a hash twice for one generation. Screenings already at the
+generation are skipped before Mongo is queried, so an interrupted run can simply be restarted.
+After restoring Redis from a snapshot, bump SEAT_STATE_GENERATION so every screening counts as
+stale again.
+
+Per batch of screenings: one pipelined HGETALL of the seat hashes, one aggregation (plus one
+bookings lookup if the hashes hold reservations the aggregation did not return), and one pipeline
+of rebuild_seats.lua calls plus deadline ZADDs.
+
+    python rebuild_seat_state.py                  # upcoming screenings, current generation
+    python rebuild_seat_state.py --all --generation 2
+
+With SEAT_STATE_LAZY_REBUILD=1 the API instead rebuilds a screening the first time a seat map,
+hold or purchase touches it (one extra HGETALL per such request). Seat hashes written before
+this tool existed carry no marker, so the first touch rebuilds them too; their holds are kept.
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+
+from booking_expiry import DEADLINES_KEY, epoch_ms
+from seat_state import seats_key
+
+GENERATION_FIELD = '_gen'
+RESERVED_PREFIX = 'RESERVED:'
+LIVE_STATUSES = ['PENDING', 'CONFIRMED']
+DEFAULT_GENERATION = '1'
+
+
+def reserved_seats(mdb, screening_oids: List[ObjectId]) -> Dict[ObjectId, List[dict]]:
+    """{screening_id: [{'label', 'booking_id', 'status', 'expires_at'}, ...]} from one aggregation."""
+    pipeline = [
+        {'$match': {'screening_id': {'$in': screening_oids}}},
+        {'$lookup': {'from': 'bookings', 'localField': 'booking_id', 'foreignField': '_id', 'as': 'booking'}},
+        {'$unwind': '$booking'},
+        {'$match': {'booking.status': {'$in': LIVE_STATUSES}}},
+        {'$project': {'_id': 0, 'screening_id': 1, 'label': '$seat_label', 'booking_id': 1,
+                      'status': '$booking.status', 'expires_at': '$booking.expires_at'}},
+        {'$group': {'_id': '$screening_id', 'seats': {'$push': '$$ROOT'}}},
+    ]
+    return {doc['_id']: doc['seats'] for doc in mdb.booking_seats.aggregate(pipeline)}
+
+
+def dead_bookings(mdb, booking_ids: Iterable[str]) -> Set[str]:
+    """The given booking ids whose bookings are no longer PENDING or CONFIRMED."""
+    oids = [ObjectId(b) for b in set(booking_ids) if ObjectId.is_valid(b)]
+    if not oids:
+        return set()
+    # ids Mongo does not know are left out: a queued write-behind booking is not there yet
+    return {str(doc['_id']) for doc in
+            mdb.bookings.find({'_id': {'$in': oids}, 'status': {'$nin': LIVE_STATUSES}}, {'_id': 1})}
+
+
+def rebuild_screenings(mdb, scripts, screening_ids: Iterable[str], generation: str,
+                       force: bool = False) -> Dict[str, int]:
+    """Rebuild the given screenings unless already at `generation`; returns {'rebuilt', 'skipped', 'reserved_seats'}."""
+    r = scripts.redis
+    ids = [str(s) for s in screening_ids]
+    counts = {'rebuilt': 0, 'skipped': 0, 'reserved_seats': 0}
+    if not ids:
+        return counts
+    pipe = r.pipeline(transaction=False)
+    for sid in ids:
+        pipe.hgetall(seats_key(sid))
+    current = dict(zip(ids, pipe.execute()))
+    if not force:
+        stale = [sid for sid in ids if current[sid].get(GENERATION_FIELD) != generation]
+        counts['skipped'] = len(ids) - len(stale)
+        ids = stale
+    if not ids:
+        return counts
+
+    seats = reserved_seats(mdb, [ObjectId(sid) for sid in ids])
+    live = {str(seat['booking_id']) for rows in seats.values() for seat in rows}
+    in_hash = {v[len(RESERVED_PREFIX):] for sid in ids for v in current[sid].values()
+               if v.startswith(RESERVED_PREFIX)}
+    dead = dead_bookings(mdb, in_hash - live)
+    calls, reserved = [], []
+    deadlines = {}
+    for sid in ids:
+        stale_pairs = [(label, value) for label, value in current[sid].items()
+                       if value.startswith(RESERVED_PREFIX) and value[len(RESERVED_PREFIX):] in dead]
+        args = [generation, '1' if force else '0', len(stale_pairs)]
+        for pair in stale_pairs:
+            args += pair
+        rows = seats.get(ObjectId(sid), [])
+        for seat in rows:
+            args += [seat['label'], f"{RESERVED_PREFIX}{seat['booking_id']}"]
+            if seat['status'] == 'PENDING' and seat.get('expires_at'):
+                deadlines[f"{sid}:{seat['booking_id']}"] = epoch_ms(seat['expires_at'])
+        calls.append(([seats_key(sid)], args))
+        reserved.append(len(rows))
+
+    replies = scripts.run_pipelined('rebuild_seats', calls)
+    for n_reserved, reply in zip(reserved, replies):
+        if reply[0] == '1':
+            counts['rebuilt'] += 1
+            counts['reserved_seats'] += n_reserved
+        else:
+            counts['skipped'] += 1
+    if deadlines:
+        # ZADD NX: a deadline that survived (or was re-registered) is left alone
+        r.zadd(DEADLINES_KEY, deadlines, nx=True)
+    return counts
+
+
+def ensure_seat_state(mdb, scripts, screening_id: str, generation: str) -> bool:
+    """Lazy mode: rebuild one screening if its hash is missing or stale. True if it was rebuilt."""
+    return rebuild_screenings(mdb, scripts, [screening_id], generation)['rebuilt'] == 1
+
+
+def lazy_rebuild(app, screening_id: str) -> None:
+    """Call before reading or granting seats; a no-op unless SEAT_STATE_LAZY_REBUILD is on."""
+    if app.config.get('SEAT_STATE_LAZY_REBUILD'):
+        ensure_seat_state(app.mdb, app.lua, screening_id, app.config['SEAT_STATE_GENERATION'])
+
+
+def rebuild_all(mdb, scripts, generation: str, since: Optional[datetime] = None, batch: int = 500,
+                force: bool = False) -> Dict[str, int]:
+    """Rebuild every screening (starting at or after `since`, if given), `batch` screenings at a time."""
+    totals = {'rebuilt': 0, 'skipped': 0, 'reserved_seats': 0}
+    # cancelled screenings keep no seat hash at all
+    query = {'status': {'$ne': 'CANCELLED'}}
+    if since:
+        query['start_time'] = {'$gte': since}
+    ids = []
+
+    def flush():
+        for k, v in rebuild_screenings(mdb, scripts, ids, generation, force).items():
+            totals[k] += v
+        ids.clear()
+
+    for doc in mdb.screenings.find(query, {'_id': 1}).batch_size(batch):
+        ids.append(str(doc['_id']))
+        if len(ids) >= batch:
+            flush()
+    if ids:
+        flush()
+    return totals
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from common import connect_stores
+    from scripts import LuaScripts
+
+    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--generation', default=os.environ.get('SEAT_STATE_GENERATION', DEFAULT_GENERATION))
+    parser.add_argument('--all', action='store_true', help='include screenings that already started')
+    parser.add_argument('--batch', type=int, default=500, help='screenings per aggregation / pipeline')
+    parser.add_argument('--force', action='store_true', help='rebuild even screenings already at --generation')
+    args = parser.parse_args()
+
+    _, mdb, r = connect_stores()
+    t0 = time.perf_counter()
+    totals = rebuild_all(mdb, LuaScripts(r), args.generation, since=None if args.all else datetime.utcnow(),
+                         batch=args.batch, force=args.force)
+    print(f"rebuilt {totals['rebuilt']} screenings ({totals['reserved_seats']} reserved seats), "
+          f"skipped {totals['skipped']} already at generation {args.generation}, "
+          f"in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
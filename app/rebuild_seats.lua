@@ -0,0 +1,42 @@
+-- app/rebuild_seats.lua
+-- Merge a screening's reservations rebuilt from Mongo into its seat hash, at most once per generation.
+-- KEYS = [ seats_hash ]              -- screening:{<screening_id>}:seats
+-- ARGV = [ generation, force ("1"/"0"), n_stale, stale_label1, stale_value1, ...,
+--          label1, value1, label2, value2, ... ]
+--        values are "RESERVED:<booking_id>"
+-- The hash keeps the generation it was rebuilt for in the "_gen" field. If that already equals
+-- ARGV[1] nothing is written unless force is "1".
+-- The hash is merged into, never dropped: the aggregation the values come from may be older than
+-- holds and reservations made since, so
+--   * each stale pair (a reservation of a booking Mongo has since cancelled or expired) is
+--     removed only if the field still holds exactly that value;
+--   * each reserved seat from Mongo is written only over a missing or "AVAILABLE" field;
+--   * "<hold_id>|<owner>" fields (they expire on their own via HEXPIRE) and any other
+--     "RESERVED:" value are left as they are.
+-- Return:
+--   { "1" }   rebuilt
+--   { "0" }   already at this generation, or the screening was cancelled
+
+local seats_key = KEYS[1]
+if redis.call('HEXISTS', seats_key, '_cancelled') == 1 then
+	return { "0" }
+end
+if ARGV[2] ~= "1" and redis.call('HGET', seats_key, '_gen') == ARGV[1] then
+	return { "0" }
+end
+
+local n_stale = tonumber(ARGV[3]) or 0
+local first = 4 + 2 * n_stale
+for i = 4, first - 1, 2 do
+	if redis.call('HGET', seats_key, ARGV[i]) == ARGV[i + 1] then
+		redis.call('HDEL', seats_key, ARGV[i])
+	end
+end
+for i = first, #ARGV, 2 do
+	local cur = redis.call('HGET', seats_key, ARGV[i])
+	if not cur or cur == "AVAILABLE" then
+		redis.call('HSET', seats_key, ARGV[i], ARGV[i + 1])
+	end
+end
+redis.call('HSET', seats_key, '_gen', ARGV[1])
+return { "1" }
@@ -0,0 +1,42 @@
+-- app/release_seats.lua
+-- Free the seats of one or more cancelled bookings of a single screening.
+-- KEYS = [ seats_hash ]              -- screening:{<screening_id>}:seats
+-- ARGV = [ events_channel, booking_id1, n1, label, ..., booking_id2, n2, label, ... ]
+-- A seat is released only while its field is still "RESERVED:<booking_id>" for the booking
+-- being cancelled, so a seat that expired and was sold to someone else is never freed.
+-- Released fields become "AVAILABLE" with any reservation TTL removed. One "A|labels" message is
+-- published on events_channel (seat_state.events_channel) for everything released in this call.
+-- Return:
+--   { "1", label1, label2, ... }     the labels actually released (possibly none)
+
+local seats_key = KEYS[1]
+local events_channel = ARGV[1]
+
+local released = {}
+local i = 2
+while i <= #ARGV do
+	local expected = "RESERVED:" .. ARGV[i]
+	local n = tonumber(ARGV[i + 1])
+	for j = i + 2, i + 1 + n do
+		local label = ARGV[j]
+		if redis.call('HGET', seats_key, label) == expected then
+			table.insert(released, label)
+		end
+	end
+	i = i + 2 + n
+end
+
+if #released > 0 then
+	local hset_args = {}
+	for _, l in ipairs(released) do
+		table.insert(hset_args, l)
+		table.insert(hset_args, "AVAILABLE")
+	end
+	redis.call('HSET', seats_key, unpack(hset_args))
+	redis.call('HPERSIST', seats_key, 'FIELDS', #released, unpack(released))
+	redis.call('PUBLISH', events_channel, 'A|' .. table.concat(released, ','))
+end
+
+local res = { "1" }
+for _, l in ipairs(released) do table.insert(res, l) end
+return res
@@ -0,0 +1,16 @@
+-- app/rotate_refresh_token.lua
+-- Swap a refresh token for its successor in one step, so a token can be redeemed only once.
+-- KEYS = [ old_token_key, new_token_key, user_tokens_set ]   -- all share the {<user_id>} tag
+-- ARGV = [ old_token_hash, new_token_hash, ttl_seconds, user_id ]
+-- Return: 1 if the old token was live and has been replaced, 0 if it was unknown, expired,
+-- revoked, or already rotated (nothing is written then).
+
+if redis.call('DEL', KEYS[1]) == 0 then
+	return 0
+end
+local ttl = tonumber(ARGV[3])
+redis.call('SET', KEYS[2], ARGV[4], 'EX', ttl)
+redis.call('SREM', KEYS[3], ARGV[1])
+redis.call('SADD', KEYS[3], ARGV[2])
+redis.call('EXPIRE', KEYS[3], ttl)
+return 1
@@ -0,0 +1,87 @@
+# app/schedule.py
+"""
+Materialized per-day showtime schedule.
+
+"What is on today" is the hottest read in the product, so instead of querying screenings,
+movies and auditoriums per request, each UTC day's schedule is kept prebuilt in Redis under
+schedule:<YYYY-MM-DD> as one JSON document:
+
+    {"date": "2025-05-01",
+     "movies": [{"movie_id": ..., "title": ...,
+                 "showtimes": [{"screening_id", "start_time", "auditorium_id", "hall", "theater_id"}, ...]},
+                ...]}
+
+The document is rebuilt whenever a screening is created or cancelled on that day; cancelled
+screenings are left out. A missing key (Redis
+flushed, day never built) is rebuilt from Mongo on first read, so Redis only ever holds a
+derived copy.
+"""
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+
+log = logging.getLogger(__name__)
+
+SCHEDULE_TTL_SECONDS = 8 * 24 * 3600    # days long past are not worth keeping around
+
+
+def schedule_key(day: date) -> str:
+    return f"schedule:{day.isoformat()}"
+
+
+def iso_utc(dt: datetime) -> str:
+    return dt.isoformat() + 'Z'
+
+
+def day_bounds(day: date):
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def build_day_schedule(mdb, day: date) -> dict:
+    """Three indexed queries: the day's screenings, then their movies and auditoriums by _id."""
+    start, end = day_bounds(day)
+    screenings = list(mdb.screenings.find(
+        {'start_time': {'$gte': start, '$lt': end}, 'status': {'$ne': 'CANCELLED'}},
+        {'movie_id': 1, 'auditorium_id': 1, 'start_time': 1}).sort([('start_time', 1), ('_id', 1)]))
+
+    movie_ids = list({s['movie_id'] for s in screenings})
+    aud_ids = list({s['auditorium_id'] for s in screenings})
+    titles = {m['_id']: m.get('title') for m in mdb.movies.find({'_id': {'$in': movie_ids}}, {'title': 1})}
+    auds = {a['_id']: a for a in mdb.auditoriums.find({'_id': {'$in': aud_ids}}, {'name': 1, 'theater_id': 1})}
+
+    movies = {}
+    for s in screenings:
+        aud = auds.get(s['auditorium_id'], {})
+        entry = movies.setdefault(s['movie_id'], {
+            'movie_id': str(s['movie_id']), 'title': titles.get(s['movie_id']), 'showtimes': []})
+        entry['showtimes'].append({
+            'screening_id': str(s['_id']),
+            'start_time': iso_utc(s['start_time']),
+            'auditorium_id': str(s['auditorium_id']),
+            'hall': aud.get('name'),
+            'theater_id': str(aud['theater_id']) if aud.get('theater_id') else None,
+        })
+    ordered = sorted(movies.values(), key=lambda m: (m['title'] or '', m['movie_id']))
+    return {'date': day.isoformat(), 'movies': ordered}
+
+
+def refresh_day_schedule(mdb, r, day: date) -> str:
+    """Rebuild and store the day's schedule; returns the stored JSON."""
+    body = json.dumps(build_day_schedule(mdb, day))
+    try:
+        r.set(schedule_key(day), body, ex=SCHEDULE_TTL_SECONDS)
+    except Exception as e:
+        log.warning("schedule write failed for %s: %s", day, e)
+    return body
+
+
+def get_day_schedule(mdb, r, day: date) -> str:
+    """The day's schedule as JSON: one GET when materialized, rebuilt from Mongo otherwise."""
+    try:
+        cached = r.get(schedule_key(day))
+        if cached:
+            return cached
+    except Exception as e:
+        log.warning("schedule read failed for %s: %s", day, e)
+    return refresh_day_schedule(mdb, r, day)
@@ -0,0 +1,198 @@
+# app/scripts.py
+"""
+Registry for the Lua scripts in this directory, plus typed wrappers for their results.
+
+Every *.lua file next to this module is read and SCRIPT LOADed once at startup under its
+file stem ("hold_seats", "confirm_reserve", ...). Calls go through EVALSHA; only a NOSCRIPT
+reply (script cache flushed, failover to a fresh replica) triggers a reload and a single retry.
+Any other error propagates unchanged.
+"""
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from redis.exceptions import NoScriptError
+
+from seat_state import events_channel, seats_key, hold_key
+from metrics import observe_script, script_outcome
+
+log = logging.getLogger(__name__)
+
+LUA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class LuaScripts:
+    def __init__(self, r, directory: str = LUA_DIR):
+        self.redis = r
+        self.directory = directory
+        self.sources: Dict[str, str] = {}
+        self.shas: Dict[str, str] = {}
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.lua'):
+                with open(os.path.join(directory, name), 'r') as fh:
+                    self.sources[name[:-4]] = fh.read()
+
+    def load_all(self) -> Dict[str, str]:
+        """SCRIPT LOAD every script; returns {name: sha}."""
+        for name in self.sources:
+            self._load(name)
+        return dict(self.shas)
+
+    def with_client(self, r) -> 'LuaScripts':
+        """Same scripts and SHAs bound to another Redis client (e.g. after a worker fork)."""
+        clone = LuaScripts.__new__(LuaScripts)
+        clone.redis = r
+        clone.directory = self.directory
+        clone.sources = self.sources
+        clone.shas = dict(self.shas)
+        return clone
+
+    def _load(self, name: str) -> str:
+        sha = self.redis.script_load(self.sources[name])
+        self.shas[name] = sha
+        return sha
+
+    def sha(self, name: str) -> str:
+        return self.shas.get(name) or self._load(name)
+
+    def run(self, name: str, keys: Sequence[str], args: Sequence) -> list:
+        t0 = time.perf_counter()
+        try:
+            try:
+                reply = self.redis.evalsha(self.sha(name), len(keys), *keys, *args)
+            except NoScriptError:
+                log.warning("NOSCRIPT for %s; reloading", name)
+                observe_script(name, time.perf_counter() - t0, 'noscript_reload')
+                t0 = time.perf_counter()
+                reply = self.redis.evalsha(self._load(name), len(keys), *keys, *args)
+        except Exception:
+            observe_script(name, time.perf_counter() - t0, 'error')
+            raise
+        observe_script(name, time.perf_counter() - t0, script_outcome(reply))
+        return reply
+
+    def run_pipelined(self, name: str, calls: Sequence[Tuple[Sequence[str], Sequence]]) -> list:
+        """
+        Several calls of one script, [(keys, args), ...], in a single pipeline round trip;
+        returns the replies in order. NOSCRIPT is retried the same way as run().
+        """
+        t0 = time.perf_counter()
+        replies = self._pipeline(self.sha(name), calls)
+        if any(isinstance(r, NoScriptError) for r in replies):
+            log.warning("NOSCRIPT for %s; reloading", name)
+            observe_script(name, time.perf_counter() - t0, 'noscript_reload')
+            t0 = time.perf_counter()
+            replies = self._pipeline(self._load(name), calls)
+        elapsed = (time.perf_counter() - t0) / max(len(calls), 1)
+        for reply in replies:
+            observe_script(name, elapsed, 'error' if isinstance(reply, Exception) else script_outcome(reply))
+        for reply in replies:
+            if isinstance(reply, Exception):
+                raise reply
+        return replies
+
+    def _pipeline(self, sha: str, calls) -> list:
+        pipe = self.redis.pipeline(transaction=False)
+        for keys, args in calls:
+            pipe.evalsha(sha, len(keys), *keys, *args)
+        return pipe.execute(raise_on_error=False)
+
+
+# Typed results ----------------------------------------------------------------
+
+@dataclass
+class HoldResult:
+    ok: bool
+    expires_at: Optional[int] = None
+    unavailable: List[str] = field(default_factory=list)
+    foreign_hold: bool = False      # hold_id already registered to another owner
+    cancelled: bool = False         # the screening was cancelled
+
+
+@dataclass
+class ReserveResult:
+    ok: bool
+    seats: List[str] = field(default_factory=list)
+    unavailable: List[str] = field(default_factory=list)
+    hold_missing: bool = False      # hold unknown, expired, or owned by someone else
+    cancelled: bool = False         # the screening was cancelled
+
+
+def hold_seats(scripts: LuaScripts, screening_id: str, hold_id: str, owner: str,
+               ttl: int, labels: Sequence[str]) -> HoldResult:
+    res = scripts.run('hold_seats', [seats_key(screening_id), hold_key(screening_id, hold_id)],
+                      [hold_id, ttl, owner, screening_id, events_channel(screening_id), *labels])
+    if res[0] == '1':
+        return HoldResult(ok=True, expires_at=int(res[1]))
+    if res[0] == '-1':
+        return HoldResult(ok=False, foreign_hold=True)
+    if res[0] == '-2':
+        return HoldResult(ok=False, cancelled=True)
+    return HoldResult(ok=False, unavailable=list(res[2:]))
+
+
+def confirm_reserve(scripts: LuaScripts, screening_id: str, hold_id: str, owner: str,
+                    booking_id: str, reserve_ttl) -> ReserveResult:
+    res = scripts.run('confirm_reserve', [seats_key(screening_id), hold_key(screening_id, hold_id)],
+                      [hold_id, owner, booking_id, reserve_ttl, screening_id, events_channel(screening_id)])
+    return _reserve_result(res)
+
+
+def hold_confirm(scripts: LuaScripts, screening_id: str, owner: str, booking_id: str,
+                 reserve_ttl, labels: Sequence[str], hold_id: Optional[str] = None) -> ReserveResult:
+    """Buy free seats, or seats owner holds under hold_id, in one call; see hold_confirm.lua."""
+    keys = [seats_key(screening_id)]
+    if hold_id:
+        keys.append(hold_key(screening_id, hold_id))
+    res = scripts.run('hold_confirm', keys,
+                      [owner, booking_id, reserve_ttl, hold_id or '', events_channel(screening_id), *labels])
+    return _reserve_result(res)
+
+
+def _reserve_result(res: list) -> ReserveResult:
+    if res[0] == '1':
+        return ReserveResult(ok=True, seats=list(res[1:]))
+    if res[0] == '-1':
+        return ReserveResult(ok=False, hold_missing=True)
+    if res[0] == '-2':
+        return ReserveResult(ok=False, cancelled=True)
+    return ReserveResult(ok=False, unavailable=list(res[2:]))
+
+
+def cancel_seat_state(scripts: LuaScripts, screening_id: str) -> None:
+    """Mark the screening's seat hash cancelled; hold and confirm scripts refuse it from then on."""
+    scripts.run('cancel_seat_state', [seats_key(screening_id)], [events_channel(screening_id)])
+
+
+def release_seats(scripts: LuaScripts, screening_id: str, bookings: Dict[str, Sequence[str]]) -> List[str]:
+    """Free the seats of {booking_id: labels} that are still reserved for those bookings."""
+    return release_seats_batched(scripts, screening_id, bookings, batch=len(bookings) or 1)
+
+
+def release_seats_batched(scripts: LuaScripts, screening_id: str, bookings: Dict[str, Sequence[str]],
+                          batch: int = 200) -> List[str]:
+    """release_seats for many bookings: `batch` bookings per script call, all calls pipelined."""
+    return release_seats_many(scripts, {screening_id: bookings}, batch)
+
+
+def release_seats_many(scripts: LuaScripts, screenings: Dict[str, Dict[str, Sequence[str]]],
+                       batch: int = 200) -> List[str]:
+    """release_seats_batched across screenings, {screening_id: {booking_id: labels}}, in one pipeline."""
+    calls = []
+    for screening_id, bookings in screenings.items():
+        head = [events_channel(screening_id)]
+        args = list(head)
+        for n, (booking_id, labels) in enumerate(bookings.items(), 1):
+            args += [booking_id, len(labels), *labels]
+            if n % batch == 0:
+                calls.append(([seats_key(screening_id)], args))
+                args = list(head)
+        if len(args) > 1:
+            calls.append(([seats_key(screening_id)], args))
+    if not calls:
+        return []
+    if len(calls) == 1:
+        return list(scripts.run('release_seats', *calls[0])[1:])
+    return [label for reply in scripts.run_pipelined('release_seats', calls) for label in reply[1:]]
@@ -0,0 +1,162 @@
+# app/seat_events.py
+"""
+Fan-out of seat-change events to Server-Sent-Events subscribers.
+
+hold_seats.lua / confirm_reserve.lua publish compact messages on seat_state.events_channel():
+    "H|A1,A2"   seats held
+    "R|A1,A2"   seats reserved
+    "A|A1,A2"   seats released
+    "C|"        screening cancelled (sent on as a "cancelled" event)
+Hold expiry arrives as a keyspace notification for hold:{<screening_id>}:<hold_id> (requires
+notify-keyspace-events to include "Ex"). The registry is already gone by then, so subscribers
+get an "expired" event and re-fetch the seat map.
+
+One pattern subscription per process feeds every connected browser; each SSE response only
+reads from its own in-memory queue, so N viewers cost one Redis connection, not N.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from seat_state import EVENTS_CHANNEL_PATTERN, channel_screening
+
+log = logging.getLogger(__name__)
+
+_STATUS = {'H': 'HELD', 'R': 'RESERVED', 'A': 'AVAILABLE'}
+QUEUE_SIZE = 256
+
+
+def sse_frame(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def translate(channel: str, data: str) -> Optional[tuple]:
+    """
+    Turn a raw pub/sub message into (screening_id, sse_frame), or None if it is not ours.
+    """
+    if channel.startswith('__keyevent@'):
+        # expired key name: hold:{<screening_id>}:<hold_id>
+        parts = data.split(':')
+        if len(parts) != 3 or parts[0] != 'hold' or not (parts[1].startswith('{') and parts[1].endswith('}')):
+            return None
+        return parts[1][1:-1], sse_frame('expired', {'hold_id': parts[2]})
+
+    screening_id = channel_screening(channel)
+    if screening_id is None:
+        return None
+    code, _, labels = data.partition('|')
+    if code == 'C':
+        return screening_id, sse_frame('cancelled', {'screening_id': screening_id})
+    status = _STATUS.get(code)
+    if not status:
+        return None
+    return screening_id, sse_frame('seats', {'status': status, 'seats': labels.split(',') if labels else []})
+
+
+class SeatEventHub:
+    """Process-wide pub/sub listener that fans screening events out to subscriber queues."""
+
+    def __init__(self, r, db: int = 0):
+        self.redis = r
+        self.db = db
+        self._subs: Dict[str, Set[queue.Queue]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, screening_id: str) -> queue.Queue:
+        self.start()
+        q = queue.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._subs.setdefault(screening_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, screening_id: str, q: queue.Queue) -> None:
+        with self._lock:
+            subs = self._subs.get(screening_id)
+            if subs:
+                subs.discard(q)
+                if not subs:
+                    del self._subs[screening_id]
+
+    def subscriber_count(self, screening_id: Optional[str] = None) -> int:
+        with self._lock:
+            if screening_id is not None:
+                return len(self._subs.get(screening_id, ()))
+            return sum(len(s) for s in self._subs.values())
+
+    def publish_local(self, screening_id: str, frame: str) -> None:
+        with self._lock:
+            subs = list(self._subs.get(screening_id, ()))
+        for q in subs:
+            try:
+                q.put_nowait(frame)
+            except queue.Full:
+                # slow consumer: drop its backlog and tell it to re-fetch the seat map
+                try:
+                    while True:
+                        q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(sse_frame('resync', {}))
+
+    def dispatch(self, message: dict) -> None:
+        if message.get('type') not in ('message', 'pmessage'):
+            return
+        translated = translate(message['channel'], message['data'])
+        if translated:
+            self.publish_local(*translated)
+
+    def start(self) -> None:
+        # started lazily by the first subscriber so forked gunicorn workers each get their own
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='seat-events', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            # best-effort: managed Redis often forbids CONFIG; then it must be set server-side
+            self.redis.config_set('notify-keyspace-events', 'Ex')
+        except Exception:
+            log.info("could not enable keyspace notifications; hold expiry events need notify-keyspace-events=Ex")
+        pubsubs = []
+        while True:
+            try:
+                if not pubsubs:
+                    pubsubs = self._subscribe()
+                for pubsub in pubsubs:
+                    message = pubsub.get_message(timeout=1.0 / len(pubsubs))
+                    if message:
+                        self.dispatch(message)
+            except Exception:
+                log.exception("seat event listener error; resubscribing")
+                for pubsub in pubsubs:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+                pubsubs = []
+                time.sleep(1.0)
+
+    def _subscribe(self) -> list:
+        """
+        Standalone Redis: one connection for everything. Redis Cluster: PUBLISH is broadcast, so
+        one node serves the event pattern, but keyspace notifications are node-local and need a
+        subscription on every primary.
+        """
+        if hasattr(self.redis, 'get_primaries'):
+            nodes = [n.redis_connection for n in self.redis.get_primaries()]
+        else:
+            nodes = [self.redis]
+        pubsubs = []
+        for i, node in enumerate(nodes):
+            pubsub = node.pubsub(ignore_subscribe_messages=True)
+            if i == 0:
+                pubsub.psubscribe(EVENTS_CHANNEL_PATTERN)
+            pubsub.subscribe(f'__keyevent@{self.db}__:expired')
+            pubsubs.append(pubsub)
+        return pubsubs
@@ -0,0 +1,117 @@
+# app/seat_state.py
+"""
+Helpers for reading per-screening seat state out of Redis.
+
+Each screening keeps all of its seats in one hash, screening:{<id>}:seats, with the seat label
+as field. One small hash per screening costs far less than a top-level string key per seat
+(see benchmarks/seat_layout_memory.py).
+
+Every key a script touches for a screening carries the hash tag {<screening_id>}, so the seat
+hash and that screening's hold registry entries live in one Redis Cluster slot and each
+script call stays single-slot. migrate_redis_keys.py rewrites keys from the older schemes.
+
+Field values written by hold_seats.lua / confirm_reserve.lua:
+    missing or "AVAILABLE"      -> AVAILABLE
+    "<hold_id>|<owner>"         -> HELD
+    "RESERVED:<booking_id>"     -> RESERVED
+A cancelled screening's hash also carries CANCELLED_FIELD (cancel_seat_state.lua), and every
+script that grants seats refuses it.
+"""
+import re
+from typing import Any, Iterable, List, Optional
+
+AVAILABLE = 'AVAILABLE'
+HELD = 'HELD'
+RESERVED = 'RESERVED'
+
+SCREENING_CANCELLED = 'CANCELLED'
+CANCELLED_FIELD = '_cancelled'
+
+# client-chosen hold ids end up in key names and in "<hold_id>|<owner>" field values
+HOLD_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+class ScreeningCancelled(Exception):
+    """The screening was cancelled; none of its seats may be held or sold."""
+
+
+def slot_tag(screening_id: str) -> str:
+    return "{" + screening_id + "}"
+
+
+def seats_key(screening_id: str) -> str:
+    return f"screening:{slot_tag(screening_id)}:seats"
+
+
+def valid_hold_id(hold_id: Any) -> bool:
+    """True for a string of 1-64 letters, digits, '_' or '-' (so never a '|')."""
+    return isinstance(hold_id, str) and HOLD_ID_RE.fullmatch(hold_id) is not None
+
+
+def hold_key(screening_id: str, hold_id: str) -> str:
+    """
+    Hold registry entry {screening_id, seats, owner, expires_at} written by hold_seats.lua.
+    The screening id is part of the name so an expired-key notification says which seat map changed.
+    """
+    return f"hold:{slot_tag(screening_id)}:{hold_id}"
+
+
+def events_channel(screening_id: str) -> str:
+    """
+    Pub/sub channel the Lua scripts publish seat changes on ("H|A1,A2", "R|A1"). scripts.py
+    passes it to them in ARGV, and seat_events.py subscribes to EVENTS_CHANNEL_PATTERN.
+    """
+    return f"screening:{screening_id}:events"
+
+
+EVENTS_CHANNEL_PATTERN = events_channel('*')
+_EVENTS_PREFIX, _EVENTS_SUFFIX = EVENTS_CHANNEL_PATTERN.split('*')
+
+
+def channel_screening(channel: str) -> Optional[str]:
+    """The screening id in an events_channel() name, or None for any other channel."""
+    if not (channel.startswith(_EVENTS_PREFIX) and channel.endswith(_EVENTS_SUFFIX)):
+        return None
+    screening_id = channel[len(_EVENTS_PREFIX):-len(_EVENTS_SUFFIX)]
+    return screening_id if screening_id and ':' not in screening_id else None
+
+
+def seat_status(value: Optional[str]) -> str:
+    """Map a raw Redis seat value to the status string the frontend expects."""
+    if value is None or value == AVAILABLE:
+        return AVAILABLE
+    if value.startswith('RESERVED:'):
+        return RESERVED
+    return HELD
+
+
+def layout_labels(auditorium: Optional[dict]) -> List[str]:
+    """Seat labels in layout order; entries without a label are skipped."""
+    if not auditorium:
+        return []
+    return [s['label'] for s in auditorium.get('seats_layout') or [] if s.get('label')]
+
+
+def screening_layout(mdb, screening_oid) -> Optional[List[str]]:
+    """
+    Seat labels of the screening's auditorium, or None if the screening does not exist.
+    Raises ScreeningCancelled for a cancelled screening.
+    """
+    screening = mdb.screenings.find_one({'_id': screening_oid}, {'auditorium_id': 1, 'status': 1})
+    if not screening:
+        return None
+    if screening.get('status') == SCREENING_CANCELLED:
+        raise ScreeningCancelled(str(screening_oid))
+    auditorium = mdb.auditoriums.find_one({'_id': screening.get('auditorium_id')}, {'seats_layout.label': 1})
+    return layout_labels(auditorium)
+
+
+def fetch_seat_map(r, screening_id: str, labels: Iterable[str]) -> List[dict]:
+    """
+    Return [{'label', 'status'}, ...] for every label using a single HMGET.
+    """
+    labels = list(labels)
+    if not labels:
+        return []
+    values = r.hmget(seats_key(screening_id), labels)
+    return [{'label': label, 'status': seat_status(v)} for label, v in zip(labels, values)]
@@ -0,0 +1,110 @@
+# app/streams.py
+"""
+Small Redis Streams consumer-group runner shared by the write-behind workers.
+
+A handler receives a batch of (entry_id, fields) and returns {entry_id: reason} for the
+entries it could not apply; everything else is XACKed. Failed entries stay pending and are
+re-claimed once idle for `min_idle_ms`. After `max_deliveries` attempts an entry is copied
+to the dead-letter stream (with the reason) and acknowledged, so one poison message cannot
+block the group. If the handler raises, nothing is acked and the whole batch is retried.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import redis
+
+log = logging.getLogger(__name__)
+
+Entry = Tuple[str, Dict[str, str]]
+Handler = Callable[[List[Entry]], Dict[str, str]]
+
+
+class StreamConsumer:
+    def __init__(self, r, stream: str, group: str, handler: Handler,
+                 consumer: Optional[str] = None, batch_size: int = 100, block_ms: int = 1000,
+                 max_deliveries: int = 5, min_idle_ms: int = 30000,
+                 dead_letter_stream: Optional[str] = None):
+        self.redis = r
+        self.stream = stream
+        self.group = group
+        self.handler = handler
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.max_deliveries = max_deliveries
+        self.min_idle_ms = min_idle_ms
+        self.dead_letter_stream = dead_letter_stream or f"{stream}:dead"
+        self._last_failures: Dict[str, str] = {}
+
+    def ensure_group(self) -> None:
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _dead_letter(self, entry_id: str, reason: str) -> None:
+        rows = self.redis.xrange(self.stream, min=entry_id, max=entry_id)
+        fields = dict(rows[0][1]) if rows else {}
+        fields.update({'source_id': entry_id, 'reason': reason})
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xadd(self.dead_letter_stream, fields)
+        pipe.xack(self.stream, self.group, entry_id)
+        pipe.execute()
+        self._last_failures.pop(entry_id, None)
+        log.error("stream %s: entry %s dead-lettered: %s", self.stream, entry_id, reason)
+
+    def _reclaim(self) -> List[Entry]:
+        """Claim entries idle longer than min_idle_ms; dead-letter those out of attempts."""
+        pending = self.redis.xpending_range(self.stream, self.group, min='-', max='+',
+                                            count=self.batch_size, idle=self.min_idle_ms)
+        retry_ids = []
+        for p in pending:
+            if p['times_delivered'] >= self.max_deliveries:
+                self._dead_letter(p['message_id'],
+                                  self._last_failures.get(p['message_id'], 'max_deliveries_exceeded'))
+            else:
+                retry_ids.append(p['message_id'])
+        if not retry_ids:
+            return []
+        return self.redis.xclaim(self.stream, self.group, self.consumer, self.min_idle_ms, retry_ids)
+
+    def _read_new(self, block: bool) -> List[Entry]:
+        res = self.redis.xreadgroup(self.group, self.consumer, {self.stream: '>'},
+                                    count=self.batch_size, block=self.block_ms if block else None)
+        return res[0][1] if res else []
+
+    def run_once(self, block: bool = True) -> int:
+        """Process one batch (stale entries first, then new ones). Returns entries handled."""
+        entries = self._reclaim() or self._read_new(block)
+        trimmed = [eid for eid, fields in entries if not fields]
+        if trimmed:
+            # claimed ids whose payload was trimmed away by MAXLEN: nothing left to apply
+            self.redis.xack(self.stream, self.group, *trimmed)
+        entries = [(eid, fields) for eid, fields in entries if fields]
+        if not entries:
+            return 0
+        failures = self.handler(entries) or {}
+        self._last_failures.update(failures)
+        ok_ids = [eid for eid, _ in entries if eid not in failures]
+        if ok_ids:
+            self.redis.xack(self.stream, self.group, *ok_ids)
+            for eid in ok_ids:
+                self._last_failures.pop(eid, None)
+        for eid, reason in failures.items():
+            log.warning("stream %s: entry %s failed, will retry: %s", self.stream, eid, reason)
+        return len(entries)
+
+    def run_forever(self, stop: Optional[threading.Event] = None) -> None:
+        self.ensure_group()
+        log.info("consuming %s as %s/%s", self.stream, self.group, self.consumer)
+        while not (stop and stop.is_set()):
+            try:
+                self.run_once()
+            except Exception:
+                log.exception("stream %s: batch failed; it stays pending and will be retried", self.stream)
+                time.sleep(1.0)
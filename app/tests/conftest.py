@@ -0,0 +1,63 @@
+# tests/conftest.py
+import os
+import sys
+from datetime import datetime, timedelta
+
+import fakeredis
+import mongomock
+import pytest
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """Flask app wired to mongomock + fakeredis instead of real servers."""
+    fake_r = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setenv('START_FRONTEND', '0')
+    monkeypatch.setenv('PASSWORD_HASH_WORKERS', '0')
+    monkeypatch.setenv('MONGO_ENSURE_INDEXES', '1')
+    monkeypatch.setattr('common.MongoClient', mongomock.MongoClient)
+    monkeypatch.setattr('common.redis.Redis.from_url', lambda *a, **k: fake_r)
+
+    from app import create_app
+    application = create_app()
+    application.config['TESTING'] = True
+    return application
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seed_screening(app):
+    """Insert movie/theater/auditorium/screening docs and return the screening id."""
+    from models_mongo import make_movie, make_theater, make_auditorium, make_screening
+
+    def _seed(labels, title="Seat Map Movie", hall="Hall 1"):
+        mdb = app.mdb
+        movie = make_movie(title)
+        theater = make_theater("Test Theater")
+        aud = make_auditorium(theater['_id'], hall, rows=1, seats_layout=[{'label': s} for s in labels])
+        scr = make_screening(movie['_id'], aud['_id'], start_time=datetime.utcnow() + timedelta(hours=1))
+        mdb.movies.insert_one(movie)
+        mdb.theaters.insert_one(theater)
+        mdb.auditoriums.insert_one(aud)
+        mdb.screenings.insert_one(scr)
+        return str(scr['_id'])
+    return _seed
+
+
+@pytest.fixture
+def auth_headers():
+    """Bearer headers for a fresh user id (or the one given)."""
+    from bson import ObjectId
+    from auth import make_access_token
+
+    def _headers(user_id=None, role='customer'):
+        return {'Authorization': f'Bearer {make_access_token(user_id or str(ObjectId()), role)}'}
+    return _headers
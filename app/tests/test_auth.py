@@ -0,0 +1,64 @@
+# tests/test_auth.py
+import time
+
+import pytest
+from bson import ObjectId
+
+import auth
+from auth import VerifiedTokenCache, make_access_token, make_refresh_token, token_cache, verify_access_token
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+def test_verified_token_is_served_from_cache(monkeypatch):
+    token = make_access_token(str(ObjectId()), 'customer')
+    first = verify_access_token(token)
+    assert first['typ'] == 'access'
+
+    # a cache hit must not run jwt.decode again
+    monkeypatch.setattr(auth, 'decode_token', lambda t: pytest.fail('decoded twice'))
+    assert verify_access_token(token) == first
+    assert token_cache.stats()['hits'] == 1
+    assert token_cache.stats()['misses'] == 1
+
+
+def test_invalid_and_refresh_tokens_are_not_cached():
+    assert verify_access_token('not-a-jwt') == {'error': 'invalid_token'}
+    assert verify_access_token(make_refresh_token(str(ObjectId()))) == {'error': 'invalid_token_type'}
+    assert token_cache.stats()['size'] == 0
+
+
+def test_cache_evicts_at_exp_and_by_lru():
+    cache = VerifiedTokenCache(maxsize=2)
+    cache.put('expired', {'exp': time.time() - 1})
+    assert cache.get('expired') is None
+    assert cache.stats()['size'] == 0
+
+    later = time.time() + 60
+    cache.put('a', {'exp': later})
+    cache.put('b', {'exp': later})
+    cache.get('a')                  # 'b' is now least recently used
+    cache.put('c', {'exp': later})
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+
+
+def test_me_accepts_cookie_and_shares_cache(client, app):
+    user = {'_id': ObjectId(), 'name': 'Ann', 'email': 'ann@example.com', 'hashed_password': 'x'}
+    app.mdb.users.insert_one(user)
+    token = make_access_token(str(user['_id']), 'customer')
+
+    resp = client.get('/users/me', headers={'Authorization': f'Bearer {token}'})
+    assert resp.status_code == 200
+    assert 'hashed_password' not in resp.get_json()
+
+    client.set_cookie('access_token', token)
+    assert client.get('/users/me').status_code == 200
+    assert token_cache.stats()['hits'] == 1
+
+    assert client.get('/users/me', headers={'Authorization': 'Bearer nope'}).status_code == 401
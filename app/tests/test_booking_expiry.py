@@ -0,0 +1,88 @@
+# tests/test_booking_expiry.py
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from booking_expiry import DEADLINES_KEY, MISSING_KEY, claim_due, epoch_ms, expire_due
+from seat_state import seats_key
+
+
+def _buy(client, headers, screening_id, labels):
+    resp = client.post('/bookings/purchase', json={'screening_id': screening_id, 'seat_labels': labels},
+                       headers=headers)
+    assert resp.status_code == 201
+    return ObjectId(resp.get_json()['booking_id'])
+
+
+def test_unpaid_bookings_expire_and_free_their_seats(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2', 'A3'])
+    unpaid = _buy(client, auth_headers(), screening_id, ['A1', 'A2'])
+    paid = _buy(client, auth_headers(), screening_id, ['A3'])
+    app.mdb.bookings.update_one({'_id': paid}, {'$set': {'status': 'CONFIRMED'}})
+
+    # reservations carry no TTL of their own; the deadline lives in the sorted set
+    assert app.redis.httl(seats_key(screening_id), 'A1') == [-1]
+    assert app.redis.zcard(DEADLINES_KEY) == 2
+    assert expire_due(app.mdb, app.lua)['claimed'] == 0
+
+    later = datetime.utcnow() + timedelta(hours=2)
+    assert expire_due(app.mdb, app.lua, now=later) == {'claimed': 2, 'expired': 1, 'released_seats': 2, 'deferred': 0}
+
+    assert app.mdb.bookings.find_one({'_id': unpaid})['status'] == 'EXPIRED'
+    assert app.mdb.bookings.find_one({'_id': paid})['status'] == 'CONFIRMED'
+    assert app.mdb.booking_seats.count_documents({'booking_id': unpaid}) == 0
+    assert app.redis.hmget(seats_key(screening_id), ['A1', 'A2', 'A3']) == ['AVAILABLE', 'AVAILABLE', f'RESERVED:{paid}']
+    assert app.redis.zcard(DEADLINES_KEY) == 0
+
+    # the freed seats can be sold again
+    _buy(client, auth_headers(), screening_id, ['A1'])
+
+
+def test_claimed_entries_are_leased_not_removed(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1'])
+    _buy(client, auth_headers(), screening_id, ['A1'])
+    later = datetime.utcnow() + timedelta(hours=2)
+
+    assert len(claim_due(app.lua, epoch_ms(later), 10)) == 1
+    # a second worker sees nothing while the lease holds, then the entry comes due again
+    assert claim_due(app.lua, epoch_ms(later), 10) == []
+    assert len(claim_due(app.lua, epoch_ms(later + timedelta(minutes=5)), 10)) == 1
+
+
+def test_failed_purchase_leaves_no_deadline(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1'])
+    _buy(client, auth_headers(), screening_id, ['A1'])
+    taken = client.post('/bookings/purchase', json={'screening_id': screening_id, 'seat_labels': ['A1']},
+                        headers=auth_headers())
+    assert taken.status_code == 409
+    assert app.redis.zcard(DEADLINES_KEY) == 1
+
+
+def test_write_behind_bookings_get_a_grace_period_before_release(app, client, seed_screening):
+    screening_id = seed_screening(['A1', 'A2'])
+    queued, lost = ObjectId(), ObjectId()
+    app.redis.hset(seats_key(screening_id), mapping={'A1': f'RESERVED:{queued}', 'A2': f'RESERVED:{lost}'})
+    due = datetime.utcnow()
+    for booking_id in (queued, lost):
+        app.redis.zadd(DEADLINES_KEY, {f'{screening_id}:{booking_id}': epoch_ms(due)})
+
+    # neither booking is in Mongo yet: both are pushed back, nothing is released
+    counts = expire_due(app.mdb, app.lua, now=due, write_behind=True, missing_grace_seconds=60, missing_retries=2)
+    assert counts == {'claimed': 2, 'expired': 0, 'released_seats': 0, 'deferred': 2}
+    assert app.redis.zscore(DEADLINES_KEY, f'{screening_id}:{lost}') == epoch_ms(due) + 60_000
+
+    # the writer lands one booking; it then expires like any other
+    app.mdb.bookings.insert_one({'_id': queued, 'screening_id': ObjectId(screening_id), 'status': 'PENDING',
+                                 'seat_labels': ['A1']})
+    due += timedelta(seconds=61)
+    assert expire_due(app.mdb, app.lua, now=due, write_behind=True, missing_grace_seconds=60,
+                      missing_retries=2) == {'claimed': 2, 'expired': 1, 'released_seats': 1, 'deferred': 1}
+    assert app.redis.hget(seats_key(screening_id), 'A2') == f'RESERVED:{lost}'
+
+    # the other never shows up: its seats are freed once the retries run out
+    due += timedelta(seconds=61)
+    assert expire_due(app.mdb, app.lua, now=due, write_behind=True, missing_grace_seconds=60,
+                      missing_retries=2)['released_seats'] == 1
+    assert app.redis.hmget(seats_key(screening_id), ['A1', 'A2']) == ['AVAILABLE', 'AVAILABLE']
+    assert app.redis.zcard(DEADLINES_KEY) == 0
+    assert not app.redis.exists(MISSING_KEY)
@@ -0,0 +1,44 @@
+# tests/test_booking_history.py
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from models_mongo import make_booking_seat
+
+
+def _booking(user_id, created_at, seats=None, **extra):
+    doc = {'_id': ObjectId(), 'user_id': user_id, 'screening_id': ObjectId(), 'status': 'PENDING',
+           'total_amount': 10.0, 'created_at': created_at, **extra}
+    if seats is not None:
+        doc['seat_labels'] = seats
+    return doc
+
+
+def test_history_is_paginated_newest_first(client, app, auth_headers):
+    user = ObjectId()
+    base = datetime.utcnow()
+    docs = [_booking(user, base - timedelta(minutes=i), [f'A{i}']) for i in range(5)]
+    app.mdb.bookings.insert_many(docs + [_booking(ObjectId(), base, ['Z1'])])
+
+    headers = auth_headers(str(user))
+    seen, cursor = [], None
+    while True:
+        body = client.get('/bookings?limit=2' + (f'&cursor={cursor}' if cursor else ''), headers=headers).get_json()
+        seen += body['items']
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert [b['id'] for b in seen] == [str(d['_id']) for d in docs]
+    assert seen[0]['seat_labels'] == ['A0']
+    assert 'user_id' not in seen[0]
+
+
+def test_legacy_bookings_get_seats_in_one_lookup(client, app, auth_headers):
+    user = ObjectId()
+    legacy = _booking(user, datetime.utcnow())
+    app.mdb.bookings.insert_one(legacy)
+    app.mdb.booking_seats.insert_many([make_booking_seat(legacy['_id'], legacy['screening_id'], s) for s in ('B2', 'B1')])
+
+    body = client.get('/bookings', headers=auth_headers(str(user))).get_json()
+    assert body['items'][0]['seat_labels'] == ['B1', 'B2']
+    assert client.get('/bookings').status_code == 401
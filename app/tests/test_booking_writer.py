@@ -0,0 +1,103 @@
+# tests/test_booking_writer.py
+import time
+
+from bson import ObjectId
+
+from booking_writer import BOOKING_STREAM, make_consumer
+
+
+def _hold(client, screening_id, seats, headers):
+    return client.post('/holds', json={'screening_id': screening_id, 'seat_labels': seats},
+                       headers=headers).get_json()['hold_id']
+
+
+def test_write_behind_confirm_is_persisted_by_consumer(app, client, seed_screening, auth_headers):
+    app.config['BOOKING_WRITE_BEHIND'] = True
+    screening_id = seed_screening(['A1', 'A2'])
+    headers = auth_headers()
+    body = {'screening_id': screening_id, 'hold_id': _hold(client, screening_id, ['A1', 'A2'], headers),
+            'idempotency_key': 'k1'}
+
+    resp = client.post('/bookings/confirm', json=body, headers=headers)
+    assert resp.status_code == 202
+    booking_id = resp.get_json()['booking_id']
+    assert app.mdb.bookings.count_documents({}) == 0
+
+    # a retry is answered from Redis before Mongo has the booking
+    retry = client.post('/bookings/confirm', json=body, headers=headers)
+    assert retry.status_code == 200 and retry.get_json()['booking_id'] == booking_id
+
+    consumer = make_consumer(app.redis, app.mdb)
+    consumer.ensure_group()
+    assert consumer.run_once(block=False) == 1
+    # re-applying the same entry is a no-op thanks to the upserts
+    consumer.handler(app.redis.xrange(BOOKING_STREAM))
+
+    booking = app.mdb.bookings.find_one({'_id': ObjectId(booking_id)})
+    assert booking['seat_labels'] == ['A1', 'A2'] and booking['idempotency_key'] == 'k1'
+    assert app.mdb.booking_seats.count_documents({'booking_id': ObjectId(booking_id)}) == 2
+    assert app.redis.xpending(BOOKING_STREAM, 'booking-writers')['pending'] == 0
+
+
+def test_failing_entries_are_retried_then_dead_lettered(app):
+    r = app.redis
+    r.xadd(BOOKING_STREAM, {'booking': 'not json'})
+    consumer = make_consumer(r, app.mdb, max_deliveries=2, min_idle_ms=1)
+    consumer.ensure_group()
+
+    consumer.run_once(block=False)   # first delivery fails
+    time.sleep(0.01)
+    consumer.run_once(block=False)   # reclaimed, fails again
+    time.sleep(0.01)
+    consumer.run_once(block=False)   # out of attempts -> dead letter
+
+    dead = r.xrange(f'{BOOKING_STREAM}:dead')
+    assert len(dead) == 1 and dead[0][1]['reason'].startswith('bad payload')
+    assert r.xpending(BOOKING_STREAM, 'booking-writers')['pending'] == 0
+
+
+def test_writer_cancels_bookings_of_cancelled_screenings(app, client, seed_screening, auth_headers):
+    app.config['BOOKING_WRITE_BEHIND'] = True
+    screening_id = seed_screening(['A1'])
+    headers = auth_headers()
+    body = {'screening_id': screening_id, 'hold_id': _hold(client, screening_id, ['A1'], headers)}
+    assert client.post('/bookings/confirm', json=body, headers=headers).status_code == 202
+
+    # the screening is cancelled while the booking is still queued, so cancel_screening never sees it
+    app.mdb.screenings.update_one({'_id': ObjectId(screening_id)}, {'$set': {'status': 'CANCELLED'}})
+    consumer = make_consumer(app.redis, app.mdb)
+    consumer.ensure_group()
+    consumer.run_once(block=False)
+    assert [b['status'] for b in app.mdb.bookings.find()] == ['CANCELLED']
+    assert app.mdb.booking_seats.count_documents({}) == 0
+
+
+def test_write_behind_key_claimed_concurrently_replays_and_releases_seats(app, client, seed_screening,
+                                                                          auth_headers):
+    from booking_writer import idempotency_key_name
+    from seat_state import seats_key
+
+    app.config['BOOKING_WRITE_BEHIND'] = True
+    screening_id = seed_screening(['A1', 'A2'])
+    user_id = str(ObjectId())
+    headers = auth_headers(user_id)
+    hold_id = _hold(client, screening_id, ['A2'], headers)
+    # a concurrent request with the same key claims it after this one passed the replay check
+    winner = str(ObjectId())
+    real_get = app.redis.get
+    calls = []
+
+    def get_then_claim(name):
+        value = real_get(name)
+        if name == idempotency_key_name(user_id, 'k1') and not calls:
+            calls.append(name)
+            app.redis.set(name, winner)
+        return value
+    app.redis.get = get_then_claim
+
+    resp = client.post('/bookings/confirm', json={'screening_id': screening_id, 'hold_id': hold_id,
+                                                  'idempotency_key': 'k1'}, headers=headers)
+    assert resp.status_code == 200 and resp.get_json()['booking_id'] == winner
+    assert app.redis.xlen(BOOKING_STREAM) == 0
+    assert app.redis.hget(seats_key(screening_id), 'A2') == 'AVAILABLE'
+
@@ -0,0 +1,132 @@
+# tests/test_cancellation.py
+from bson import ObjectId
+
+from booking_expiry import DEADLINES_KEY
+from models_mongo import make_payment
+from scripts import LuaScripts, release_seats, release_seats_batched
+from seat_state import CANCELLED_FIELD, events_channel, seats_key
+
+
+def _buy(client, headers, screening_id, labels):
+    resp = client.post('/bookings/purchase', json={'screening_id': screening_id, 'seat_labels': labels},
+                       headers=headers)
+    assert resp.status_code == 201
+    return resp.get_json()['booking_id']
+
+
+def test_release_only_frees_seats_still_reserved_for_the_booking(app):
+    scripts, r = app.lua, app.redis
+    sid = str(ObjectId())
+    r.hset(seats_key(sid), mapping={'A1': 'RESERVED:b1', 'A2': 'RESERVED:b2', 'A3': 'hold|x'})
+    r.hexpire(seats_key(sid), 60, 'A1')
+
+    # A2 was resold to b2 and A3 is held: only A1 belongs to b1
+    assert release_seats(scripts, sid, {'b1': ['A1', 'A2', 'A3']}) == ['A1']
+    assert r.hgetall(seats_key(sid)) == {'A1': 'AVAILABLE', 'A2': 'RESERVED:b2', 'A3': 'hold|x'}
+    assert r.httl(seats_key(sid), 'A1') == [-1]
+
+
+def test_cancel_booking_frees_seats_for_resale(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2'])
+    owner = str(ObjectId())
+    booking_id = _buy(client, auth_headers(owner), screening_id, ['A1', 'A2'])
+
+    assert client.post(f'/bookings/{booking_id}/cancel', headers=auth_headers()).status_code == 404
+
+    resp = client.post(f'/bookings/{booking_id}/cancel', headers=auth_headers(owner))
+    assert resp.status_code == 200
+    assert sorted(resp.get_json()['released_seats']) == ['A1', 'A2']
+    assert app.mdb.bookings.find_one({'_id': ObjectId(booking_id)})['status'] == 'CANCELLED'
+    assert app.mdb.booking_seats.count_documents({'booking_id': ObjectId(booking_id)}) == 0
+
+    again = client.post(f'/bookings/{booking_id}/cancel', headers=auth_headers(owner))
+    assert again.status_code == 200 and again.get_json()['released_seats'] == []
+
+    _buy(client, auth_headers(), screening_id, ['A1'])
+
+
+def test_admin_cancels_whole_screening(app, client, seed_screening, auth_headers):
+    labels = [f'A{i}' for i in range(6)]
+    screening_id = seed_screening(labels)
+    for label in labels:
+        _buy(client, auth_headers(), screening_id, [label])
+
+    assert client.post(f'/bookings/screening/{screening_id}/cancel', headers=auth_headers()).status_code == 403
+
+    pubsub = app.redis.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(events_channel(screening_id))
+    resp = client.post(f'/bookings/screening/{screening_id}/cancel', headers=auth_headers(role='admin'))
+    assert resp.get_json() == {'ok': True, 'cancelled_bookings': 6, 'refunds_requested': 0}
+    assert app.redis.hget(seats_key(screening_id), CANCELLED_FIELD) == '1'
+    messages = [pubsub.get_message(timeout=0.1) for _ in range(3)]
+    assert [m['data'] for m in messages if m] == ['C|']
+    assert app.redis.zcard(DEADLINES_KEY) == 0
+    assert app.mdb.booking_seats.count_documents({}) == 0
+    assert app.mdb.screenings.find_one({'_id': ObjectId(screening_id)})['status'] == 'CANCELLED'
+
+    # the freed seats are not for sale, and the screening is gone from listings and the schedule
+    body = {'screening_id': screening_id, 'seat_labels': ['A1']}
+    assert client.post('/holds', json=body, headers=auth_headers()).status_code == 410
+    assert client.post('/bookings/purchase', json=body, headers=auth_headers()).status_code == 410
+    seat_map = client.get(f'/screenings/{screening_id}')
+    assert seat_map.status_code == 410 and seat_map.get_json()['status'] == 'CANCELLED'
+    assert client.get('/screenings').get_json()['screenings'] == []
+    day = app.mdb.screenings.find_one({'_id': ObjectId(screening_id)})['start_time'].date().isoformat()
+    assert client.get(f'/screenings/schedule/{day}').get_json()['movies'] == []
+
+
+def test_batched_release_pipelines_and_survives_script_flush(app):
+    r = app.redis
+    scripts = LuaScripts(r)
+    scripts.load_all()
+    sid = str(ObjectId())
+    bookings = {f'b{i}': [f'A{i}'] for i in range(5)}
+    r.hset(seats_key(sid), mapping={f'A{i}': f'RESERVED:b{i}' for i in range(5)})
+    r.script_flush()
+
+    assert sorted(release_seats_batched(scripts, sid, bookings, batch=2)) == sorted(f'A{i}' for i in range(5))
+    assert set(r.hvals(seats_key(sid))) == {'AVAILABLE'}
+
+
+def test_cancel_refunds_paid_bookings_and_refuses_expired(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2'])
+    owner = str(ObjectId())
+    paid = _buy(client, auth_headers(owner), screening_id, ['A1'])
+    expired = _buy(client, auth_headers(owner), screening_id, ['A2'])
+    payment = make_payment(ObjectId(paid), 'stripe', 10.0, status='SUCCEEDED')
+    app.mdb.payments.insert_one(payment)
+    app.mdb.bookings.update_one({'_id': ObjectId(paid)}, {'$set': {'status': 'CONFIRMED', 'payment_id': payment['_id']}})
+    app.mdb.bookings.update_one({'_id': ObjectId(expired)}, {'$set': {'status': 'EXPIRED'}})
+
+    resp = client.post(f'/bookings/{expired}/cancel', headers=auth_headers(owner))
+    assert resp.status_code == 409
+    assert app.mdb.bookings.find_one({'_id': ObjectId(expired)})['status'] == 'EXPIRED'
+
+    resp = client.post(f'/bookings/{paid}/cancel', headers=auth_headers(owner))
+    assert resp.get_json()['refund_requested'] is True
+    assert app.mdb.payments.find_one({'_id': payment['_id']})['status'] == 'REFUND_PENDING'
+    # only the expired booking's deadline is left for the expirer
+    assert app.redis.zrange(DEADLINES_KEY, 0, -1) == [f'{screening_id}:{expired}']
+
+
+def test_purchase_racing_a_screening_cancel_leaves_no_booking(app, client, seed_screening, auth_headers,
+                                                              monkeypatch):
+    import blueprints.bookings as bookings_bp
+    screening_id = seed_screening(['A1', 'A2'])
+    # both requests passed the Mongo status check before the cancel landed
+    monkeypatch.setattr(bookings_bp, 'screening_layout', lambda mdb, oid: ['A1', 'A2'])
+    body = {'screening_id': screening_id, 'seat_labels': ['A1']}
+
+    # cancelled in Mongo, marker not yet written: the booking is inserted, then cancels itself
+    app.mdb.screenings.update_one({'_id': ObjectId(screening_id)}, {'$set': {'status': 'CANCELLED'}})
+    assert client.post('/bookings/purchase', json=body, headers=auth_headers()).status_code == 410
+    assert [b['status'] for b in app.mdb.bookings.find()] == ['CANCELLED']
+    assert app.mdb.booking_seats.count_documents({}) == 0
+    assert app.redis.zcard(DEADLINES_KEY) == 0
+
+    # once the hash carries the marker the script itself refuses
+    client.post(f'/bookings/screening/{screening_id}/cancel', headers=auth_headers(role='admin'))
+    body['seat_labels'] = ['A2']
+    assert client.post('/bookings/purchase', json=body, headers=auth_headers()).status_code == 410
+    assert app.mdb.bookings.count_documents({}) == 1
+    assert app.redis.hget(seats_key(screening_id), 'A2') is None
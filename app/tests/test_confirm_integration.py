@@ -6,8 +6,8 @@ from redis import Redis
 from bson import ObjectId
 
 BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-HOLD_PATH = os.path.join(BASE, 'app', 'hold_seats.lua')
-CONFIRM_PATH = os.path.join(BASE, 'app', 'confirm_reserve.lua')
+HOLD_PATH = os.path.join(BASE, 'hold_seats.lua')
+CONFIRM_PATH = os.path.join(BASE, 'confirm_reserve.lua')
 
 def load_script(r, path):
     with open(path, 'r') as f:
@@ -33,20 +33,20 @@ def test_full_confirm_integration():
 
     screening_id = str(ObjectId())
     seats = ['B1', 'B2']
-    keys = [f"screening:{screening_id}:seat:{s}" for s in seats]
-    for k in keys:
-        r.set(k, 'AVAILABLE')
+    key = f"screening:{screening_id}:seats"
+    r.hset(key, mapping={s: 'AVAILABLE' for s in seats})
 
     hold_id = str(ObjectId())
+    hold_key = f"hold:{screening_id}:{hold_id}"
     owner = str(ObjectId())
 
     # hold
-    res = r.evalsha(hold_sha, len(keys), *keys, hold_id, 600, owner)
+    res = r.evalsha(hold_sha, 2, key, hold_key, hold_id, 600, owner, screening_id, *seats)
     assert isinstance(res, list) and res,[0] == '1'
 
     # confirm with right owner
     booking_id = str(ObjectId())
-    res2 = r.evalsha(confirm_sha, len(keys), *keys, hold_id, owner, booking_id, 3600)
+    res2 = r.evalsha(confirm_sha, 2, key, hold_key, hold_id, owner, booking_id, 3600, screening_id)
     assert isinstance(res2, list) and res2,[0] == '1'
 
     # persist to mongodb to simulate endpoint
@@ -62,5 +62,4 @@ def test_full_confirm_integration():
     assert found is not None
 
     # cleanup
-    for k in keys:
-        r.delete(k)
\ No newline at end of file
+    r.delete(key)
\ No newline at end of file
@@ -6,9 +6,11 @@ import mongomock
 from redis import Redis
 from bson import ObjectId
 
+from seat_state import events_channel
+
 BASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-HOLD_PATH = os.path.join(BASE, 'app', 'hold_seats.lua')
-CONFIRM_PATH = os.path.join(BASE, 'app', 'confirm_reserve.lua')
+HOLD_PATH = os.path.join(BASE, 'hold_seats.lua')
+CONFIRM_PATH = os.path.join(BASE, 'confirm_reserve.lua')
 
 def load_script(r, path):
     with open(path, 'r') as f:
@@ -28,44 +30,81 @@ def test_hold_then_confirm_success(fake_redis, fake_mongo):
 
     screening_id = str(ObjectId())
     seats = ['A1', 'A2']
-    keys = [f"screening:{screening_id}:seat:{s}" for s in seats]
+    key = f"screening:{screening_id}:seats"
 
     # seed seats as AVAILABLE
-    for k in keys:
-        fake_redis.set(k, 'AVAILABLE')
+    fake_redis.hset(key, mapping={s: 'AVAILABLE' for s in seats})
 
     hold_id = str(ObjectId())
+    hold_key = f"hold:{screening_id}:{hold_id}"
     owner = str(ObjectId())  # simulated user id
 
     # hold seats (owner-aware)
-    res = fake_redis.evalsha(hold_sha, len(keys), *keys, hold_id, 600, owner)
+    res = fake_redis.evalsha(hold_sha, 2, key, hold_key, hold_id, 600, owner, screening_id, events_channel(screening_id), *seats)
     assert isinstance(res, list) and res,[0] == '1'
+    assert fake_redis.hget(hold_key, 'seats') == 'A1,A2'
 
-    # confirm reservation with correct owner
+    # confirm reservation with correct owner; seats come from the hold registry
     booking_id = str(ObjectId())
-    res2 = fake_redis.evalsha(confirm_sha, len(keys), *keys, hold_id, owner, booking_id, 3600)
-    assert isinstance(res2, list) and res2,[0] == '1'
+    res2 = fake_redis.evalsha(confirm_sha, 2, key, hold_key, hold_id, owner, booking_id, 3600, screening_id,
+                               events_channel(screening_id))
+    assert res2 == ['1', 'A1', 'A2']
 
-    # ensure keys are RESERVED:booking_id
-    for k in keys:
-        assert fake_redis.get(k) == f"RESERVED:{booking_id}"
+    # ensure seats are RESERVED:booking_id and the hold is consumed
+    for s in seats:
+        assert fake_redis.hget(key, s) == f"RESERVED:{booking_id}"
+    assert not fake_redis.exists(hold_key)
 
 def test_confirm_fails_if_wrong_owner(fake_redis):
     hold_sha = load_script(fake_redis, HOLD_PATH)
     confirm_sha = load_script(fake_redis, CONFIRM_PATH)
 
     screening_id = str(ObjectId())
-    keys = [f"screening:{screening_id}:seat:A1", f"screening:{screening_id}:seat:A2"]
+    key = f"screening:{screening_id}:seats"
+    seats = ['A1', 'A2']
 
     # seed and set hold by owner1
-    for k in keys:
-        fake_redis.set(k, 'AVAILABLE')
+    fake_redis.hset(key, mapping={s: 'AVAILABLE' for s in seats})
     hold_id = str(ObjectId())
+    hold_key = f"hold:{screening_id}:{hold_id}"
     owner1 = str(ObjectId())
-    fake_redis.evalsha(hold_sha, len(keys), *keys, hold_id, 600, owner1)
+    fake_redis.evalsha(hold_sha, 2, key, hold_key, hold_id, 600, owner1, screening_id, events_channel(screening_id), *seats)
 
     # attempt to confirm using a different owner (owner2)
     owner2 = str(ObjectId())
     booking_id = str(ObjectId())
-    res = fake_redis.evalsha(confirm_sha, len(keys), *keys, hold_id, owner2, booking_id, 3600)
-    assert isinstance(res, list) and res,[0] == '0'
\ No newline at end of file
+    res = fake_redis.evalsha(confirm_sha, 2, key, hold_key, hold_id, owner2, booking_id, 3600, screening_id,
+                             events_channel(screening_id))
+    assert res == ['-1']
+    assert fake_redis.hget(key, 'A1') == f"{hold_id}|{owner1}"
+
+def test_hold_is_all_or_nothing(fake_redis):
+    hold_sha = load_script(fake_redis, HOLD_PATH)
+
+    screening_id = str(ObjectId())
+    key = f"screening:{screening_id}:seats"
+    fake_redis.hset(key, mapping={'A1': 'AVAILABLE', 'A2': 'RESERVED:someone'})
+
+    hold_id = str(ObjectId())
+    res = fake_redis.evalsha(hold_sha, 2, key, f"hold:{screening_id}:{hold_id}", hold_id, 600, str(ObjectId()),
+                             screening_id, events_channel(screening_id), 'A1', 'A2', 'A3')
+    assert res == ['0', '1', 'A2']
+    # no partial hold was written
+    assert fake_redis.hget(key, 'A1') == 'AVAILABLE'
+    assert fake_redis.hget(key, 'A3') is None
+    assert not fake_redis.exists(f"hold:{screening_id}:{hold_id}")
+
+def test_held_fields_carry_ttl(fake_redis):
+    hold_sha = load_script(fake_redis, HOLD_PATH)
+
+    screening_id = str(ObjectId())
+    key = f"screening:{screening_id}:seats"
+    fake_redis.hset(key, mapping={'A1': 'AVAILABLE', 'A2': 'AVAILABLE'})
+    hold_id = str(ObjectId())
+    fake_redis.evalsha(hold_sha, 2, key, f"hold:{screening_id}:{hold_id}", hold_id, 600, str(ObjectId()), screening_id,
+                       events_channel(screening_id), 'A1')
+
+    ttls = fake_redis.httl(key, 'A1', 'A2')
+    assert 0 < ttls[0] <= 600
+    assert ttls[1] == -1
+    assert 0 < fake_redis.ttl(f"hold:{screening_id}:{hold_id}") <= 600
\ No newline at end of file
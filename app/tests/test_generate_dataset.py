@@ -0,0 +1,54 @@
+# tests/test_generate_dataset.py
+import io
+from datetime import date
+
+import fakeredis
+import mongomock
+
+from generate_dataset import DatasetGenerator
+from models_mongo import ensure_indexes
+from seat_state import seats_key
+
+COUNTS = dict(movies=5, theaters=2, auditoriums=2, screenings=12, users=10, bookings=40,
+              days=3, min_seats=200, max_seats=300)
+
+
+def _generate(mdb, r, seed=7):
+    out = io.StringIO()
+    DatasetGenerator(mdb, r, seed=seed, chunk=16, start_date=date(2030, 1, 1), out=out).run(**COUNTS)
+    return out.getvalue()
+
+
+def test_generates_consistent_dataset():
+    mdb, r = mongomock.MongoClient().db, fakeredis.FakeRedis(decode_responses=True)
+    ensure_indexes(mdb)
+    report = _generate(mdb, r)
+    assert 'bookings' in report and '/s' in report
+
+    assert mdb.movies.count_documents({}) == 5
+    assert mdb.auditoriums.count_documents({}) == 4
+    for aud in mdb.auditoriums.find():
+        assert 200 <= len(aud['seats_layout']) <= 300
+    assert mdb.screenings.count_documents({}) == 12
+    assert mdb.users.count_documents({}) == 10
+
+    # every booked seat is RESERVED for its booking in Redis, and no seat is sold twice
+    n_bookings = mdb.bookings.count_documents({})
+    assert 0 < n_bookings <= 40
+    for seat in mdb.booking_seats.find():
+        assert r.hget(seats_key(str(seat['screening_id'])), seat['seat_label']) == f"RESERVED:{seat['booking_id']}"
+    reserved = sum(v.startswith('RESERVED:') for s in mdb.screenings.find()
+                   for v in r.hvals(seats_key(str(s['_id']))))
+    assert reserved == mdb.booking_seats.count_documents({})
+
+
+def test_same_seed_same_data_and_rerun_is_idempotent():
+    mdb1, mdb2 = mongomock.MongoClient().a, mongomock.MongoClient().b
+    ensure_indexes(mdb1)
+    _generate(mdb1, fakeredis.FakeRedis(decode_responses=True))
+    _generate(mdb2, fakeredis.FakeRedis(decode_responses=True))
+    assert sorted(d['_id'] for d in mdb1.bookings.find()) == sorted(d['_id'] for d in mdb2.bookings.find())
+
+    report = _generate(mdb1, fakeredis.FakeRedis(decode_responses=True))
+    assert 'already present' in report
+    assert mdb1.movies.count_documents({}) == 5
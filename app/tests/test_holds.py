@@ -0,0 +1,67 @@
+# tests/test_holds.py
+from bson import ObjectId
+
+from seat_state import seats_key, hold_key
+
+
+def test_hold_then_confirm_uses_hold_registry(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2', 'A3'])
+    user_id = str(ObjectId())
+    headers = auth_headers(user_id)
+
+    resp = client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A1', 'A2']}, headers=headers)
+    assert resp.status_code == 201
+    hold = resp.get_json()
+    assert hold['seat_labels'] == ['A1', 'A2']
+    assert app.redis.hgetall(hold_key(screening_id, hold['hold_id']))['owner'] == user_id
+
+    # client-sent seat labels are ignored; the registry decides what gets booked
+    resp = client.post('/bookings/confirm', headers=headers, json={
+        'screening_id': screening_id, 'hold_id': hold['hold_id'], 'seat_labels': ['A3'],
+    })
+    assert resp.status_code == 201
+    booking_id = resp.get_json()['booking_id']
+
+    assert app.redis.hmget(seats_key(screening_id), ['A1', 'A2', 'A3']) == [
+        f'RESERVED:{booking_id}', f'RESERVED:{booking_id}', None]
+    booking = app.mdb.bookings.find_one({'_id': ObjectId(booking_id)})
+    assert booking['seat_labels'] == ['A1', 'A2']
+    assert app.mdb.booking_seats.count_documents({'booking_id': ObjectId(booking_id)}) == 2
+
+
+def test_hold_conflict_and_foreign_confirm(client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2'])
+    alice = auth_headers()
+    bob = auth_headers()
+
+    resp = client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A1']}, headers=alice)
+    hold_id = resp.get_json()['hold_id']
+
+    resp = client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A1', 'A2']}, headers=bob)
+    assert resp.status_code == 409
+    assert resp.get_json()['unavailable_seats'] == ['A1']
+
+    resp = client.post('/bookings/confirm', json={'screening_id': screening_id, 'hold_id': hold_id}, headers=bob)
+    assert resp.status_code == 410
+
+
+def test_hold_rejects_unknown_seats(client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1'])
+    resp = client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['Z9']}, headers=auth_headers())
+    assert resp.status_code == 400
+
+
+def test_hold_rejects_malformed_hold_ids(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1'])
+    headers = auth_headers()
+    for hold_id in (['x'], {'a': 1}, 7, 'a|b', 'x' * 65, 'a b'):
+        resp = client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A1'], 'hold_id': hold_id},
+                           headers=headers)
+        assert resp.status_code == 400, hold_id
+    assert app.redis.hget(seats_key(screening_id), 'A1') is None
+
+    resp = client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A1'], 'hold_id': 'my-hold_1'},
+                       headers=headers)
+    assert resp.status_code == 201 and resp.get_json()['hold_id'] == 'my-hold_1'
+    confirm = client.post('/bookings/confirm', json={'screening_id': screening_id, 'hold_id': 'a|b'}, headers=headers)
+    assert confirm.status_code == 400
@@ -0,0 +1,66 @@
+# tests/test_json_provider.py
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+import json_provider
+from json_provider import dumps_bytes, stream_json_page
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def encoder(request, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    elif json_provider.orjson is None:
+        pytest.skip('orjson not installed')
+    return request.param
+
+
+def test_nested_objectids_and_datetimes(encoder):
+    oid = ObjectId()
+    doc = {'id': oid, 'seats': [{'booking_id': oid}], 'at': datetime(2030, 1, 2, 3, 4, 5, 600000), 'n': 1,
+           'aware': datetime(2030, 1, 2, 5, 4, 5, tzinfo=timezone(timedelta(hours=2))), 'day': date(2030, 1, 2)}
+    assert json.loads(dumps_bytes(doc)) == {
+        'id': str(oid), 'seats': [{'booking_id': str(oid)}], 'at': '2030-01-02T03:04:05.600000Z', 'n': 1,
+        'aware': '2030-01-02T03:04:05Z', 'day': '2030-01-02'}
+
+
+def test_jsonify_uses_provider(app):
+    oid = ObjectId()
+    with app.test_request_context():
+        from flask import jsonify
+        assert json.loads(jsonify({'x': oid}).get_data()) == {'x': str(oid)}
+
+
+@pytest.mark.parametrize('available, expected_next', [(3, None), (4, 'c:3')])
+def test_stream_json_page(app, available, expected_next):
+    docs = ({'_id': i} for i in range(1, available + 1))
+    resp = stream_json_page('items', docs, 3, lambda d: f"c:{d['_id']}", lambda d: {'id': d['_id']})
+    assert json.loads(b''.join(resp.response)) == {
+        'items': [{'id': 1}, {'id': 2}, {'id': 3}], 'next_cursor': expected_next}
+
+
+def test_stream_json_page_marks_interrupted_pages(app):
+    def docs():
+        yield {'_id': 1}
+        yield {'_id': 2}
+        raise RuntimeError('cursor died')
+
+    resp = stream_json_page('items', docs(), 3, lambda d: f"c:{d['_id']}", lambda d: {'id': d['_id']})
+    assert resp.status_code == 200
+    assert json.loads(b''.join(resp.response)) == {
+        'items': [{'id': 1}, {'id': 2}], 'next_cursor': 'c:2', 'incomplete': True}
+
+
+def test_stream_json_page_raises_before_the_first_item(app):
+    def docs():
+        raise RuntimeError('query failed')
+        yield  # pragma: no cover
+
+    # nothing has been sent yet, so the error reaches Flask and becomes a 500
+    with pytest.raises(RuntimeError):
+        stream_json_page('items', docs(), 3, lambda d: None)
+    assert json.loads(b''.join(stream_json_page('items', iter([]), 3, lambda d: None).response)) == {
+        'items': [], 'next_cursor': None}
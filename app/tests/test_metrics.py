@@ -0,0 +1,57 @@
+# tests/test_metrics.py
+from bson import ObjectId
+
+from metrics import script_outcome
+
+
+def test_script_outcome_labels():
+    assert script_outcome(['1', '123']) == 'ok'
+    assert script_outcome(['0', '1', 'A1']) == 'conflict'
+    assert script_outcome(['-1']) == 'rejected'
+    assert script_outcome(0) == 'rejected'
+
+
+def test_metrics_endpoint_reports_routes_scripts_and_mongo(client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2'])
+    headers = auth_headers(str(ObjectId()))
+    assert client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A1']},
+                       headers=headers).status_code == 201
+    assert client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A1']},
+                       headers=auth_headers()).status_code == 409
+    client.get(f'/screenings/{screening_id}')
+
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{blueprint="holds",endpoint="holds.create_hold"' in body
+    assert 'http_requests_total{blueprint="holds",endpoint="holds.create_hold",method="POST",status="409"}' in body
+    assert 'redis_script_calls_total{outcome="ok",script="hold_seats"}' in body
+    assert 'redis_script_calls_total{outcome="conflict",script="hold_seats"}' in body
+    assert 'endpoint="metrics"' not in body
+
+
+def test_noscript_reload_is_counted(app):
+    from prometheus_client import REGISTRY
+
+    def calls(outcome):
+        return REGISTRY.get_sample_value('redis_script_calls_total',
+                                         {'script': 'hold_seats', 'outcome': outcome}) or 0
+
+    before = calls('noscript_reload')
+    app.redis.script_flush()
+    from scripts import hold_seats
+    assert hold_seats(app.lua, str(ObjectId()), 'h1', 'u1', 60, ['A1']).ok
+    assert calls('noscript_reload') == before + 1
+
+
+def test_mongo_listener_observes_commands():
+    from types import SimpleNamespace
+    from prometheus_client import REGISTRY
+    from metrics import MongoCommandMetrics
+
+    def count():
+        return REGISTRY.get_sample_value('mongo_command_duration_seconds_count', {'command': 'find'}) or 0
+
+    before = count()
+    MongoCommandMetrics().succeeded(SimpleNamespace(command_name='find', duration_micros=1500))
+    assert count() == before + 1
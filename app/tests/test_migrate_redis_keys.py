@@ -0,0 +1,31 @@
+# tests/test_migrate_redis_keys.py
+import fakeredis
+
+from migrate_redis_keys import migrate
+from seat_state import seats_key, hold_key
+
+
+def test_old_keys_are_rewritten_with_hash_tags():
+    r = fakeredis.FakeRedis(decode_responses=True)
+    r.set('screening:s1:seat:A1', 'AVAILABLE')
+    r.set('screening:s1:seat:A2', 'h1|u1', ex=300)
+    r.hset('screening:s2:seats', mapping={'B1': 'RESERVED:b1', 'B2': 'h2|u2'})
+    r.hexpire('screening:s2:seats', 300, 'B2')
+    r.hset('hold:s2:h2', mapping={'screening_id': 's2', 'seats': 'B2', 'owner': 'u2'})
+    r.expire('hold:s2:h2', 300)
+
+    assert migrate(r, dry_run=True) == {'seat': 2, 'seats': 1, 'hold': 1}
+    assert r.exists('screening:s1:seat:A1')
+
+    assert migrate(r) == {'seat': 2, 'seats': 1, 'hold': 1}
+    assert r.hgetall(seats_key('s1')) == {'A1': 'AVAILABLE', 'A2': 'h1|u1'}
+    assert r.hgetall(seats_key('s2')) == {'B1': 'RESERVED:b1', 'B2': 'h2|u2'}
+    assert r.hgetall(hold_key('s2', 'h2'))['owner'] == 'u2'
+
+    a1_ttl, a2_ttl = r.httl(seats_key('s1'), 'A1', 'A2')
+    assert a1_ttl == -1 and 0 < a2_ttl <= 300
+    assert 0 < r.ttl(hold_key('s2', 'h2')) <= 300
+
+    assert sorted(r.keys()) == sorted([seats_key('s1'), seats_key('s2'), hold_key('s2', 'h2')])
+    # already-migrated keys are left alone
+    assert migrate(r) == {'seat': 0, 'seats': 0, 'hold': 0}
@@ -0,0 +1,49 @@
+# tests/test_movies.py
+from models_mongo import make_movie
+
+
+def _walk(client, sort, limit=2):
+    seen, cursor = [], None
+    while True:
+        url = f'/movies/all?sort={sort}&limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        resp = client.get(url)
+        assert resp.status_code == 200
+        body = resp.get_json()
+        seen.extend(body['movies'])
+        cursor = body['next_cursor']
+        if not cursor:
+            return seen
+
+
+def test_keyset_pages_cover_catalog_in_order(client, app):
+    ratings = [3.5, None, 4.0, 3.5, None, 1.0, 4.0]
+    for i, rating in enumerate(ratings):
+        app.mdb.movies.insert_one(make_movie(f'Movie {i}', description='long text', rating=rating))
+
+    by_title = _walk(client, 'title')
+    assert [m['title'] for m in by_title] == sorted(f'Movie {i}' for i in range(len(ratings)))
+    assert 'description' not in by_title[0]
+
+    for sort, reverse in (('rating', False), ('-rating', True)):
+        movies = _walk(client, sort)
+        assert len({m['id'] for m in movies}) == len(ratings)
+        keys = [(m['rating'] is not None, m['rating'] or 0) for m in movies]
+        assert keys == sorted(keys, reverse=reverse)
+
+
+def test_pages_are_cached_until_a_movie_is_created(client, app, auth_headers):
+    app.mdb.movies.insert_one(make_movie('Alpha'))
+    assert [m['title'] for m in client.get('/movies/all').get_json()['movies']] == ['Alpha']
+
+    # a write that bypasses create_movie is not visible while the page is cached
+    app.mdb.movies.insert_one(make_movie('Beta'))
+    assert len(client.get('/movies/all').get_json()['movies']) == 1
+
+    resp = client.post('/movies', json={'title': 'Gamma'}, headers=auth_headers(role='admin'))
+    assert resp.status_code == 201
+    assert [m['title'] for m in client.get('/movies/all').get_json()['movies']] == ['Alpha', 'Beta', 'Gamma']
+
+
+def test_rejects_bad_parameters(client):
+    assert client.get('/movies/all?sort=runtime').status_code == 400
+    assert client.get('/movies/all?cursor=%%%').status_code == 400
@@ -0,0 +1,64 @@
+# tests/test_password_hashing.py
+import pytest
+from werkzeug.security import generate_password_hash
+
+import password_hashing
+from password_hashing import HasherBusy, PasswordHasher
+
+FAST = 'pbkdf2:sha256:1000'
+
+
+def test_pool_hashes_and_verifies():
+    hasher = PasswordHasher(method=FAST, workers=1, max_pending=4)
+    try:
+        hashed = hasher.hash('pw')
+        assert hashed.startswith(FAST + '$')
+        assert hasher.verify(hashed, 'pw')
+        assert not hasher.verify(hashed, 'nope')
+        assert hasher.stats()['pending'] == 0
+        assert hasher.stats()['completed'] == 3
+    finally:
+        hasher.shutdown()
+
+
+def test_saturated_hasher_sheds_load():
+    hasher = PasswordHasher(method=FAST, workers=0, max_pending=0)
+    with pytest.raises(HasherBusy):
+        hasher.hash('pw')
+    assert hasher.stats()['rejected'] == 1
+
+
+def test_needs_rehash_normalises_method(monkeypatch):
+    stored = {m: generate_password_hash('pw', method=m) for m in ('pbkdf2', 'pbkdf2:sha256', 'scrypt', FAST)}
+    # the tag is derived from the method string, never by running the KDF
+    monkeypatch.setattr(password_hashing, '_hash', lambda *a: pytest.fail('needs_rehash ran a KDF'))
+
+    hasher = PasswordHasher(method='pbkdf2:sha256', workers=0)
+    assert not hasher.needs_rehash(stored['pbkdf2:sha256'])
+    assert not hasher.needs_rehash(stored['pbkdf2'])
+    assert hasher.needs_rehash(stored[FAST])
+    assert hasher.needs_rehash(stored['scrypt'])
+    assert not PasswordHasher(method='scrypt:32768:8:1', workers=0).needs_rehash(stored['scrypt'])
+
+
+def test_register_login_and_rehash(client, app):
+    app.password_hasher = PasswordHasher(method=FAST, workers=0)
+    resp = client.post('/users/register', json={'name': 'Ann', 'email': 'ann@example.com', 'password': 'pw'})
+    assert resp.status_code == 201
+
+    # raise the configured cost: the next successful login upgrades the stored hash
+    app.password_hasher = PasswordHasher(method='pbkdf2:sha256:2000', workers=0)
+    resp = client.post('/users/login', json={'email': 'ann@example.com', 'password': 'pw'})
+    assert resp.status_code == 200
+    stored = app.mdb.users.find_one({'email': 'ann@example.com'})['hashed_password']
+    assert stored.startswith('pbkdf2:sha256:2000$')
+
+    assert client.post('/users/login', json={'email': 'ann@example.com', 'password': 'bad'}).status_code == 401
+
+
+def test_login_returns_503_when_busy(client, app):
+    app.mdb.users.insert_one({'email': 'bob@example.com', 'hashed_password': generate_password_hash('pw', method=FAST)})
+    app.password_hasher = PasswordHasher(method=FAST, workers=0, max_pending=0)
+    resp = client.post('/users/login', json={'email': 'bob@example.com', 'password': 'pw'})
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After']
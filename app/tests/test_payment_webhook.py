@@ -0,0 +1,129 @@
+# tests/test_payment_webhook.py
+import json
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from booking_expiry import DEADLINES_KEY, schedule_expiry
+from models_mongo import make_booking, make_payment
+from payment_events import PAYMENT_STREAM, SIGNATURE_HEADER, make_consumer, sign_payload
+
+SECRET = 'whsec-test'
+
+
+def _send(client, event, secret=SECRET):
+    body = json.dumps(event).encode()
+    return client.post('/payments/webhook', data=body, content_type='application/json',
+                       headers={SIGNATURE_HEADER: sign_payload(secret, body)})
+
+
+def _pending_payment(mdb):
+    booking = make_booking(ObjectId(), ObjectId(), total_amount=10.0)
+    payment = make_payment(booking['_id'], 'stripe', 10.0)
+    mdb.bookings.insert_one(booking)
+    mdb.payments.insert_one(payment)
+    return booking['_id'], payment['_id']
+
+
+def test_webhook_verifies_and_deduplicates(app, client):
+    app.config['PAYMENT_WEBHOOK_SECRET'] = SECRET
+    event = {'id': 'evt_1', 'type': 'payment.succeeded', 'data': {'payment_id': str(ObjectId())}}
+
+    assert _send(client, event, secret='wrong').status_code == 401
+    assert _send(client, event).get_json() == {'ok': True, 'duplicate': False}
+    assert _send(client, event).get_json() == {'ok': True, 'duplicate': True}
+    assert _send(client, {**event, 'id': 'evt_2', 'type': 'charge.updated'}).get_json()['ignored']
+    assert app.redis.xlen(PAYMENT_STREAM) == 1
+
+
+def test_consumer_confirms_bookings_in_batches(app, client):
+    app.config['PAYMENT_WEBHOOK_SECRET'] = SECRET
+    mdb = app.mdb
+    paid_booking, paid = _pending_payment(mdb)
+    failed_booking, failed = _pending_payment(mdb)
+
+    # success arrives before a late failure for the same payment; the failure must not win
+    _send(client, {'id': 'e1', 'type': 'payment.succeeded', 'data': {'payment_id': str(paid), 'provider_reference': 'ch_1'}})
+    _send(client, {'id': 'e2', 'type': 'payment.failed', 'data': {'payment_id': str(paid)}})
+    _send(client, {'id': 'e3', 'type': 'payment.failed', 'data': {'payment_id': str(failed)}})
+
+    consumer = make_consumer(app.redis, mdb)
+    consumer.ensure_group()
+    assert consumer.run_once(block=False) == 3
+
+    assert mdb.payments.find_one({'_id': paid})['status'] == 'SUCCEEDED'
+    assert mdb.payments.find_one({'_id': paid})['provider_reference'] == 'ch_1'
+    assert mdb.bookings.find_one({'_id': paid_booking})['status'] == 'CONFIRMED'
+    assert mdb.payments.find_one({'_id': failed})['status'] == 'FAILED'
+    assert mdb.bookings.find_one({'_id': failed_booking})['status'] == 'PENDING'
+    assert app.redis.xpending(PAYMENT_STREAM, 'payment-appliers')['pending'] == 0
+
+
+def test_unknown_payment_stays_pending(app, client):
+    app.config['PAYMENT_WEBHOOK_SECRET'] = SECRET
+    _send(client, {'id': 'e9', 'type': 'payment.succeeded', 'data': {'payment_id': str(ObjectId())}})
+
+    consumer = make_consumer(app.redis, app.mdb)
+    consumer.ensure_group()
+    consumer.run_once(block=False)
+    assert app.redis.xpending(PAYMENT_STREAM, 'payment-appliers')['pending'] == 1
+
+
+def test_payment_for_a_dead_booking_is_flagged_for_refund(app, client):
+    app.config['PAYMENT_WEBHOOK_SECRET'] = SECRET
+    mdb = app.mdb
+    expired_booking, late = _pending_payment(mdb)
+    mdb.bookings.update_one({'_id': expired_booking}, {'$set': {'status': 'EXPIRED'}})
+    live_booking, paid = _pending_payment(mdb)
+    screening_id = str(mdb.bookings.find_one({'_id': live_booking})['screening_id'])
+    schedule_expiry(app.redis, screening_id, str(live_booking), datetime.utcnow() + timedelta(hours=1))
+
+    _send(client, {'id': 'e1', 'type': 'payment.succeeded', 'data': {'payment_id': str(late)}})
+    _send(client, {'id': 'e2', 'type': 'payment.succeeded', 'data': {'payment_id': str(paid)}})
+    consumer = make_consumer(app.redis, mdb)
+    consumer.ensure_group()
+    assert consumer.run_once(block=False) == 2
+
+    payment = mdb.payments.find_one({'_id': late})
+    assert (payment['status'], payment['refund_reason']) == ('REFUND_PENDING', 'booking EXPIRED')
+    assert mdb.bookings.find_one({'_id': expired_booking})['status'] == 'EXPIRED'
+    # the confirmed booking no longer has a deadline for the expiry worker to act on
+    assert mdb.bookings.find_one({'_id': live_booking})['status'] == 'CONFIRMED'
+    assert app.redis.zcard(DEADLINES_KEY) == 0
+
+    # a replayed success does not bring the flagged payment back to SUCCEEDED
+    _send(client, {'id': 'e3', 'type': 'payment.succeeded', 'data': {'payment_id': str(late)}})
+    consumer.run_once(block=False)
+    assert mdb.payments.find_one({'_id': late})['status'] == 'REFUND_PENDING'
+
+
+def test_create_payment_is_owner_only_and_charges_the_booking_total(app, client, auth_headers):
+    user_id = str(ObjectId())
+    booking = make_booking(ObjectId(user_id), ObjectId(), total_amount=24.0)
+    app.mdb.bookings.insert_one(booking)
+    body = {'booking_id': str(booking['_id']), 'provider': 'stripe', 'amount': 0.01}
+
+    assert client.post('/payments', json=body).status_code == 401
+    assert client.post('/payments', json=body, headers=auth_headers()).status_code == 404
+    resp = client.post('/payments', json=body, headers=auth_headers(user_id))
+    assert resp.status_code == 201 and resp.get_json()['amount'] == 24.0
+    assert app.mdb.bookings.find_one({'_id': booking['_id']})['payment_id'] == ObjectId(resp.get_json()['id'])
+
+    app.mdb.bookings.update_one({'_id': booking['_id']}, {'$set': {'status': 'EXPIRED'}})
+    assert client.post('/payments', json=body, headers=auth_headers(user_id)).status_code == 409
+
+
+def test_payment_of_the_wrong_amount_does_not_confirm(app, client):
+    app.config['PAYMENT_WEBHOOK_SECRET'] = SECRET
+    booking_id, payment_id = _pending_payment(app.mdb)
+    app.mdb.payments.update_one({'_id': payment_id}, {'$set': {'amount': 0.01}})
+
+    _send(client, {'id': 'e1', 'type': 'payment.succeeded', 'data': {'payment_id': str(payment_id)}})
+    consumer = make_consumer(app.redis, app.mdb)
+    consumer.ensure_group()
+    assert consumer.run_once(block=False) == 1
+
+    assert app.mdb.bookings.find_one({'_id': booking_id})['status'] == 'PENDING'
+    payment = app.mdb.payments.find_one({'_id': payment_id})
+    assert payment['status'] == 'REFUND_PENDING'
+    assert payment['refund_reason'] == 'amount 0.01 does not match booking total 10.0'
@@ -0,0 +1,45 @@
+# tests/test_probes.py
+import hashlib
+
+import fakeredis
+import mongomock
+
+from scripts import LuaScripts
+
+
+def test_livez_and_readyz(client, app):
+    assert client.get('/livez').status_code == 200
+    resp = client.get('/readyz')
+    assert resp.status_code == 200
+    assert resp.get_json()['checks'] == {'mongo': 'ok', 'redis': 'ok', 'lua': 'ok'}
+
+
+def test_readyz_reloads_lost_scripts(client, app):
+    app.redis.script_flush()
+    resp = client.get('/readyz')
+    assert resp.status_code == 200
+    assert resp.get_json()['checks']['lua'] == 'reloaded'
+    assert client.get('/readyz').get_json()['checks']['lua'] == 'ok'
+
+
+def test_readyz_fails_when_a_store_is_down(client, app, monkeypatch):
+    def down(*a, **k):
+        raise ConnectionError('down')
+
+    monkeypatch.setattr(app.redis, 'ping', down)
+    resp = client.get('/readyz')
+    assert resp.status_code == 503
+    assert resp.get_json()['checks']['redis'].startswith('error')
+    assert client.get('/livez').status_code == 200
+
+
+def test_migrate_indexes_builds_indexes_and_scripts(monkeypatch):
+    import common
+    import migrate_indexes
+
+    mc, r = mongomock.MongoClient(), fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(common, 'connect_stores', lambda: (mc, mc.movie_booking, r))
+    assert migrate_indexes.main() == 0
+    assert 'user_id_1_idempotency_key_1' in mc.movie_booking.bookings.index_information()
+    sources = LuaScripts(r).sources.values()
+    assert all(r.script_exists(*[hashlib.sha1(src.encode()).hexdigest() for src in sources]))
@@ -0,0 +1,79 @@
+# tests/test_rebuild_seat_state.py
+from bson import ObjectId
+
+from booking_expiry import DEADLINES_KEY
+from rebuild_seat_state import GENERATION_FIELD, rebuild_all
+from seat_state import seats_key
+
+
+def _buy(client, headers, screening_id, labels):
+    resp = client.post('/bookings/purchase', json={'screening_id': screening_id, 'seat_labels': labels},
+                       headers=headers)
+    assert resp.status_code == 201
+    return resp.get_json()['booking_id']
+
+
+def test_rebuild_restores_reservations_once_per_generation(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2', 'A3', 'A4'])
+    paid = _buy(client, auth_headers(), screening_id, ['A1'])
+    pending = _buy(client, auth_headers(), screening_id, ['A2'])
+    cancelled = _buy(client, auth_headers(), screening_id, ['A3'])
+    app.mdb.bookings.update_one({'_id': ObjectId(paid)}, {'$set': {'status': 'CONFIRMED'}})
+    # a cancelled booking whose booking_seats rows were left behind must not count
+    app.mdb.bookings.update_one({'_id': ObjectId(cancelled)}, {'$set': {'status': 'CANCELLED'}})
+
+    app.redis.flushall()
+    assert rebuild_all(app.mdb, app.lua, '1') == {'rebuilt': 1, 'skipped': 0, 'reserved_seats': 2}
+    assert app.redis.hgetall(seats_key(screening_id)) == {
+        GENERATION_FIELD: '1', 'A1': f'RESERVED:{paid}', 'A2': f'RESERVED:{pending}'}
+    # the pending booking gets its payment deadline back
+    assert app.redis.zrange(DEADLINES_KEY, 0, -1) == [f'{screening_id}:{pending}']
+
+    # seats sold since the rebuild survive a second run of the same generation
+    _buy(client, auth_headers(), screening_id, ['A4'])
+    assert rebuild_all(app.mdb, app.lua, '1')['skipped'] == 1
+    assert app.redis.hget(seats_key(screening_id), 'A4').startswith('RESERVED:')
+
+
+def test_lazy_mode_rebuilds_on_first_hold(app, client, seed_screening, auth_headers):
+    app.config['SEAT_STATE_LAZY_REBUILD'] = True
+    screening_id = seed_screening(['A1', 'A2'])
+    _buy(client, auth_headers(), screening_id, ['A1'])
+    app.redis.flushall()
+
+    resp = client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A1']}, headers=auth_headers())
+    assert resp.status_code == 409
+    assert app.redis.hget(seats_key(screening_id), GENERATION_FIELD) == '1'
+
+    seats = client.get(f'/screenings/{screening_id}').get_json()['seats']
+    assert [s['status'] for s in seats] == ['RESERVED', 'AVAILABLE']
+
+
+def test_rebuild_merges_into_holds_and_reservations_made_after_the_aggregation(app, client, seed_screening,
+                                                                              auth_headers, monkeypatch):
+    import rebuild_seat_state
+
+    screening_id = seed_screening(['A1', 'A2', 'A3', 'A4'])
+    paid = _buy(client, auth_headers(), screening_id, ['A1'])
+    gone = _buy(client, auth_headers(), screening_id, ['A2'])
+    app.mdb.bookings.update_one({'_id': ObjectId(gone)}, {'$set': {'status': 'EXPIRED'}})
+    app.redis.hdel(seats_key(screening_id), 'A1')
+
+    aggregate = rebuild_seat_state.reserved_seats
+
+    def aggregate_then_sell(mdb, screening_oids):
+        seats = aggregate(mdb, screening_oids)
+        # a hold and a (not yet persisted) reservation land between the aggregation and the script
+        hold = client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A3']},
+                           headers=auth_headers())
+        assert hold.status_code == 201
+        app.redis.hset(seats_key(screening_id), 'A4', 'RESERVED:queued')
+        return seats
+    monkeypatch.setattr(rebuild_seat_state, 'reserved_seats', aggregate_then_sell)
+
+    assert rebuild_all(app.mdb, app.lua, '2')['rebuilt'] == 1
+    state = app.redis.hgetall(seats_key(screening_id))
+    assert state['A1'] == f'RESERVED:{paid}'
+    # the reservation of the expired booking is dropped, the later hold and reservation are kept
+    assert 'A2' not in state
+    assert '|' in state['A3'] and state['A4'] == 'RESERVED:queued'
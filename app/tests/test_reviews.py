@@ -0,0 +1,77 @@
+# tests/test_reviews.py
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from models_mongo import make_review
+
+
+def test_summary_is_maintained_incrementally(client, app):
+    movie_id = str(ObjectId())
+    for rating in (5, 4, 5, 1):
+        resp = client.post('/reviews', json={'user_id': str(ObjectId()), 'movie_id': movie_id, 'rating': rating})
+        assert resp.status_code == 201
+
+    summary = client.get(f'/reviews/movie/{movie_id}/summary').get_json()
+    assert summary['count'] == 4
+    assert summary['average'] == 3.75
+    assert summary['histogram'] == {'1': 1, '2': 0, '3': 0, '4': 1, '5': 2}
+
+    empty = client.get(f'/reviews/movie/{ObjectId()}/summary').get_json()
+    assert empty['count'] == 0 and empty['average'] is None
+
+
+def test_rejects_out_of_range_rating(client):
+    resp = client.post('/reviews', json={'user_id': str(ObjectId()), 'movie_id': str(ObjectId()), 'rating': 6})
+    assert resp.status_code == 400
+
+
+def test_feed_is_keyset_paginated_newest_first(client, app):
+    movie = ObjectId()
+    base = datetime.utcnow()
+    for i in range(5):
+        rev = make_review(ObjectId(), movie, 3, comment=f'c{i}')
+        # two reviews share a timestamp to exercise the _id tiebreaker
+        rev['created_at'] = base + timedelta(seconds=min(i, 3))
+        app.mdb.reviews.insert_one(rev)
+    app.mdb.reviews.insert_one(make_review(ObjectId(), ObjectId(), 3, comment='other movie'))
+
+    comments, cursor = [], None
+    while True:
+        resp = client.get(f'/reviews/movie/{movie}?limit=2' + (f'&cursor={cursor}' if cursor else ''))
+        body = resp.get_json()
+        comments += [r['comment'] for r in body['reviews']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert comments == ['c4', 'c3', 'c2', 'c1', 'c0']
+
+
+def test_rebuild_matches_incremental_summary(client, app):
+    from blueprints.reviews import rebuild_review_summaries
+
+    movie_id = str(ObjectId())
+    for rating in (2, 2, 5):
+        client.post('/reviews', json={'user_id': str(ObjectId()), 'movie_id': movie_id, 'rating': rating})
+    incremental = app.mdb.review_summaries.find_one({'_id': ObjectId(movie_id)})
+
+    app.mdb.review_summaries.delete_many({})
+    assert rebuild_review_summaries(app.mdb) == 1
+    assert app.mdb.review_summaries.find_one({'_id': ObjectId(movie_id)}) == incremental
+
+
+def test_migration_backfills_missing_summaries(client, app):
+    from migrate_indexes import backfill_review_summaries
+
+    movie = ObjectId()
+    # reviews written before summaries were maintained
+    for rating in (3, 4):
+        app.mdb.reviews.insert_one(make_review(ObjectId(), movie, rating))
+
+    assert backfill_review_summaries(app.mdb) == 1
+    assert app.mdb.review_summaries.find_one({'_id': movie})['count'] == 2
+    # once summaries exist they are maintained incrementally; only a forced run recomputes
+    app.mdb.reviews.insert_one(make_review(ObjectId(), movie, 5))
+    assert backfill_review_summaries(app.mdb) is None
+    assert backfill_review_summaries(app.mdb, force=True) == 1
+    assert app.mdb.review_summaries.find_one({'_id': movie})['sum'] == 12
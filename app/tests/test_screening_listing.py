@@ -0,0 +1,82 @@
+# tests/test_screening_listing.py
+from datetime import datetime, timedelta
+
+from models_mongo import make_movie, make_theater, make_auditorium
+from schedule import schedule_key
+
+
+def _catalog(app):
+    mdb = app.mdb
+    movies = [make_movie('Alpha'), make_movie('Beta')]
+    theaters = [make_theater('North'), make_theater('South')]
+    auds = [make_auditorium(theaters[0]['_id'], 'N1'), make_auditorium(theaters[1]['_id'], 'S1')]
+    mdb.movies.insert_many(movies)
+    mdb.theaters.insert_many(theaters)
+    mdb.auditoriums.insert_many(auds)
+    return movies, theaters, auds
+
+
+def _create(client, headers, movie, aud, start):
+    resp = client.post('/screenings', headers=headers, json={
+        'movie_id': str(movie['_id']), 'auditorium_id': str(aud['_id']), 'start_time': start.isoformat() + 'Z'})
+    assert resp.status_code == 201
+    return resp.get_json()['id']
+
+
+def test_query_by_movie_theater_and_window(client, app, auth_headers):
+    movies, theaters, auds = _catalog(app)
+    admin = auth_headers(role='admin')
+    day = datetime(2030, 1, 1, 12)
+    ids = [_create(client, admin, movies[i % 2], auds[i // 2 % 2], day + timedelta(hours=i)) for i in range(6)]
+
+    body = client.get(f'/screenings?movie_id={movies[0]["_id"]}&from=2030-01-01T00:00:00Z').get_json()
+    assert [s['id'] for s in body['screenings']] == ids[0::2]
+
+    body = client.get(f'/screenings?theater_id={theaters[1]["_id"]}&from=2030-01-01T00:00:00Z').get_json()
+    assert [s['id'] for s in body['screenings']] == [ids[2], ids[3]]
+
+    seen, cursor = [], None
+    while True:
+        url = '/screenings?from=2030-01-01T13:00:00&to=2030-01-01T17:00:00&limit=3'
+        body = client.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        seen += [s['id'] for s in body['screenings']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert seen == ids[1:5]
+
+    assert client.post('/screenings', headers=auth_headers(), json={}).status_code == 403
+
+
+def test_day_schedule_is_materialized_on_create(client, app, auth_headers):
+    movies, _, auds = _catalog(app)
+    admin = auth_headers(role='admin')
+    day = datetime(2030, 2, 3, 18)
+    _create(client, admin, movies[1], auds[0], day)
+    assert app.redis.exists(schedule_key(day.date()))
+    _create(client, admin, movies[0], auds[1], day + timedelta(hours=2))
+    _create(client, admin, movies[1], auds[1], day + timedelta(days=1))
+
+    body = client.get('/screenings/schedule/2030-02-03').get_json()
+    assert [m['title'] for m in body['movies']] == ['Alpha', 'Beta']
+    assert body['movies'][0]['showtimes'][0]['hall'] == 'S1'
+    assert len(body['movies'][1]['showtimes']) == 1
+
+    # rebuilt from Mongo when the materialized copy is gone
+    app.redis.delete(schedule_key(day.date()))
+    assert client.get('/screenings/schedule/2030-02-03').get_json() == body
+    assert client.get('/screenings/schedule/not-a-day').status_code == 400
+
+
+def test_offsets_are_converted_to_utc(client, app, auth_headers):
+    movies, _, auds = _catalog(app)
+    resp = client.post('/screenings', headers=auth_headers(role='admin'), json={
+        'movie_id': str(movies[0]['_id']), 'auditorium_id': str(auds[0]['_id']),
+        'start_time': '2030-01-01T14:00:00+02:00'})
+    assert resp.status_code == 201
+    assert app.mdb.screenings.find_one()['start_time'] == datetime(2030, 1, 1, 12)
+
+    # 12:00 UTC is 10:00-02:00: inside [09:30, 10:30) at that offset, outside at UTC
+    inside = client.get('/screenings?from=2030-01-01T09:30:00-02:00&to=2030-01-01T10:30:00-02:00').get_json()
+    outside = client.get('/screenings?from=2030-01-01T09:30:00Z&to=2030-01-01T10:30:00Z').get_json()
+    assert len(inside['screenings']) == 1 and outside['screenings'] == []
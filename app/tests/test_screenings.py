@@ -0,0 +1,29 @@
+# tests/test_screenings.py
+from seat_state import seats_key
+
+
+def test_get_screening_derives_seat_statuses(app, client, seed_screening):
+    screening_id = seed_screening(['A1', 'A2', 'A3', 'A4'])
+    app.redis.hset(seats_key(screening_id), mapping={
+        'A1': 'AVAILABLE',
+        'A2': 'hold123|user1',
+        'A3': 'RESERVED:booking1',
+    })
+    # A4 has no field at all -> AVAILABLE
+
+    resp = client.get(f'/screenings/{screening_id}')
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body['movieTitle'] == "Seat Map Movie"
+    assert body['hall'] == "Hall 1"
+    assert body['seats'] == [
+        {'label': 'A1', 'status': 'AVAILABLE'},
+        {'label': 'A2', 'status': 'HELD'},
+        {'label': 'A3', 'status': 'RESERVED'},
+        {'label': 'A4', 'status': 'AVAILABLE'},
+    ]
+
+
+def test_get_screening_not_found(client):
+    assert client.get('/screenings/not-an-id').status_code == 400
+    assert client.get('/screenings/65a000000000000000000000').status_code == 404
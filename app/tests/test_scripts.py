@@ -0,0 +1,97 @@
+# tests/test_scripts.py
+import fakeredis
+import pytest
+from bson import ObjectId
+from redis.exceptions import ResponseError
+
+from scripts import LuaScripts, hold_seats, hold_confirm
+from seat_state import hold_key, seats_key
+
+
+@pytest.fixture
+def scripts():
+    s = LuaScripts(fakeredis.FakeRedis(decode_responses=True))
+    s.load_all()
+    return s
+
+
+def test_registry_loads_every_script(scripts):
+    assert {'hold_seats', 'confirm_reserve', 'hold_confirm'} <= set(scripts.shas)
+
+
+def test_noscript_reloads_and_retries(scripts):
+    scripts.redis.script_flush()
+    res = hold_seats(scripts, str(ObjectId()), 'h1', 'u1', 600, ['A1'])
+    assert res.ok and res.expires_at
+
+
+def test_other_errors_are_not_retried(scripts):
+    # a wrong-type key makes the script itself fail; that must surface, not be swallowed
+    screening_id = str(ObjectId())
+    scripts.redis.set(seats_key(screening_id), 'not a hash')
+    with pytest.raises(ResponseError):
+        hold_seats(scripts, screening_id, 'h1', 'u1', 600, ['A1'])
+
+
+def test_hold_confirm_is_all_or_nothing(scripts):
+    screening_id = str(ObjectId())
+    r = scripts.redis
+    r.hset(seats_key(screening_id), mapping={'A1': 'AVAILABLE', 'A2': 'h9|other', 'A3': 'h1|me'})
+
+    res = hold_confirm(scripts, screening_id, 'me', 'b1', 3600, ['A1', 'A2'])
+    assert not res.ok and res.unavailable == ['A2']
+    assert r.hget(seats_key(screening_id), 'A1') == 'AVAILABLE'
+
+    # free seats and seats the buyer holds under the named hold can be bought in one call
+    res = hold_confirm(scripts, screening_id, 'me', 'b1', 3600, ['A1', 'A3'], 'h1')
+    assert res.ok and res.seats == ['A1', 'A3']
+    assert r.hmget(seats_key(screening_id), ['A1', 'A3']) == ['RESERVED:b1', 'RESERVED:b1']
+
+
+def test_hold_confirm_only_takes_seats_of_the_named_hold(scripts):
+    screening_id = str(ObjectId())
+    r = scripts.redis
+    assert hold_seats(scripts, screening_id, 'h1', 'me', 600, ['A1', 'A2']).ok
+    assert hold_seats(scripts, screening_id, 'h2', 'me', 600, ['A3']).ok
+
+    # the buyer's own other hold is not consumed unless it is named
+    res = hold_confirm(scripts, screening_id, 'me', 'b1', 3600, ['A1', 'A3'], 'h1')
+    assert not res.ok and res.unavailable == ['A3']
+    assert not hold_confirm(scripts, screening_id, 'me', 'b1', 3600, ['A1']).ok
+
+    # bought seats leave the hold's registry entry, and a fully bought hold is deleted
+    assert hold_confirm(scripts, screening_id, 'me', 'b1', 3600, ['A1'], 'h1').ok
+    assert r.hget(hold_key(screening_id, 'h1'), 'seats') == 'A2'
+    assert hold_confirm(scripts, screening_id, 'me', 'b2', 3600, ['A3'], 'h2').ok
+    assert not r.exists(hold_key(screening_id, 'h2'))
+
+
+def test_purchase_endpoint(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2'])
+    headers = auth_headers()
+    body = {'screening_id': screening_id, 'seat_labels': ['A2'], 'idempotency_key': 'buy-1'}
+
+    resp = client.post('/bookings/purchase', json=body, headers=headers)
+    assert resp.status_code == 201
+    booking_id = resp.get_json()['booking_id']
+    assert app.redis.hget(seats_key(screening_id), 'A2') == f'RESERVED:{booking_id}'
+
+    again = client.post('/bookings/purchase', json=body, headers=headers)
+    assert again.status_code == 200 and again.get_json()['idempotent']
+
+    taken = client.post('/bookings/purchase', json={'screening_id': screening_id, 'seat_labels': ['A2']},
+                        headers=auth_headers())
+    assert taken.status_code == 409
+
+
+def test_idempotency_key_of_another_user_is_not_replayed(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2'])
+    body = {'screening_id': screening_id, 'seat_labels': ['A1'], 'idempotency_key': 'shared'}
+    first = client.post('/bookings/purchase', json=body, headers=auth_headers())
+    assert first.status_code == 201
+
+    # keys are scoped per user: the same key from someone else books on its own
+    other = client.post('/bookings/purchase', json={**body, 'seat_labels': ['A2']}, headers=auth_headers())
+    assert other.status_code == 201
+    assert other.get_json()['booking_id'] != first.get_json()['booking_id']
+    assert app.redis.hget(seats_key(screening_id), 'A2').startswith('RESERVED:')
@@ -0,0 +1,67 @@
+# tests/test_seat_events.py
+import json
+
+from seat_events import SeatEventHub, translate, QUEUE_SIZE
+from seat_state import channel_screening, events_channel
+
+
+def test_scripts_publish_seat_changes(app, client, seed_screening, auth_headers):
+    screening_id = seed_screening(['A1', 'A2'])
+    pubsub = app.redis.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(events_channel(screening_id))
+
+    headers = auth_headers()
+    hold = client.post('/holds', json={'screening_id': screening_id, 'seat_labels': ['A1', 'A2']},
+                       headers=headers).get_json()
+    client.post('/bookings/confirm', json={'screening_id': screening_id, 'hold_id': hold['hold_id']},
+                headers=headers)
+
+    messages = [pubsub.get_message(timeout=0.1) for _ in range(5)]
+    assert [m['data'] for m in messages if m] == ['H|A1,A2', 'R|A1,A2']
+
+
+def test_translate_messages_and_expiry():
+    sid, frame = translate('screening:abc:events', 'R|A1,B2')
+    assert sid == 'abc'
+    assert frame.startswith('event: seats\n')
+    assert json.loads(frame.split('data: ')[1]) == {'status': 'RESERVED', 'seats': ['A1', 'B2']}
+
+    assert translate('screening:{abc}:seats', 'R|A1') is None
+    sid, frame = translate('screening:abc:events', 'C|')
+    assert sid == 'abc' and frame.startswith('event: cancelled\n')
+    assert channel_screening(events_channel('abc')) == 'abc'
+
+    sid, frame = translate('__keyevent@0__:expired', 'hold:{abc}:h1')
+    assert sid == 'abc' and 'expired' in frame and '"hold_id":"h1"' in frame
+
+    assert translate('__keyevent@0__:expired', 'screening:{abc}:seats') is None
+    assert translate('other:channel', 'H|A1') is None
+
+
+def test_slow_subscriber_gets_resync(monkeypatch):
+    hub = SeatEventHub(r=None)
+    monkeypatch.setattr(hub, 'start', lambda: None)
+    q = hub.subscribe('abc')
+    for i in range(QUEUE_SIZE + 1):
+        hub.publish_local('abc', f'frame{i}')
+    assert q.qsize() == 1
+    assert q.get_nowait().startswith('event: resync')
+    hub.unsubscribe('abc', q)
+    assert hub.subscriber_count() == 0
+
+
+def test_sse_stream_relays_hub_frames(app, client, monkeypatch):
+    hub = app.seat_events
+    monkeypatch.setattr(hub, 'start', lambda: None)
+    screening_id = '65a000000000000000000000'
+
+    resp = client.get(f'/screenings/{screening_id}/events')
+    assert resp.mimetype == 'text/event-stream'
+    chunks = resp.response
+    assert next(chunks) == b'retry: 3000\n\n'
+
+    hub.dispatch({'type': 'pmessage', 'channel': events_channel(screening_id), 'data': 'H|A3'})
+    assert next(chunks).startswith(b'event: seats\n')
+
+    resp.close()
+    assert hub.subscriber_count(screening_id) == 0
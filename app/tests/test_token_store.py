@@ -0,0 +1,71 @@
+# tests/test_token_store.py
+import pytest
+from bson import ObjectId
+
+from auth import make_refresh_token
+from token_store import MongoTokenStore, RedisTokenStore, token_key, token_digest
+
+
+@pytest.fixture(params=['redis', 'mongo'])
+def store(request, app):
+    if request.param == 'mongo':
+        return MongoTokenStore(app.mdb)
+    return RedisTokenStore(app.lua)
+
+
+def test_issue_rotate_revoke(store):
+    uid = str(ObjectId())
+    first, second = make_refresh_token(uid), make_refresh_token(uid)
+    assert first != second
+
+    store.issue(uid, first)
+    assert store.is_active(uid, first)
+    assert store.rotate(uid, first, second)
+    assert not store.is_active(uid, first)
+    # a rotated token cannot be redeemed a second time
+    assert not store.rotate(uid, first, make_refresh_token(uid))
+
+    assert store.revoke(uid, second)
+    assert not store.is_active(uid, second)
+
+
+def test_revoke_all(store):
+    uid = str(ObjectId())
+    tokens = [make_refresh_token(uid) for _ in range(3)]
+    for t in tokens:
+        store.issue(uid, t)
+    store.revoke_all(uid)
+    assert not any(store.is_active(uid, t) for t in tokens)
+
+
+def test_redis_store_keeps_only_digests_with_ttl(app):
+    uid = str(ObjectId())
+    token = make_refresh_token(uid)
+    RedisTokenStore(app.lua, ttl=120).issue(uid, token)
+    assert app.redis.ttl(token_key(uid, token_digest(token))) == 120
+    assert not any(token in k for k in app.redis.keys('refresh:*'))
+
+
+def test_refresh_endpoint_rotates(client, app):
+    uid = str(ObjectId())
+    app.mdb.users.insert_one({'_id': ObjectId(uid), 'email': 'a@example.com', 'role': 'customer'})
+    token = make_refresh_token(uid)
+    app.token_store.issue(uid, token)
+
+    resp = client.post('/users/refresh', json={'refresh_token': token})
+    assert resp.status_code == 200
+    new_token = resp.get_json()['refresh_token']
+    assert client.post('/users/refresh', json={'refresh_token': token}).status_code == 401
+
+    assert client.post('/users/logout', json={'refresh_token': new_token, 'all': True}).status_code == 200
+    assert client.post('/users/refresh', json={'refresh_token': new_token}).status_code == 401
+
+
+def test_refresh_of_unknown_user_keeps_the_token(client, app):
+    uid = str(ObjectId())
+    token = make_refresh_token(uid)
+    app.token_store.issue(uid, token)
+
+    assert client.post('/users/refresh', json={'refresh_token': token}).status_code == 404
+    # the lookup failed before rotation, so the presented token was not consumed
+    assert app.token_store.is_active(uid, token)
@@ -0,0 +1,46 @@
+# tests/test_user_profiles.py
+from bson import ObjectId
+
+from auth import make_access_token, make_refresh_token
+from user_profiles import get_profile, profile_key, update_user
+
+
+def _insert_user(app, **extra):
+    user = {'_id': ObjectId(), 'name': 'Ann', 'email': 'ann@example.com',
+            'hashed_password': 'secret-hash', 'role': 'customer', **extra}
+    app.mdb.users.insert_one(user)
+    return str(user['_id'])
+
+
+def test_profile_is_projected_and_cached(app, monkeypatch):
+    uid = _insert_user(app)
+    profile = get_profile(app.mdb, app.redis, uid)
+    assert profile['name'] == 'Ann'
+    assert 'hashed_password' not in profile
+    assert app.redis.ttl(profile_key(uid)) > 0
+
+    # second read is served from Redis
+    monkeypatch.setattr(app.mdb.users, 'find_one', lambda *a, **k: (_ for _ in ()).throw(AssertionError))
+    assert get_profile(app.mdb, app.redis, uid)['email'] == 'ann@example.com'
+
+
+def test_update_user_invalidates_cache(app):
+    uid = _insert_user(app)
+    get_profile(app.mdb, app.redis, uid)
+    update_user(app.mdb, app.redis, uid, {'name': 'Beth'})
+    assert not app.redis.exists(profile_key(uid))
+    assert get_profile(app.mdb, app.redis, uid)['name'] == 'Beth'
+
+
+def test_me_and_refresh_use_profile(client, app):
+    uid = _insert_user(app, role='admin')
+    resp = client.get('/users/me', headers={'Authorization': f'Bearer {make_access_token(uid, "admin")}'})
+    assert resp.status_code == 200
+    assert resp.get_json()['id'] == uid
+    assert 'hashed_password' not in resp.get_json()
+
+    refresh = make_refresh_token(uid)
+    app.token_store.issue(uid, refresh)
+    resp = client.post('/users/refresh', json={'refresh_token': refresh})
+    assert resp.status_code == 200
+    assert 'access_token' in resp.get_json()
@@ -0,0 +1,15 @@
+# tests/test_wsgi.py
+from app import reinit_after_fork
+
+
+def test_reinit_after_fork_replaces_clients(app):
+    old_client, old_hub = app.mongodb_client, app.seat_events
+
+    reinit_after_fork(app)
+
+    assert app.mongodb_client is not old_client
+    assert app.seat_events is not old_hub
+    assert app.seat_events.redis is app.redis
+    # script SHAs loaded in the master stay usable
+    assert app.lua.redis is app.redis
+    assert app.lua.shas['hold_seats']
@@ -0,0 +1,125 @@
+# app/token_store.py
+"""
+Server-side registry of live refresh tokens.
+
+Only SHA-256 digests of tokens are stored, never the tokens themselves. Each token lives for
+REFRESH_EXPIRE_DAYS and is then forgotten by the backend itself, not by a cleanup job.
+Both backends support:
+
+    issue(user_id, token)            record a freshly minted token
+    is_active(user_id, token)        still valid (not revoked, rotated or expired)?
+    rotate(user_id, old, new)        atomically replace old with new; False if old was not live
+    revoke(user_id, token)           log out one session
+    revoke_all(user_id)              log out every session of a user
+
+RedisTokenStore (default) keeps refresh:{<user_id>}:<digest> -> user_id with native EXPIRE,
+plus the set refresh:{<user_id>}:all of that user's digests for revoke_all. The {user_id}
+hash tag keeps a user's keys in one cluster slot so rotation is a single script call.
+
+MongoTokenStore keeps one refresh_tokens document per digest, and a TTL index on created_at
+(models_mongo.ensure_indexes) deletes expired documents. Select it with
+REFRESH_TOKEN_STORE=mongo.
+"""
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from auth import REFRESH_EXPIRE_DAYS
+
+REFRESH_TTL_SECONDS = REFRESH_EXPIRE_DAYS * 24 * 3600
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_key(user_id: str, digest: str) -> str:
+    return f"refresh:{{{user_id}}}:{digest}"
+
+
+def user_tokens_key(user_id: str) -> str:
+    return f"refresh:{{{user_id}}}:all"
+
+
+class RedisTokenStore:
+    def __init__(self, scripts, ttl: int = REFRESH_TTL_SECONDS):
+        self.scripts = scripts
+        self.ttl = ttl
+
+    @property
+    def redis(self):
+        return self.scripts.redis
+
+    def issue(self, user_id: str, token: str) -> None:
+        digest = token_digest(token)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.set(token_key(user_id, digest), user_id, ex=self.ttl)
+        pipe.sadd(user_tokens_key(user_id), digest)
+        pipe.expire(user_tokens_key(user_id), self.ttl)
+        pipe.execute()
+
+    def is_active(self, user_id: str, token: str) -> bool:
+        return bool(self.redis.exists(token_key(user_id, token_digest(token))))
+
+    def rotate(self, user_id: str, old_token: str, new_token: str) -> bool:
+        old, new = token_digest(old_token), token_digest(new_token)
+        res = self.scripts.run('rotate_refresh_token',
+                               [token_key(user_id, old), token_key(user_id, new), user_tokens_key(user_id)],
+                               [old, new, self.ttl, user_id])
+        return int(res) == 1
+
+    def revoke(self, user_id: str, token: str) -> bool:
+        digest = token_digest(token)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(token_key(user_id, digest))
+        pipe.srem(user_tokens_key(user_id), digest)
+        return bool(pipe.execute()[0])
+
+    def revoke_all(self, user_id: str) -> int:
+        digests = self.redis.smembers(user_tokens_key(user_id))
+        keys = [token_key(user_id, d) for d in digests]
+        pipe = self.redis.pipeline(transaction=True)
+        if keys:
+            pipe.delete(*keys)
+        pipe.delete(user_tokens_key(user_id))
+        return pipe.execute()[0] if keys else 0
+
+
+class MongoTokenStore:
+    def __init__(self, mdb, ttl: int = REFRESH_TTL_SECONDS):
+        self.col = mdb.refresh_tokens
+        self.ttl = ttl
+
+    def _live(self) -> dict:
+        # the TTL monitor runs about once a minute, so filter on age as well
+        return {'created_at': {'$gt': datetime.utcnow() - timedelta(seconds=self.ttl)}}
+
+    def issue(self, user_id: str, token: str) -> None:
+        self.col.insert_one({'_id': token_digest(token), 'user_id': ObjectId(user_id),
+                             'created_at': datetime.utcnow()})
+
+    def is_active(self, user_id: str, token: str) -> bool:
+        query = {'_id': token_digest(token), 'user_id': ObjectId(user_id), **self._live()}
+        return self.col.find_one(query, {'_id': 1}) is not None
+
+    def rotate(self, user_id: str, old_token: str, new_token: str) -> bool:
+        query = {'_id': token_digest(old_token), 'user_id': ObjectId(user_id), **self._live()}
+        if self.col.find_one_and_delete(query, projection={'_id': 1}) is None:
+            return False
+        self.issue(user_id, new_token)
+        return True
+
+    def revoke(self, user_id: str, token: str) -> bool:
+        res = self.col.delete_one({'_id': token_digest(token), 'user_id': ObjectId(user_id)})
+        return bool(res.deleted_count)
+
+    def revoke_all(self, user_id: str) -> int:
+        return self.col.delete_many({'user_id': ObjectId(user_id)}).deleted_count
+
+
+def make_token_store(app):
+    if os.environ.get('REFRESH_TOKEN_STORE', 'redis') == 'mongo':
+        return MongoTokenStore(app.mdb)
+    return RedisTokenStore(app.lua)
@@ -0,0 +1,65 @@
+# app/user_profiles.py
+"""
+Read-through cache of user profiles for /users/me and /users/refresh.
+
+Profiles are read with a projection that leaves out credential fields, so password hashes never
+leave Mongo on these paths, and cached in Redis under user:profile:<user_id> for
+PROFILE_CACHE_TTL_SECONDS. Redis rather than a per-process dict keeps the cache coherent across
+gunicorn workers: any write through update_user() (or an explicit invalidate_profile()) drops
+the entry for every worker at once. The TTL bounds staleness after out-of-band edits to the
+users collection.
+
+Redis failures fall back to Mongo; the cache is never required for correctness.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId, json_util
+
+log = logging.getLogger(__name__)
+
+PROFILE_CACHE_TTL_SECONDS = int(os.environ.get('PROFILE_CACHE_TTL_SECONDS', 60))
+PROFILE_PROJECTION = {'hashed_password': 0, 'password': 0, 'salt': 0}
+
+_JSON_OPTIONS = json_util.JSONOptions(tz_aware=False)
+
+
+def profile_key(user_id: str) -> str:
+    return f"user:profile:{user_id}"
+
+
+def get_profile(mdb, r, user_id: str) -> Optional[dict]:
+    """User document without credential fields, or None if the user does not exist."""
+    key = profile_key(user_id)
+    try:
+        cached = r.get(key)
+        if cached:
+            return json_util.loads(cached, json_options=_JSON_OPTIONS)
+    except Exception as e:
+        log.warning("profile cache read failed for %s: %s", user_id, e)
+
+    doc = mdb.users.find_one({'_id': ObjectId(user_id)}, PROFILE_PROJECTION)
+    if doc is None:
+        return None
+    try:
+        r.set(key, json_util.dumps(doc), ex=PROFILE_CACHE_TTL_SECONDS)
+    except Exception as e:
+        log.warning("profile cache write failed for %s: %s", user_id, e)
+    return doc
+
+
+def invalidate_profile(r, user_id) -> None:
+    try:
+        r.delete(profile_key(str(user_id)))
+    except Exception as e:
+        log.warning("profile cache invalidation failed for %s: %s", user_id, e)
+
+
+def update_user(mdb, r, user_id, changes: dict):
+    """$set changes on a user (bumping updated_at) and drop the cached profile."""
+    result = mdb.users.update_one({'_id': ObjectId(user_id)},
+                                  {'$set': {**changes, 'updated_at': datetime.utcnow()}})
+    invalidate_profile(r, user_id)
+    return result
@@ -0,0 +1,11 @@
+# app/wsgi.py
+"""
+WSGI entry point for production serving:
+
+    gunicorn -c gunicorn.conf.py wsgi:application      (from the app/ directory)
+
+`python app.py` still runs Flask's single-process dev server (plus Vite) for local work.
+"""
+from app import create_app
+
+application = create_app()
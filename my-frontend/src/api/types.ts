@@ -27,5 +27,5 @@ export interface BookingResponse {
     booking_id?: string
     booking?: any
     idempotent?: boolean
-    unavailable_keys?: string[]
+    unavailable_seats?: string[]
 }
\ No newline at end of file
@@ -17,7 +17,6 @@ import {
   TableContainer,
   TableHead,
   TableRow,
-  TablePagination,
   Skeleton,
   Dialog,
   DialogTitle,
@@ -36,13 +35,13 @@ import AccessTimeOutlinedIcon from "@mui/icons-material/AccessTimeOutlined";
 import PlaceOutlinedIcon from "@mui/icons-material/PlaceOutlined";
 
 import axios, { AxiosError } from "axios";
-import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
+import { useInfiniteQuery, useMutation, useQueryClient, type InfiniteData } from "@tanstack/react-query";
 import { useSnackbar } from "notistack";
 import { useForm, Controller } from "react-hook-form";
 import { z } from "zod";
 import { zodResolver } from "@hookform/resolvers/zod";
 
-type BookingStatus = "PENDING" | "CONFIRMED" | "CANCELLED";
+type BookingStatus = "PENDING" | "CONFIRMED" | "CANCELLED" | "EXPIRED";
 
 type Booking = {
   id: string;
@@ -58,11 +57,10 @@ type Booking = {
   qrCodeUrl?: string;
 };
 
+// GET /bookings is keyset-paginated: pass next_cursor back as `cursor` for the following page
 type PageResult<T> = {
   items: T[];
-  page: number; // 1-based from server
-  pageSize: number;
-  total: number;
+  next_cursor: string | null; // null on the last page
 };
 
 const bookingSchema = z.object({
@@ -70,7 +68,7 @@ const bookingSchema = z.object({
   movieTitle: z.string(),
   screeningTime: z.string(),
   seats: z.array(z.string()),
-  status: z.enum(["PENDING", "CONFIRMED", "CANCELLED"]),
+  status: z.enum(["PENDING", "CONFIRMED", "CANCELLED", "EXPIRED"]),
   total: z.number(),
   currency: z.string(),
   createdAt: z.string(),
@@ -82,9 +80,7 @@ const bookingSchema = z.object({
 const pageResultSchema = <T extends z.ZodTypeAny>(inner: T) =>
   z.object({
     items: z.array(inner),
-    page: z.number(),
-    pageSize: z.number(),
-    total: z.number(),
+    next_cursor: z.string().nullable(),
   });
 
 const API_BASE = import.meta.env.VITE_API_URL ?? "";
@@ -102,6 +98,7 @@ const statusColor: Record<BookingStatus, "default" | "success" | "warning" | "er
   PENDING: "warning",
   CONFIRMED: "success",
   CANCELLED: "default",
+  EXPIRED: "default",
 };
 
 const currencyFormat = (value: number, currency = "USD") =>
@@ -121,7 +118,7 @@ const filtersSchema = z.object({
   q: z.string().optional(),
   from: z.string().optional(), // yyyy-MM-dd
   to: z.string().optional(), // yyyy-MM-dd
-  status: z.enum(["ALL", "PENDING", "CONFIRMED", "CANCELLED"]).default("ALL"),
+  status: z.enum(["ALL", "PENDING", "CONFIRMED", "CANCELLED", "EXPIRED"]).default("ALL"),
 });
 
 type Filters = z.infer<typeof filtersSchema>;
@@ -135,25 +132,11 @@ function useDebouncedValue<T>(value: T, delay = 400) {
   return v;
 }
 
-async function fetchBookings(params: {
-  page: number; // 0-based UI
-  pageSize: number;
-  q?: string;
-  from?: string;
-  to?: string;
-  status?: BookingStatus | "ALL";
-}): Promise<PageResult<Booking>> {
-  const { page, pageSize, q, from, to, status } = params;
+async function fetchBookings(params: { limit: number; cursor?: string }): Promise<PageResult<Booking>> {
+  const { limit, cursor } = params;
   const res = await client.get("/bookings", {
     headers: getAuthHeaders(),
-    params: {
-      page: page + 1, // server 1-based
-      pageSize,
-      q: q || undefined,
-      from: from || undefined,
-      to: to || undefined,
-      status: status && status !== "ALL" ? status : undefined,
-    },
+    params: { limit, cursor: cursor || undefined },
   });
 
   const schema = pageResultSchema(bookingSchema);
@@ -165,21 +148,16 @@ async function fetchBookings(params: {
       id: String(b.id ?? b._id ?? ""),
       movieTitle: String(b.movieTitle ?? b.movie ?? "Untitled"),
       screeningTime: String(b.screeningTime ?? b.time ?? b.startsAt ?? new Date().toISOString()),
-      seats: Array.isArray(b.seats) ? b.seats.map(String) : [],
+      seats: Array.isArray(b.seats ?? b.seat_labels) ? (b.seats ?? b.seat_labels).map(String) : [],
       status: (b.status ?? "PENDING") as BookingStatus,
-      total: Number(b.total ?? b.amount ?? 0),
+      total: Number(b.total ?? b.total_amount ?? b.amount ?? 0),
       currency: String(b.currency ?? "USD"),
       createdAt: String(b.createdAt ?? b.created_at ?? new Date().toISOString()),
       venue: b.venue ? String(b.venue) : undefined,
       screen: b.screen ? String(b.screen) : undefined,
       qrCodeUrl: b.qrCodeUrl ? String(b.qrCodeUrl) : undefined,
     }));
-    return {
-      items,
-      page: Number(data.page ?? 1),
-      pageSize: Number(data.pageSize ?? data.limit ?? items.length),
-      total: Number(data.total ?? data.count ?? items.length),
-    };
+    return { items, next_cursor: data.next_cursor ?? null };
   }
   return parsed.data;
 }
@@ -199,14 +177,17 @@ function useCancelBooking() {
     },
     onMutate: async (bookingId) => {
       await qc.cancelQueries({ queryKey: ["bookings"] });
-      const prev = qc.getQueriesData<PageResult<Booking>>({ queryKey: ["bookings"] });
+      const prev = qc.getQueriesData<InfiniteData<PageResult<Booking>, string | undefined>>({ queryKey: ["bookings"] });
 
       // optimistic: mark as CANCELLED in all cached pages
       prev.forEach(([key, data]) => {
         if (!data) return;
-        const next: PageResult<Booking> = {
+        const next = {
           ...data,
-          items: data.items.map((b) => (b.id === bookingId ? { ...b, status: "CANCELLED" } as Booking : b)),
+          pages: data.pages.map((p) => ({
+            ...p,
+            items: p.items.map((b) => (b.id === bookingId ? ({ ...b, status: "CANCELLED" } as Booking) : b)),
+          })),
         };
         qc.setQueryData(key, next);
       });
@@ -233,9 +214,20 @@ function useCancelBooking() {
   });
 }
 
+const PAGE_SIZE = 20;
+
+// The server pages by cursor only; filters narrow the bookings loaded so far.
+function matchesFilters(b: Booking, f: Filters) {
+  const q = (f.q ?? "").trim().toLowerCase();
+  if (q && !b.movieTitle.toLowerCase().includes(q) && !b.seats.some((s) => s.toLowerCase() === q)) return false;
+  if (f.status && f.status !== "ALL" && b.status !== f.status) return false;
+  const day = b.screeningTime.slice(0, 10);
+  if (f.from && day < f.from) return false;
+  if (f.to && day > f.to) return false;
+  return true;
+}
+
 export default function Bookings() {
-  const [page, setPage] = React.useState(0);
-  const [pageSize, setPageSize] = React.useState(10);
   const [selected, setSelected] = React.useState<Booking | null>(null);
 
     const { control, watch, handleSubmit, reset } = useForm<Filters>({
@@ -253,37 +245,26 @@ export default function Bookings() {
   const debouncedQ = useDebouncedValue(rawFilters.q ?? "", 400);
   const effectiveFilters = { ...rawFilters, q: debouncedQ };
 
-  // @ts-ignore
-    const { data, isLoading, isError, error, refetch, isFetching } = useQuery({
-    queryKey: ["bookings", page, pageSize, effectiveFilters],
-    queryFn: () =>
-      fetchBookings({
-        page,
-        pageSize,
-        q: effectiveFilters.q,
-        from: effectiveFilters.from || undefined,
-        to: effectiveFilters.to || undefined,
-        status: effectiveFilters.status,
-      }),
-    staleTime: 15_000,
-   // keepPreviousData: true,
-  });
+  const { data, isLoading, isError, error, refetch, isFetching, fetchNextPage, hasNextPage, isFetchingNextPage } =
+    useInfiniteQuery({
+      queryKey: ["bookings"],
+      queryFn: ({ pageParam }) => fetchBookings({ limit: PAGE_SIZE, cursor: pageParam }),
+      initialPageParam: undefined as string | undefined,
+      getNextPageParam: (last) => last.next_cursor ?? undefined,
+      staleTime: 15_000,
+    });
 
   const cancelMutation = useCancelBooking();
 
   const onSubmitFilters = () => {
-    // When filters change, reset to first page
-    setPage(0);
     refetch();
   };
 
   const clearFilters = () => {
     reset({ q: "", status: "ALL", from: "", to: "" });
-    setPage(0);
   };
 
-  const items = data?.items ?? [];
-  const total = data?.total ?? 0;
+  const items = (data?.pages ?? []).flatMap((p) => p.items).filter((b) => matchesFilters(b, effectiveFilters));
 
   return (
     <Box sx={{ p: { xs: 2, md: 3 }, maxWidth: 1400, mx: "auto" }}>
@@ -337,6 +318,7 @@ export default function Bookings() {
                   <option value="PENDING">Pending</option>
                   <option value="CONFIRMED">Confirmed</option>
                   <option value="CANCELLED">Cancelled</option>
+                  <option value="EXPIRED">Expired</option>
                 </TextField>
               )}
             />
@@ -396,7 +378,7 @@ export default function Bookings() {
             </TableHead>
             <TableBody>
               {isLoading
-                ? Array.from({ length: pageSize }).map((_, i) => (
+                ? Array.from({ length: 5 }).map((_, i) => (
                     <TableRow key={`sk-${i}`}>
                       <TableCell colSpan={7}>
                         <Skeleton variant="rectangular" height={42} />
@@ -482,7 +464,7 @@ export default function Bookings() {
                               <IconButton
                                 aria-label="cancel"
                                 onClick={() => cancelMutation.mutate(b.id)}
-                                disabled={b.status === "CANCELLED" || cancelMutation.isPending}
+                                disabled={b.status === "CANCELLED" || b.status === "EXPIRED" || cancelMutation.isPending}
                                 color="error"
                               >
                                 <DeleteOutlineIcon />
@@ -497,20 +479,16 @@ export default function Bookings() {
           </Table>
         </TableContainer>
 
-        <Divider />
-        <TablePagination
-          component="div"
-          count={total}
-          page={page}
-          onPageChange={(_, p) => setPage(p)}
-          rowsPerPage={pageSize}
-          onRowsPerPageChange={(e) => {
-            setPageSize(parseInt(e.target.value, 10));
-            setPage(0);
-          }}
-          rowsPerPageOptions={[5, 10, 20, 50]}
-          labelRowsPerPage="Rows"
-        />
+        {hasNextPage && (
+          <>
+            <Divider />
+            <Stack alignItems="center" sx={{ p: 1.5 }}>
+              <Button onClick={() => fetchNextPage()} disabled={isFetchingNextPage}>
+                {isFetchingNextPage ? "Loading..." : "Load more"}
+              </Button>
+            </Stack>
+          </>
+        )}
       </Paper>
 
       <BookingDetailsDialog
@@ -652,7 +630,7 @@ function BookingDetailsDialog({
           color="error"
           startIcon={<DeleteOutlineIcon />}
           onClick={() => onCancel(booking.id)}
-          disabled={booking.status === "CANCELLED" || cancelDisabled}
+          disabled={booking.status === "CANCELLED" || booking.status === "EXPIRED" || cancelDisabled}
         >
           Cancel booking
         </Button>
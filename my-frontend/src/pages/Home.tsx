@@ -64,6 +64,9 @@ function getPosterUrl(movie: any): string {
   return '';
 }
 
+// the API's largest page
+const CATALOG_PAGE_SIZE = 100;
+
 export default function Home() {
   const [movies, setMovies] = useState<any[]>([]);
   const [loading, setLoading] = useState<boolean>(true);
@@ -76,15 +79,30 @@ export default function Home() {
     const controller = new AbortController();
     let isActive = true;
 
+    // /movies/all is keyset-paginated: follow next_cursor until the catalog is exhausted,
+    // showing the first page as soon as it arrives.
     const fetchMovies = async () => {
       try {
         setLoading(true);
         setError(null);
-        const res = await axios.get('http://localhost:5000/movies/all', { signal: controller.signal });
-        const data = Array.isArray(res.data) ? res.data : res.data?.movies ?? [];
-        if (isActive) {
-          setMovies(data);
-        }
+        let cursor: string | null = null;
+        let first = true;
+        do {
+          const res = await axios.get('http://localhost:5000/movies/all', {
+            params: { limit: CATALOG_PAGE_SIZE, cursor: cursor ?? undefined },
+            signal: controller.signal,
+          });
+          const data = Array.isArray(res.data) ? res.data : res.data?.movies ?? [];
+          cursor = Array.isArray(res.data) ? null : res.data?.next_cursor ?? null;
+          if (!isActive) return;
+          if (first) {
+            setMovies(data);
+            setLoading(false);
+            first = false;
+          } else {
+            setMovies((prev) => [...prev, ...data]);
+          }
+        } while (cursor);
       } catch (err) {
         if (axios.isCancel(err)) return;
         if (isActive) {